@@ -3,18 +3,23 @@ Main Streamlit Application for AI Text Detector
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from datetime import datetime
 import json
 import logging
 import os
+import time
+from contextlib import closing
 
 # Import custom modules
 from config import Config
-from auth import Auth
-from database import Database
-from model_handler import ModelHandler
+from metrics import NEAR_DUPLICATE_HITS_TOTAL
+from model_loader import model_loader
+from profiling import stage_profiler
+from resources import (
+    get_auth, get_database, get_job_store, get_job_worker, get_maintenance, get_metrics_server,
+    get_near_duplicate_index, get_scheduler
+)
+from scheduler import RateLimitExceeded
 from utils import Utils
 
 # Configure logging
@@ -36,34 +41,79 @@ class AITextDetectorApp:
         Utils.set_page_config()
         Utils.apply_custom_css()
         
-        self.auth = Auth()
-        self.db = Database()
+        self.auth = get_auth()
+        self.db = get_database()
+        self.near_duplicates = get_near_duplicate_index()
+        get_metrics_server()
+        self.maintenance = get_maintenance()
         self.model_handler = None
         
         # Initialize session state
         self.auth.init_session_state()
         
-        # Initialize model handler if authenticated
-        # if self.auth.check_authentication():
+        # Start loading the model in the background; pages that don't
+        # need it (login, dashboard) render without waiting
         self.init_model()
+        # Resume jobs left over by a restart without waiting for a visit to them
+        get_job_worker()
     
     def init_model(self):
-        """Initialize model handler"""
-        if 'model_handler' not in st.session_state:
-            with st.spinner("🔄 Memuat model AI..."):
-                try:
-                    self.model_handler = ModelHandler()
-                    self.model_handler.load_model()
-                    st.session_state.model_handler = self.model_handler
-                    logger.info("Model loaded successfully")
-                except Exception as e:
-                    st.error(f"❌ Gagal memuat model: {str(e)}")
-                    logger.error(f"Failed to load model: {str(e)}")
-                    return False
-        else:
-            self.model_handler = st.session_state.model_handler
+        """Start background model loading (non-blocking)"""
+        model_loader.start()
+        if model_loader.is_ready() and model_loader.error is None:
+            self.model_handler = model_loader.handler
         return True
     
+    def get_model_handler(self):
+        """Wait for the background model load and return the handler"""
+        if self.model_handler is not None:
+            return self.model_handler
+        
+        with st.spinner("🔄 Memuat model AI..."):
+            try:
+                self.model_handler = model_loader.get_handler()
+            except Exception as e:
+                st.error(f"❌ Gagal memuat model: {str(e)}")
+                # Allow the next rerun to retry loading
+                model_loader.reset()
+                return None
+        return self.model_handler
+    
+    def find_near_duplicate(self, input_text):
+        """
+        Look up earlier submissions similar to input_text
+        Returns: (known chunk scores or None, best (prediction_id, similarity) or None)
+        """
+        if self.near_duplicates is None:
+            return None, None
+        try:
+            matches = self.near_duplicates.query(input_text, limit=3)
+            if not matches:
+                return None, None
+            NEAR_DUPLICATE_HITS_TOTAL.inc()
+            # Only chunk scores from the model version now serving are reused
+            known_scores = self.near_duplicates.known_chunk_scores(
+                [pid for pid, _ in matches], getattr(self.model_handler, 'version', None)
+            )
+            return known_scores, matches[0]
+        except Exception as e:
+            logger.error(f"Near-duplicate lookup error: {str(e)}")
+            return None, None
+    
+    def index_prediction(self, prediction_id, input_text, result):
+        """Add a saved prediction to the near-duplicate index"""
+        if self.near_duplicates is None:
+            return
+        # Only default-adapter scores are reused by find_near_duplicate
+        if result.get('adapter', Config.DEFAULT_ADAPTER) != Config.DEFAULT_ADAPTER:
+            return
+        try:
+            self.near_duplicates.add(
+                prediction_id, input_text, result['chunk_predictions'], result.get('model_version')
+            )
+        except Exception as e:
+            logger.error(f"Near-duplicate indexing error: {str(e)}")
+    
     def main_interface(self):
         """Main application interface"""
         # Header
@@ -146,7 +196,7 @@ class AITextDetectorApp:
         st.header("⚙️ Admin Panel")
         
         # Admin tabs
-        tab1, tab2, tab3, tab4 = st.tabs(["👥 Kelola User", "📊 Statistik Sistem", "📋 Semua Prediksi", "🔍 Pencarian"])
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["👥 Kelola User", "📊 Statistik Sistem", "📋 Semua Prediksi", "🔍 Pencarian", "⏱️ Profiling", "🔁 Model"])
         
         with tab1:
             self.admin_manage_users()
@@ -159,6 +209,12 @@ class AITextDetectorApp:
         
         with tab4:
             self.admin_search()
+        
+        with tab5:
+            self.admin_profiling()
+        
+        with tab6:
+            self.admin_model_versions()
 
     def admin_manage_users(self):
         """Admin user management"""
@@ -281,6 +337,46 @@ class AITextDetectorApp:
             if stats['total_predictions'] > 0:
                 human_percentage = (stats['human_predictions'] / stats['total_predictions']) * 100
                 st.caption(f"{human_percentage:.1f}% dari total prediksi")
+        
+        # Retention, compaction and backups (see maintenance.py)
+        if self.maintenance is not None:
+            maintenance = self.maintenance.maintenance
+            st.markdown("### 🗄️ Pemeliharaan Database")
+            status = maintenance.status()
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Ukuran Database", f"{status['database_mb']} MB")
+            with col2:
+                st.metric("Ruang Kosong", f"{status['free_mb']} MB")
+            with col3:
+                st.metric("Prediksi Diarsipkan", status['archived_predictions'])
+            with col4:
+                st.metric("Ukuran Arsip", f"{status['archive_mb']} MB")
+            
+            last_runs = ", ".join(
+                f"{task} terakhir {when:%Y-%m-%d %H:%M}" for task, when in sorted(status['last_runs'].items())
+            )
+            st.caption(
+                f"Retensi {Config.PREDICTION_RETENTION_DAYS} hari (pekerjaan latar belakang {Config.JOB_RETENTION_DAYS} hari, "
+                f"{status['jobs_mb']} MB) · auto_vacuum: {status['auto_vacuum']}"
+                + (f" · {last_runs}" if last_runs else "")
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("🧹 Arsipkan & Rapikan Sekarang"):
+                    with st.spinner("🔄 Memindahkan prediksi lama ke arsip..."):
+                        report = maintenance.run(backup=False)
+                    st.success(
+                        f"✅ {report['archived']} prediksi diarsipkan, {report['jobs_purged']} pekerjaan lama dihapus, "
+                        f"{report['pages_released']} halaman dilepas"
+                    )
+            with col2:
+                if st.button("💾 Backup Sekarang"):
+                    with st.spinner("🔄 Membuat backup..."):
+                        paths = maintenance.backup()
+                    st.success(f"✅ Backup tersimpan: {', '.join(paths)}")
 
     def admin_all_predictions(self):
         """Admin view all predictions"""
@@ -334,6 +430,8 @@ class AITextDetectorApp:
                     st.metric("AI Probability", f"{pred['ai_probability']:.1%}")
                     st.text(f"User: {pred['username']}")
                     st.text(f"ID: {pred['id']}")
+                    if pred.get('model_version'):
+                        st.text(f"Model: {pred['model_version']}")
 
     def admin_search(self):
         """Admin search functionality"""
@@ -367,11 +465,182 @@ class AITextDetectorApp:
                     st.markdown("---")
             else:
                 st.info("Tidak ada pengguna yang ditemukan.")
+        
+        # Similar submissions (near-duplicate index)
+        st.markdown("### 🧬 Cari Kiriman Serupa")
+        if self.near_duplicates is None:
+            st.info("Indeks near-duplicate tidak aktif (NEAR_DUPLICATE_ENABLED).")
+            return
+        
+        similar_text = st.text_area("Teks yang ingin dicari kemiripannya:", height=150, key="similar_text")
+        threshold = st.slider(
+            "Kemiripan minimum (Jaccard):", 0.1, 1.0, Config.SIMILAR_SUBMISSIONS_THRESHOLD, 0.05
+        )
+        
+        if similar_text.strip():
+            start = time.perf_counter()
+            matches = self.near_duplicates.query(similar_text, threshold=threshold, limit=20)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            st.caption(f"Pencarian selesai dalam {elapsed_ms:.1f} ms")
+            
+            predictions = self.db.get_predictions_by_ids([pid for pid, _ in matches])
+            if matches:
+                st.markdown(f"**Ditemukan {len(matches)} kiriman serupa:**")
+                for prediction_id, similarity in matches:
+                    pred = predictions.get(prediction_id)
+                    if pred is None:
+                        continue
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.markdown(f"**ID {prediction_id}** oleh {pred['username']} - {pred['created_at']}")
+                        st.caption(pred['input_text'][:200] + ("..." if len(pred['input_text']) > 200 else ""))
+                    with col2:
+                        st.metric("Kemiripan", f"{similarity:.0%}")
+                        st.text(f"AI: {pred['ai_probability']:.1%}")
+                    st.markdown("---")
+            else:
+                st.info("Tidak ada kiriman serupa.")
+
+    def admin_profiling(self):
+        """Admin view of inference latency per pipeline stage"""
+        st.subheader("⏱️ Profiling Inferensi")
+        
+        summary = stage_profiler.summary()
+        if summary:
+            st.dataframe(
+                [{
+                    'Tahap': row['stage'],
+                    'Jumlah': row['count'],
+                    'Rata-rata (ms)': round(row['mean_ms'], 2),
+                    'p50 (ms)': row['p50_ms'],
+                    'p95 (ms)': row['p95_ms'],
+                    'p99 (ms)': row['p99_ms'],
+                    'Maks (ms)': round(row['max_ms'], 2),
+                    'Total (ms)': round(row['total_ms'], 1)
+                } for row in summary],
+                use_container_width=True
+            )
+            st.caption("Persentil diperkirakan dari batas atas bucket histogram.")
+        else:
+            st.info("Belum ada data latensi. Jalankan analisis teks terlebih dahulu.")
+        
+        if st.button("🔄 Reset Statistik"):
+            stage_profiler.reset()
+            st.rerun()
+        
+        # Queue wait per user class (FairScheduler)
+        st.markdown("### 🚦 Antrian Inferensi")
+        if model_loader.is_ready() and model_loader.handler is not None:
+            queue_stats = get_scheduler(model_loader.handler).queue_stats()
+            if queue_stats:
+                st.dataframe(
+                    [{
+                        'Role': user_class,
+                        'Chunk Antri': row['queued_chunks'],
+                        'Jumlah Analisis': row['jobs'],
+                        'Tunggu Rata-rata (s)': round(row['mean_wait_s'], 2),
+                        'Tunggu p95 (s)': round(row['p95_wait_s'], 2),
+                        'Tunggu Maks (s)': round(row['max_wait_s'], 2)
+                    } for user_class, row in queue_stats.items()],
+                    use_container_width=True
+                )
+            else:
+                st.info("Belum ada analisis yang melewati antrian.")
+        else:
+            st.info("Model belum dimuat.")
+        
+        # Capture a profile for a single request
+        st.markdown("### 🔬 Profil Satu Permintaan")
+        mode = st.selectbox("Profiler:", ["cprofile", "torch"])
+        sample_text = st.text_area("Teks contoh:", height=150, key="profiling_text")
+        
+        if st.button("▶️ Jalankan dengan Profiler") and sample_text.strip():
+            model_handler = self.get_model_handler()
+            if model_handler:
+                with st.spinner("🔄 Menjalankan profiler..."):
+                    try:
+                        model_handler.predict_text(sample_text, profile=mode)
+                    except Exception as e:
+                        st.error(f"❌ Gagal menjalankan profiler: {str(e)}")
+                        logger.error(f"Profiling error: {str(e)}")
+        
+        for capture in stage_profiler.captures:
+            with st.expander(f"{capture['started_at']} - {capture['mode']} - {capture['label']} ({capture['duration_ms']:.0f} ms)"):
+                st.code(capture['report'])
 
 
 
 
     
+    def admin_model_versions(self):
+        """Admin hot-swap of LoRA adapter versions and shadow scoring"""
+        st.subheader("🔁 Versi Model")
+        
+        if not model_loader.is_ready():
+            st.info("Model masih dimuat...")
+            return
+        manager = self.get_model_handler()
+        if manager is None:
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Versi Aktif", manager.version)
+        with col2:
+            st.metric("Kandidat (shadow)", manager.candidate_version or "-")
+        with col3:
+            st.metric("Status", manager.status)
+        if manager.last_error:
+            st.error(f"❌ Gagal memuat versi baru: {manager.last_error}")
+        
+        st.markdown("### 🚀 Deploy Versi Baru")
+        adapter_path = st.text_input("Folder adapter LoRA:", placeholder="adapters/indobert_ai_detector_v2")
+        version = st.text_input("Label versi (opsional):")
+        sample_rate = st.slider("Fraksi traffic untuk shadow:", 0.0, 1.0, manager.shadow_sample_rate, 0.05)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🚀 Deploy Langsung", disabled=not adapter_path):
+                try:
+                    manager.deploy(adapter_path, version or None)
+                    st.success("✅ Versi baru dimuat di background; traffic pindah setelah warm-up.")
+                except Exception as e:
+                    st.error(f"❌ {str(e)}")
+        with col2:
+            if st.button("👥 Jalankan sebagai Shadow", disabled=not adapter_path):
+                try:
+                    manager.start_shadow(adapter_path, version or None, sample_rate=sample_rate)
+                    st.success("✅ Kandidat dimuat di background.")
+                except Exception as e:
+                    st.error(f"❌ {str(e)}")
+        
+        if manager.candidate_version:
+            st.markdown("### 👥 Perbandingan Shadow")
+            stats = manager.shadow_stats.summary()
+            if stats['samples']:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Sampel", stats['samples'])
+                col2.metric("Kesepakatan Verdict", f"{stats['verdict_agreement']:.1%}")
+                col3.metric("Selisih Rata-rata", f"{stats['mean_abs_diff']:.3f}")
+                col4.metric("Latensi (aktif → kandidat)", f"{stats['active_mean_ms']:.0f} → {stats['candidate_mean_ms']:.0f} ms")
+            else:
+                st.info("Belum ada sampel shadow.")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✅ Promosikan Kandidat"):
+                    manager.promote()
+                    st.rerun()
+            with col2:
+                if st.button("🛑 Hentikan Shadow"):
+                    manager.stop_shadow()
+                    st.rerun()
+        
+        if manager.history:
+            st.markdown("### 📜 Riwayat")
+            for timestamp, event, event_version in reversed(manager.history):
+                st.text(f"{timestamp}  {event}: {event_version}")
+    
     def detection_page(self):
         """Text detection page"""
         st.header("🔍 Analisis Teks AI")
@@ -387,7 +656,30 @@ class AITextDetectorApp:
                 help="Masukkan teks bahasa Indonesia yang ingin Anda periksa"
             )
             
+            # One LoRA adapter per text domain on a shared base model
+            domain = None
+            if Config.DOMAIN_ADAPTERS:
+                domain = st.selectbox(
+                    "Jenis teks:",
+                    [Config.DEFAULT_ADAPTER] + list(Config.DOMAIN_ADAPTERS),
+                    help="Pilih model yang dilatih untuk jenis teks ini"
+                )
+            
+            # Long texts can run as a persistent job that survives closing the page
+            background = False
+            if Config.CHUNKING_MODE == 'fixed':
+                background = st.checkbox(
+                    "🕒 Proses di latar belakang",
+                    help="Untuk teks panjang: analisis tetap berjalan walau halaman ditutup"
+                )
+            
             analyze_button = st.button("🔬 Analisis Teks", type="primary", use_container_width=True)
+            
+            job_lookup = st.text_input(
+                "ID pekerjaan (opsional):",
+                value=st.query_params.get('job', ''),
+                help="Masukkan ID pekerjaan untuk melihat hasil analisis di latar belakang"
+            )
         
         with col2:
             st.markdown("### 💡 Tips Penggunaan")
@@ -408,27 +700,66 @@ class AITextDetectorApp:
         
         # Analysis results
         if analyze_button and input_text.strip() and st.session_state.analisis_text is None:
-            if not self.model_handler:
+            if not self.get_model_handler():
                 st.error("❌ Model belum dimuat. Silakan muat ulang halaman.")
                 return
             
-            with st.spinner("🔄 Menganalisis teks..."):
+            if background:
                 try:
-                    # Get prediction
-                    result = self.model_handler.predict_text(input_text)
+                    job_id = get_job_store().enqueue(
+                        self.auth.get_current_user_id(), input_text,
+                        user_class=self.auth.get_current_user_role(), adapter=domain,
+                        owner=self.auth.get_quota_key()
+                    )
+                    # Keep the ID in the URL so a reload or bookmark comes back to it
+                    st.query_params['job'] = job_id
+                    job_lookup = job_id
+                    st.success(f"✅ Analisis dijadwalkan dengan ID pekerjaan **{job_id}**. Simpan ID ini untuk kembali nanti.")
+                except Exception as e:
+                    st.error(f"❌ Gagal menjadwalkan analisis: {str(e)}")
+                    logger.error(f"Job enqueue error: {str(e)}")
+            
+            else:
+                try:
+                    # Reuse chunk scores of a near-duplicate earlier submission
+                    # (stored scores come from the default adapter)
+                    known_scores, near_duplicate = None, None
+                    if domain in (None, Config.DEFAULT_ADAPTER):
+                        known_scores, near_duplicate = self.find_near_duplicate(input_text)
+                    
+                    # Stream the prediction through the per-user fair scheduler
+                    options = {'adapter': domain} if domain else {}
+                    updates = get_scheduler(self.model_handler).stream(
+                        self.auth.get_quota_key(), input_text,
+                        user_class=self.auth.get_current_user_role(),
+                        known_scores=known_scores, **options
+                    )
+                    result = self.show_live_analysis(updates)
+                    if near_duplicate is not None:
+                        result['near_duplicate_of'] = {
+                            'prediction_id': near_duplicate[0],
+                            'similarity': near_duplicate[1]
+                        }
                     st.session_state.analisis_text = result
                 
+                except RateLimitExceeded as e:
+                    st.warning(f"⏳ Kuota analisis Anda sudah habis. Coba lagi dalam {e.retry_after:.0f} detik.")
                 except Exception as e:
                     st.error(f"❌ Terjadi kesalahan saat analisis: {str(e)}")
                     logger.error(f"Prediction error: {str(e)}")
                     
         elif analyze_button:
             st.warning("⚠️ Silakan masukkan teks terlebih dahulu!")
+        
+        if job_lookup.strip() and st.session_state.analisis_text is None:
+            self.show_job(job_lookup.strip())
             
         # Display results
         if st.session_state.analisis_text != None:
             st.markdown("---")
             st.header("📋 Hasil Analisis")
+            # A job result may belong to a text that is no longer in the text area
+            input_text = getattr(st.session_state.analisis_text, 'text', input_text)
             
             # Main result
             col1, col2, col3 = st.columns(3)
@@ -452,6 +783,13 @@ class AITextDetectorApp:
                     "Total Bagian",
                     st.session_state.analisis_text['total_chunks']
                 )
+                if st.session_state.analisis_text.get('scoring_path') == 'cascade_early_exit':
+                    st.caption(f"⚡ Analisis cepat: {st.session_state.analisis_text['chunks_scored']} bagian dinilai, hasil sudah jelas")
+                elif st.session_state.analisis_text.get('scoring_path') == 'near_duplicate':
+                    st.caption(
+                        f"♻️ Mirip kiriman sebelumnya ({st.session_state.analisis_text['near_duplicate_of']['similarity']:.0%}): "
+                        f"{st.session_state.analisis_text['chunks_reused']} bagian memakai skor tersimpan"
+                    )
             
             # Confidence gauge
             col1, col2 = st.columns([1, 1])
@@ -504,8 +842,13 @@ class AITextDetectorApp:
                     input_text,
                     st.session_state.analisis_text['ai_probability'],
                     st.session_state.analisis_text['is_ai_generated'],
-                    st.session_state.analisis_text['highlighted_parts']
+                    st.session_state.analisis_text['highlighted_parts'],
+                    st.session_state.analisis_text.get('model_version')
                 )
+                # Index each analysis once, not on every rerun
+                if st.session_state.get('indexed_result') is not st.session_state.analisis_text:
+                    self.index_prediction(prediction_id, input_text, st.session_state.analisis_text)
+                    st.session_state.indexed_result = st.session_state.analisis_text
                 
                 # Download result
                 col1, col2 = st.columns(2)
@@ -522,6 +865,76 @@ class AITextDetectorApp:
                     if st.button("💾 Simpan ke Riwayat"):
                         st.success(f"✅ Hasil disimpan dengan ID: {prediction_id}")
     
+    def show_job(self, job_id):
+        """Progress of a background job; puts its result on the page once it is done"""
+        job_store = get_job_store()
+        job = job_store.get(job_id, owner=self.auth.get_quota_key())
+        if job is None:
+            st.warning(f"⚠️ Pekerjaan {job_id} tidak ditemukan.")
+            return
+        
+        model_handler = self.get_model_handler()
+        if not model_handler:
+            return
+        
+        if job['status'] == 'done':
+            st.session_state.analisis_text = job_store.load_result(job, model_handler)
+            return
+        if job['status'] == 'failed':
+            st.error(f"❌ Pekerjaan {job_id} gagal: {job['error']}")
+            return
+        
+        status = "menunggu antrian" if job['status'] == 'queued' else "sedang dianalisis"
+        st.info(f"🕒 Pekerjaan **{job_id}** {status}. Anda boleh menutup halaman ini dan kembali dengan ID ini.")
+        st.progress(min(job['progress'], 1.0), text=f"{job['chunks_done']} bagian dinilai")
+        if job['ai_probability'] is not None:
+            st.metric("Probabilitas AI (sementara)", f"{job['ai_probability']:.1%}")
+        if st.button("🔄 Perbarui Status"):
+            st.rerun()
+    
+    def show_live_analysis(self, updates):
+        """
+        Render running probability, gauge and chunk table while a streamed
+        analysis progresses; returns the final result
+        """
+        progress = st.progress(0.0, text="🔄 Menganalisis teks...")
+        live = st.empty()
+        rows = []
+        # A rerun or Stop interrupts the loop; closing the stream cancels the job
+        with closing(updates):
+            for step, update in enumerate(updates):
+                if update.done:
+                    break
+                for chunk_id, ai_prob in zip(update.chunk_ids.tolist(), update.probabilities.tolist()):
+                    rows.append({
+                        'Bagian': chunk_id + 1,
+                        'Probabilitas AI': f"{ai_prob:.1%}",
+                        'Hasil': "🚨 AI" if ai_prob > Config.AI_THRESHOLD else "✅ Manusia"
+                    })
+                progress.progress(
+                    min(update.progress, 1.0),
+                    text=f"🔄 Menganalisis teks... {update.chunks_scored} bagian dinilai"
+                )
+                with live.container():
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        st.metric(
+                            "Probabilitas AI (sementara)",
+                            f"{update.ai_probability:.1%}",
+                            delta="AI" if update.is_ai_generated else "Manusia"
+                        )
+                        # Keyed per update: the same probability twice would otherwise repeat an element ID
+                        st.plotly_chart(
+                            Utils.create_confidence_gauge(update.ai_probability),
+                            use_container_width=True, key=f"live_gauge_{step}"
+                        )
+                    with col2:
+                        st.dataframe(rows, use_container_width=True, hide_index=True)
+        
+        progress.empty()
+        live.empty()
+        return update.result
+    
     def dashboard_page(self):
         if st.session_state.authenticated == True:
             """Dashboard page with statistics and visualizations"""
@@ -561,7 +974,7 @@ class AITextDetectorApp:
                 # Regular user dashboard
                 user_id = self.auth.get_current_user_id()
                 user_stats = self.db.get_user_stats(user_id)
-                predictions = self.db.get_user_predictions(user_id, limit=100)
+                predictions = self.db.get_user_predictions(user_id, limit=5)
                 
                 # Key metrics
                 col1, col2, col3, col4 = st.columns(4)
@@ -589,16 +1002,18 @@ class AITextDetectorApp:
                             st.plotly_chart(stats_fig, use_container_width=True)
                     
                     with col2:
-                        # History chart
-                        history_fig = Utils.create_prediction_history_chart(predictions)
+                        # History chart over the whole history (aggregated past
+                        # MAX_CHART_POINTS); loaded only when the cached figure is stale
+                        history_fig = Utils.create_prediction_history_chart(
+                            lambda: self.db.get_user_prediction_points(user_id),
+                            fingerprint=self.db.get_predictions_fingerprint(user_id)
+                        )
                         if history_fig:
                             st.plotly_chart(history_fig, use_container_width=True)
                     
                     # Recent predictions
                     st.subheader("🕒 Prediksi Terbaru")
-                    recent_predictions = predictions[:5]
-                    
-                    for pred in recent_predictions:
+                    for pred in predictions:
                         Utils.display_prediction_card(pred)
                 
                 else:
@@ -4,11 +4,46 @@ Authentication functions for AI Text Detector
 
 import streamlit as st
 import re
+import hmac
+import hashlib
+import secrets
+import time
+from config import Config
 from database import Database
 
+# Key for signing session tokens; random per process unless configured
+_SESSION_SECRET = (Config.SESSION_SECRET or secrets.token_hex(32)).encode('utf-8')
+
 class Auth:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        self.db = db if db is not None else Database()
+    
+    def issue_session_token(self, user_id, username, role):
+        """Create a signed token so later reruns don't need bcrypt or the users table"""
+        expires_at = int(time.time()) + Config.SESSION_TIMEOUT
+        payload = f"{user_id}:{username}:{role}:{expires_at}"
+        signature = hmac.new(_SESSION_SECRET, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"{payload}:{signature}"
+    
+    def verify_session_token(self, token):
+        """
+        Verify a session token
+        Returns: (user_id, username, role) or None if invalid/expired
+        """
+        if not token:
+            return None
+        try:
+            payload, signature = token.rsplit(':', 1)
+            user_id, username, role, expires_at = payload.split(':')
+        except ValueError:
+            return None
+        
+        expected = hmac.new(_SESSION_SECRET, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return None
+        if int(expires_at) < time.time():
+            return None
+        return int(user_id), username, role
     
     def validate_email(self, email):
         """Validate email format"""
@@ -50,6 +85,7 @@ class Auth:
                         st.session_state.user_id = user_id
                         st.session_state.username = username
                         st.session_state.user_role = role
+                        st.session_state.session_token = self.issue_session_token(user_id, username, role)
                         st.session_state.authenticated = True
                         st.session_state.login = False
                         st.success("Login berhasil!")
@@ -118,7 +154,7 @@ class Auth:
     def logout(self):
         """Logout user"""
         st.session_state.authenticated = False
-        for key in ['user_id', 'username', ]:
+        for key in ['user_id', 'username', 'session_token']:
             if key in st.session_state:
                 del st.session_state[key]
         st.session_state.show_detailed_analysis = False
@@ -145,6 +181,22 @@ class Auth:
         """Get current username"""
         return st.session_state.get('username')
     
+    def get_quota_key(self):
+        """
+        Key for per-user rate limits: the user ID, or a per-session ID for guests
+        A guest bucket lasts only as long as the browser session: a guest who
+        opens a new session starts with a full bucket, so guests can exceed
+        USER_CHUNKS_PER_MINUTE that way. Keying by client address instead
+        would put every guest behind the same proxy or NAT in one bucket;
+        logged-in users are limited per account.
+        """
+        user_id = self.get_current_user_id()
+        if user_id is not None:
+            return user_id
+        if 'guest_id' not in st.session_state:
+            st.session_state.guest_id = f"guest-{secrets.token_hex(8)}"
+        return st.session_state.guest_id
+    
     def authentication_page(self):
         """Display authentication page"""
         st.title("🤖 Detector Teks AI Indonesia")
@@ -206,4 +258,17 @@ class Auth:
         if 'show_detailed_analysis' not in st.session_state:
             st.session_state.show_detailed_analysis = False
         if 'analisis_text' not in st.session_state:
-            st.session_state.analisis_text = None
\ No newline at end of file
+            st.session_state.analisis_text = None
+        
+        # Check the signed session token instead of re-querying the database
+        if st.session_state.authenticated:
+            session = self.verify_session_token(st.session_state.get('session_token'))
+            if session is None or session[0] != st.session_state.user_id:
+                st.session_state.authenticated = False
+                st.session_state.user_id = None
+                st.session_state.username = None
+                st.session_state.user_role = 'user'
+                st.session_state.session_token = None
+            else:
+                # Role comes from the signed token, not from mutable session state
+                st.session_state.user_role = session[2]
\ No newline at end of file
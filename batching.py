@@ -0,0 +1,32 @@
+"""
+Batch planning helpers for AI Text Detector
+"""
+
+def round_up(value, multiple):
+    """Round value up to the next multiple (multiple <= 1 leaves it unchanged)"""
+    if multiple <= 1:
+        return value
+    return ((value + multiple - 1) // multiple) * multiple
+
+def plan_length_buckets(lengths, batch_size, pad_to_multiple_of=8, max_length=None):
+    """
+    Group inputs of similar token length into batches
+    
+    Inputs are sorted by length and cut into batches of at most batch_size,
+    so each batch is padded only to its own longest input (rounded up to
+    pad_to_multiple_of). Returns: list of (indices, padded_length), where
+    indices refer to positions in `lengths`.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets = []
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        padded_length = round_up(max(lengths[i] for i in indices), pad_to_multiple_of)
+        if max_length is not None:
+            padded_length = min(padded_length, max_length)
+        buckets.append((indices, padded_length))
+    return buckets
+
+def padded_tokens(buckets):
+    """Total token positions processed for a bucket plan, padding included"""
+    return sum(len(indices) * padded_length for indices, padded_length in buckets)
@@ -0,0 +1,107 @@
+"""
+Offline evaluation of cascade (early-exit) scoring.
+
+Scores every document twice - full scoring and cascade - and reports the
+speedup against agreement with full scoring (same verdict, probability
+difference, share of early exits).
+
+By default the tiny offline model is used; its scores sit in a narrow
+band, so use --threshold to move AI_THRESHOLD around and exercise both
+the early-exit and fallback paths. Pass --real-model to load the
+configured IndoBERT + LoRA model instead.
+
+Usage:
+    python benchmarks/cascade_eval.py [--documents 20] [--threshold 0.7] [--real-model]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import generate_text
+
+
+def evaluate(handler, documents):
+    rows = []
+    for text in documents:
+        start = time.perf_counter()
+        full = handler.predict_text(text, cascade=False)
+        full_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        cascade = handler.predict_text(text, cascade=True)
+        cascade_ms = (time.perf_counter() - start) * 1000
+
+        rows.append({
+            'chunks': full['total_chunks'],
+            'chunks_scored': cascade.get('chunks_scored', cascade['total_chunks']),
+            'path': cascade.get('scoring_path', 'full'),
+            'full_ms': full_ms,
+            'cascade_ms': cascade_ms,
+            'agree': full['is_ai_generated'] == cascade['is_ai_generated'],
+            'probability_diff': abs(full['ai_probability'] - cascade['ai_probability'])
+        })
+    return rows
+
+
+def summarize(rows):
+    early = [row for row in rows if row['path'] == 'cascade_early_exit']
+    return {
+        'documents': len(rows),
+        'early_exit_rate': len(early) / len(rows),
+        'agreement': sum(row['agree'] for row in rows) / len(rows),
+        'agreement_early_exit': (sum(row['agree'] for row in early) / len(early)) if early else None,
+        'mean_probability_diff': statistics.mean(row['probability_diff'] for row in rows),
+        'max_probability_diff': max(row['probability_diff'] for row in rows),
+        'chunks_scored_fraction': sum(row['chunks_scored'] for row in rows) / sum(row['chunks'] for row in rows),
+        'speedup': sum(row['full_ms'] for row in rows) / sum(row['cascade_ms'] for row in rows)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=20)
+    parser.add_argument('--min-words', type=int, default=2000)
+    parser.add_argument('--max-words', type=int, default=20000)
+    parser.add_argument('--threshold', type=float, help='Override Config.AI_THRESHOLD')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real-model', action='store_true')
+    parser.add_argument('--details', action='store_true', help='Include per-document rows')
+    args = parser.parse_args()
+
+    if args.threshold is not None:
+        Config.AI_THRESHOLD = args.threshold
+
+    if args.real_model:
+        from model_handler import ModelHandler
+
+        handler = ModelHandler()
+        handler.load_model()
+    else:
+        from tiny_model import build_tiny_handler
+
+        handler = build_tiny_handler(seed=args.seed)
+
+    rng = random.Random(args.seed)
+    documents = [
+        generate_text(rng.randint(args.min_words, args.max_words), seed=args.seed * 1000 + i)
+        for i in range(args.documents)
+    ]
+    handler.predict_text(documents[0][:500])  # warm-up
+
+    rows = evaluate(handler, documents)
+    report = {'threshold': Config.AI_THRESHOLD, 'summary': summarize(rows)}
+    if args.details:
+        report['documents'] = rows
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
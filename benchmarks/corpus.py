@@ -0,0 +1,104 @@
+"""
+Reproducible synthetic Indonesian corpus for benchmarks.
+
+The text is not meant to be meaningful, only to look like Indonesian
+prose to the preprocessor and tokenizer: varied sentence lengths,
+abbreviations, numbers, percentages and punctuation.
+"""
+
+import random
+
+SUBJEK = [
+    'Pemerintah', 'Masyarakat', 'Para mahasiswa', 'Guru itu', 'Perusahaan tersebut',
+    'Tim peneliti', 'Warga desa', 'Dr. Siti', 'Bapak Budi', 'Kementerian Pendidikan',
+    'Penulis', 'Sebagian besar responden', 'Dinas kesehatan', 'Anak-anak', 'Pengusaha lokal'
+]
+PREDIKAT = [
+    'meningkatkan', 'membahas', 'menganalisis', 'mengembangkan', 'menyampaikan',
+    'memperkenalkan', 'mendukung', 'menolak', 'mempelajari', 'membangun',
+    'mengevaluasi', 'menjelaskan', 'memperbaiki', 'menerapkan', 'mengukur'
+]
+OBJEK = [
+    'kualitas pendidikan', 'program kerja baru', 'kebijakan ekonomi daerah',
+    'teknologi kecerdasan buatan', 'infrastruktur jalan', 'hasil penelitian',
+    'sistem informasi sekolah', 'kesejahteraan petani', 'layanan kesehatan',
+    'budaya membaca', 'data statistik', 'rencana pembangunan', 'produk UMKM'
+]
+KETERANGAN = [
+    'pada tahun ini', 'di wilayah Jawa Barat', 'secara bertahap', 'dengan cepat',
+    'dalam beberapa bulan terakhir', 'sesuai dengan peraturan yang berlaku',
+    'bersama pemangku kepentingan', 'di tengah pandemi', 'melalui kerja sama',
+    'tanpa dukungan anggaran', 'menurut laporan resmi', 'di kota besar dll.'
+]
+PENGHUBUNG = [
+    'Selain itu,', 'Namun,', 'Oleh karena itu,', 'Di sisi lain,', 'Akibatnya,',
+    'Meskipun demikian,', 'Sementara itu,', 'Dengan demikian,', 'Pertama,', 'Kedua,'
+]
+ANGKA = [
+    'sebesar {p}%', 'hingga {n} orang', 'sekitar {d} persen', 'pada No. {n}',
+    'senilai Rp {n}.000', 'sebanyak {n} unit'
+]
+
+# Target word counts per text size
+SIZES = {
+    'short': 60,
+    'medium': 600,
+    'book': 20000
+}
+
+
+def generate_sentence(rng):
+    """Generate one pseudo-Indonesian sentence"""
+    parts = []
+    if rng.random() < 0.3:
+        parts.append(rng.choice(PENGHUBUNG))
+    parts.append(rng.choice(SUBJEK))
+    parts.append(rng.choice(PREDIKAT))
+    parts.append(rng.choice(OBJEK))
+    if rng.random() < 0.6:
+        parts.append(rng.choice(KETERANGAN))
+    if rng.random() < 0.3:
+        parts.append(rng.choice(ANGKA).format(
+            p=rng.randint(1, 99), n=rng.randint(2, 5000), d=f"{rng.randint(1, 99)},{rng.randint(0, 9)}"
+        ))
+    if rng.random() < 0.25:
+        parts.append('dan ' + rng.choice(PREDIKAT) + ' ' + rng.choice(OBJEK))
+    sentence = ' '.join(parts)
+    return sentence[0].upper() + sentence[1:] + rng.choice(['.', '.', '.', '!', '?'])
+
+
+def generate_text(n_words, seed=0):
+    """Generate a text of roughly n_words words, deterministic for a given seed"""
+    rng = random.Random(seed)
+    sentences = []
+    words = 0
+    while words < n_words:
+        sentence = generate_sentence(rng)
+        sentences.append(sentence)
+        words += len(sentence.split())
+        # Paragraph breaks every few sentences
+        if rng.random() < 0.15:
+            sentences.append('\n\n')
+    return ' '.join(sentences).replace(' \n\n ', '\n\n')
+
+
+def generate_corpus(sizes=None, texts_per_size=3, seed=0):
+    """
+    Generate the benchmark corpus
+    Returns: dict of size name -> list of texts
+    """
+    sizes = sizes or SIZES
+    return {
+        name: [generate_text(n_words, seed=seed * 1000 + i) for i in range(texts_per_size)]
+        for name, n_words in sizes.items()
+    }
+
+
+def vocabulary():
+    """All words the generator can emit, for building an offline tokenizer vocab"""
+    words = set()
+    for group in (SUBJEK, PREDIKAT, OBJEK, KETERANGAN, PENGHUBUNG, ANGKA):
+        for phrase in group:
+            words.update(phrase.lower().replace(',', ' ').replace('.', ' ').split())
+    words.update(['dan', 'persen', 'rp'])
+    return sorted(words)
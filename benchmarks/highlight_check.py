@@ -0,0 +1,75 @@
+"""
+Checks for Utils.highlight_ai_text on multi-paragraph text.
+
+A highlighted span must never contain a line break: the markdown renderer
+closes the paragraph at a blank line, which would leave the <span> open
+and unstyle (or swallow) the rest of the text. For each case this checks
+that
+  - no <span> contains a newline,
+  - the expected number of spans is emitted,
+  - removing the tags and unescaping gives back the original text.
+Exits with status 1 if any case fails.
+
+Usage:
+    python benchmarks/highlight_check.py
+"""
+
+import html
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import Utils
+
+SPAN = re.compile(r'<span class="ai-highlight"[^>]*>(.*?)</span>', re.DOTALL)
+TAG = re.compile(r'</?span[^>]*>')
+
+
+def whole(text, probability=0.9):
+    return [{'text': text, 'start': 0, 'end': len(text), 'probability': probability}]
+
+
+def part(text, fragment, probability=0.8):
+    start = text.index(fragment)
+    return {'text': fragment, 'start': start, 'end': start + len(fragment), 'probability': probability}
+
+
+def cases():
+    two = "Paragraf pertama ditulis oleh mesin.\n\nParagraf kedua juga."
+    three = "Satu.\n\nDua <b>&</b> dua.\r\n\r\nTiga.\nEmpat."
+    inner = "Awal teks.\n\nKalimat ini dari AI. Kalimat ini juga.\n\nPenutup."
+    return [
+        ('two paragraphs, one highlight', two, whole(two), 2),
+        ('CRLF, single newline and markup', three, whole(three), 4),
+        ('highlight ends inside a paragraph', inner, [part(inner, "Awal teks.\n\nKalimat ini dari AI.")], 2),
+        ('highlight within one paragraph', inner, [part(inner, "Kalimat ini juga.")], 1),
+        ('overlapping highlights across a break', two,
+         [part(two, "pertama ditulis oleh mesin.\n\nParagraf"), part(two, "mesin.\n\nParagraf kedua")], 3),
+        ('nothing highlighted', two, [], 0),
+    ]
+
+
+def check(name, text, parts, expected_spans):
+    rendered = Utils.highlight_ai_text(text, parts)
+    spans = SPAN.findall(rendered)
+    problems = []
+    if any('\n' in span for span in spans):
+        problems.append("span crosses a line break")
+    if len(spans) != expected_spans:
+        problems.append(f"{len(spans)} spans, expected {expected_spans}")
+    if html.unescape(TAG.sub('', rendered)) != text:
+        problems.append("text not preserved")
+    print(f"{'ok  ' if not problems else 'FAIL'} {name}" + (f": {'; '.join(problems)}" if problems else ''))
+    return not problems
+
+
+def main():
+    results = [check(*case) for case in cases()]
+    print(f"\n{sum(results)}/{len(results)} passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
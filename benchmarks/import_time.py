@@ -0,0 +1,107 @@
+"""
+Import-time profile for the Streamlit entry point.
+
+Runs `python -X importtime -c "import streamlit; import app"` in a fresh
+interpreter. Everything imported up to the end of `import streamlit` is
+the framework baseline; what `import app` loads on top of it is ours, and
+must not include the heavy ML / plotting stacks. A module streamlit has
+already loaded costs the app nothing and is listed, not failed. Exits
+with status 1 when the check fails, so it can gate CI.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 1500] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on demand
+DEFERRED_MODULES = ['torch', 'transformers', 'peft', 'pandas', 'plotly', 'model_handler']
+
+
+def profile_imports(statement='import app'):
+    """Return a list of (module, self_us, cumulative_us, depth) for running `statement`, in import order"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    # app.py opens Config.LOG_FILE at import time; run in a scratch dir
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, 'logs'), exist_ok=True)
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"`{statement}` failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2]
+        # Top-level imports have one space after the bar, each nesting level two more
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), self_us, cumulative_us, depth))
+    return entries
+
+
+def split_baseline(entries, framework='streamlit'):
+    """
+    Split entries at the end of the top-level import of `framework`
+    Returns: (framework entries, entries imported after it)
+    """
+    # -X importtime prints a module after its children, so the framework's
+    # own line closes its block
+    end = next(i for i, (name, _, _, depth) in enumerate(entries) if name == framework and depth == 0)
+    return entries[:end + 1], entries[end + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget-ms', type=float, default=1500.0,
+                        help='Maximum cumulative import time of app.py')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Number of slowest imports to print')
+    args = parser.parse_args()
+
+    baseline, ours = split_baseline(profile_imports('import streamlit; import app'))
+    baseline_ms = baseline[-1][2] / 1000
+    app_ms = next(cum for name, _, cum, depth in ours if name == 'app' and depth == 0) / 1000
+    total_ms = baseline_ms + app_ms
+
+    print(f"import app: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"  import streamlit (baseline): {baseline_ms:.1f} ms")
+    print(f"  on top of it:                {app_ms:.1f} ms")
+    print("Slowest modules imported by app on top of streamlit:")
+    # Direct imports of app.py and the packages they pull in first
+    top_level = [e for e in ours if e[3] == 1 and '.' not in e[0]]
+    for name, _, cumulative, _ in sorted(top_level, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    imported = {name.split('.')[0] for name, _, _, _ in ours}
+    leaked = sorted(m for m in DEFERRED_MODULES if m in imported)
+    if leaked:
+        failures.append(f"heavy modules imported at startup: {', '.join(leaked)}")
+    preloaded = sorted(m for m in DEFERRED_MODULES if m in {name.split('.')[0] for name, _, _, _ in baseline})
+    if preloaded:
+        print(f"Already imported by streamlit (no cost to app): {', '.join(preloaded)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+End-to-end inference benchmark.
+
+Drives TextPreprocessor.preprocess_for_model, ModelHandler.predict_text and
+ModelHandler.get_sentence_level_predictions over the synthetic corpus with a
+tiny random BERT on CPU, and reports per-stage latency, throughput and peak
+RSS as JSON. Stage timings are the stage_profiler spans recorded inside
+real predict_text calls, so they follow the production code path.
+
+Usage:
+    python benchmarks/inference_bench.py run [--output results.json] [--repeats 3]
+    python benchmarks/inference_bench.py compare old.json new.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import SIZES, generate_corpus
+from tiny_model import build_tiny_handler
+
+# stage_profiler spans inside predict_text; 'other' is the rest of its time
+STAGES = ['clean', 'chunk', 'tokenize', 'pad', 'device_transfer', 'forward', 'softmax', 'aggregate', 'other']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def profile_stages(handler, text):
+    """
+    Time one handler.predict_text call and split it by the stage_profiler
+    spans recorded during it
+    Returns: (ms per stage, predict_text ms, number of chunks)
+    """
+    totals = {}
+
+    def collect(stage, seconds):
+        totals[stage] = totals.get(stage, 0.0) + seconds
+
+    handler.profiler.add_listener(collect)
+    try:
+        start = time.perf_counter()
+        result = handler.predict_text(text)
+        elapsed = time.perf_counter() - start
+    finally:
+        handler.profiler.listeners.remove(collect)
+
+    stages = {stage: totals.get(stage, 0.0) * 1000 for stage in STAGES if stage != 'other'}
+    stages['other'] = max(elapsed * 1000 - sum(stages.values()), 0.0)
+    return stages, elapsed * 1000, result['total_chunks']
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_benchmark(repeats=3, texts_per_size=2, sentences=True, seed=0):
+    handler = build_tiny_handler(seed=seed)
+    corpus = generate_corpus(texts_per_size=texts_per_size, seed=seed)
+
+    # Warm-up so lazy initialization doesn't land in the first measurement
+    handler.predict_text(corpus['short'][0])
+
+    results = {}
+    for size, texts in corpus.items():
+        stage_samples = {stage: [] for stage in STAGES}
+        predict_samples = []
+        sentence_samples = []
+        preprocess_samples = []
+        total_words = total_chunks = 0
+
+        for text in texts:
+            for _ in range(repeats):
+                stages, predict_ms, n_chunks = profile_stages(handler, text)
+                for stage, ms in stages.items():
+                    stage_samples[stage].append(ms)
+                predict_samples.append(predict_ms)
+                preprocess_samples.append(time_call(handler.preprocessor.preprocess_for_model, text))
+                if sentences:
+                    sentence_samples.append(time_call(handler.get_sentence_level_predictions, text))
+            total_words += len(handler.preprocessor.clean_words_with_offsets(text))
+            total_chunks += n_chunks
+
+        mean_predict_s = statistics.mean(predict_samples) / 1000
+        results[size] = {
+            'target_words': SIZES[size],
+            'words_per_text': total_words / len(texts),
+            'chunks_per_text': total_chunks / len(texts),
+            'stages_ms': {stage: statistics.median(samples) for stage, samples in stage_samples.items()},
+            'preprocess_for_model_ms': statistics.median(preprocess_samples),
+            'predict_text_ms': statistics.median(predict_samples),
+            'sentence_level_ms': statistics.median(sentence_samples) if sentence_samples else None,
+            'throughput': {
+                'words_per_s': (total_words / len(texts)) / mean_predict_s,
+                'chunks_per_s': (total_chunks / len(texts)) / mean_predict_s
+            }
+        }
+
+    import torch
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'threads': torch.get_num_threads(),
+            'machine': platform.machine(),
+            'repeats': repeats,
+            'texts_per_size': texts_per_size,
+            'seed': seed,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def flatten_metrics(report):
+    """Latency metrics as {'size.metric': ms}; higher is worse for all of them"""
+    metrics = {}
+    for size, result in report['results'].items():
+        for stage, ms in result['stages_ms'].items():
+            metrics[f'{size}.{stage}'] = ms
+        for key in ('preprocess_for_model_ms', 'predict_text_ms', 'sentence_level_ms'):
+            if result.get(key) is not None:
+                metrics[f'{size}.{key}'] = result[key]
+    metrics['peak_rss_mb'] = report['peak_rss_mb']
+    return metrics
+
+
+def compare_reports(old, new, threshold=0.10, min_ms=0.5):
+    """
+    Compare two benchmark reports
+    Returns: list of dicts, one per metric, with a 'regression' flag
+    """
+    old_metrics = flatten_metrics(old)
+    new_metrics = flatten_metrics(new)
+    rows = []
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[name], new_metrics[name]
+        change = (after - before) / before if before else 0.0
+        rows.append({
+            'metric': name,
+            'old': before,
+            'new': after,
+            'change': change,
+            # Ignore noise on sub-millisecond stages
+            'regression': change > threshold and (after - before) > min_ms
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmark')
+    run_parser.add_argument('--output', help='Write the JSON report to this file')
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--texts-per-size', type=int, default=2)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--skip-sentences', action='store_true',
+                            help='Skip get_sentence_level_predictions (slow on book-length texts)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two JSON reports')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Relative slowdown that counts as a regression')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run_benchmark(
+            repeats=args.repeats,
+            texts_per_size=args.texts_per_size,
+            sentences=not args.skip_sentences,
+            seed=args.seed
+        )
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(output)
+        print(output)
+        return
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows = compare_reports(old, new, threshold=args.threshold)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['metric']:40s} {row['old']:10.2f} -> {row['new']:10.2f} ({row['change']:+7.1%}) {flag}")
+
+    regressions = [row for row in rows if row['regression']]
+    print(json.dumps({'regressions': [row['metric'] for row in regressions]}))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Multi-adapter serving benchmark: memory and mixed-adapter throughput.
+
+Builds a random BERT base (offline) and --adapters random LoRA adapters,
+then reports
+  - parameter memory of one shared base with all adapters vs one full
+    model per adapter,
+  - throughput and latency for mixed traffic (each request picks a random
+    adapter) sent by --clients concurrent clients, served
+      sequential: MultiAdapterHandler.predict_text per request
+      batched:    AdapterBatcher, requests grouped by adapter
+    with the number of adapter switches in each run.
+
+Usage:
+    python benchmarks/multi_adapter_bench.py [--adapters 3] [--requests 192] [--clients 16]
+        [--min-words 20] [--max-words 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate_text
+from metrics import ADAPTER_SWITCHES_TOTAL
+from tiny_model import build_tiny_model, build_tokenizer
+
+DOMAINS = ['esai', 'berita', 'media_sosial', 'laporan', 'ulasan', 'forum']
+
+
+def save_random_adapters(vocab_size, hidden_size, layers, names, workdir, rank=8):
+    """Save one randomly initialized LoRA adapter per name; returns name -> path"""
+    import torch
+    from peft import LoraConfig, TaskType, get_peft_model
+
+    paths = {}
+    for seed, name in enumerate(names):
+        model = get_peft_model(
+            build_tiny_model(vocab_size, hidden_size=hidden_size, num_layers=layers),
+            LoraConfig(task_type=TaskType.SEQ_CLS, r=rank, lora_alpha=16,
+                       target_modules=['query', 'value'])
+        )
+        # lora_B starts at zero; randomize it so adapters really differ
+        torch.manual_seed(seed + 1)
+        for param_name, param in model.named_parameters():
+            if 'lora_B' in param_name:
+                torch.nn.init.normal_(param, std=0.02)
+        paths[name] = os.path.join(workdir, name)
+        model.save_pretrained(paths[name])
+    return paths
+
+
+def build_handler(tokenizer, hidden_size, layers, paths):
+    import torch
+    from config import Config
+    from multi_adapter import MultiAdapterHandler
+
+    names = list(paths)
+    Config.DEFAULT_ADAPTER = names[0]
+    handler = MultiAdapterHandler(adapter_path=paths[names[0]], adapters=paths)
+    handler.device = torch.device('cpu')
+    handler.tokenizer = tokenizer
+    handler.attach_adapters(build_tiny_model(len(tokenizer), hidden_size=hidden_size, num_layers=layers))
+    return handler
+
+
+def switches():
+    return ADAPTER_SWITCHES_TOTAL._values.get((), 0)
+
+
+def run_clients(requests, clients, call):
+    """Send requests from `clients` threads; returns (seconds, latencies in ms)"""
+    latencies = []
+    lock = threading.Lock()
+    pending = list(requests)
+
+    def client():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                text, adapter = pending.pop()
+            start = time.perf_counter()
+            call(text, adapter)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def summarize(seconds, latencies, switch_count):
+    return {
+        'requests_per_s': round(len(latencies) / seconds, 1),
+        'latency_ms': {
+            'p50': round(statistics.median(latencies), 1),
+            'p95': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 1)
+        },
+        'adapter_switches': switch_count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--adapters', type=int, default=3, choices=range(2, len(DOMAINS) + 1))
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--layers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=192)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--min-words', type=int, default=20)
+    parser.add_argument('--max-words', type=int, default=200)
+    parser.add_argument('--window-ms', type=float, default=10)
+    args = parser.parse_args()
+
+    from multi_adapter import AdapterBatcher
+
+    rng = random.Random(0)
+    names = DOMAINS[:args.adapters]
+    with tempfile.TemporaryDirectory(prefix='adapters_') as workdir:
+        tokenizer = build_tokenizer(workdir)
+        paths = save_random_adapters(len(tokenizer), args.hidden_size, args.layers, names, workdir)
+        handler = build_handler(tokenizer, args.hidden_size, args.layers, paths)
+
+    memory = handler.memory_report()
+    adapter_mb = max(memory['adapters_mb'].values())
+    requests = [
+        (generate_text(rng.randint(args.min_words, args.max_words), seed=i), rng.choice(names))
+        for i in range(args.requests)
+    ]
+
+    # Warm-up
+    for name in names:
+        handler.predict_text(requests[0][0], adapter=name)
+
+    before = switches()
+    seconds, latencies = run_clients(
+        requests, args.clients, lambda text, adapter: handler.predict_text(text, adapter=adapter)
+    )
+    sequential = summarize(seconds, latencies, switches() - before)
+
+    batcher = AdapterBatcher(handler, window_ms=args.window_ms)
+    before = switches()
+    seconds, latencies = run_clients(
+        requests, args.clients, lambda text, adapter: batcher.predict_text(text, adapter)
+    )
+    batched = summarize(seconds, latencies, switches() - before)
+    batcher.stop()
+
+    print(json.dumps({
+        'adapters': names,
+        'memory_mb': {
+            'shared_base': memory['base_mb'],
+            'per_adapter': adapter_mb,
+            'shared_total': memory['total_mb'],
+            'one_model_per_adapter': round(len(names) * (memory['base_mb'] + adapter_mb), 2)
+        },
+        'sequential': sequential,
+        'batched': batched,
+        'speedup': round(batched['requests_per_s'] / sequential['requests_per_s'], 2)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
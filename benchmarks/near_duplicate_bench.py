@@ -0,0 +1,96 @@
+"""
+Near-duplicate index benchmark: build time, query latency and recall.
+
+Fills a fresh NearDuplicateIndex with --size synthetic essays, then queries
+  - resubmissions of stored essays with --edits words substituted (should be found),
+  - unseen essays (should not be found),
+and reports query latency percentiles, recall and false-positive rate.
+
+Usage:
+    python benchmarks/near_duplicate_bench.py [--size 100000] [--words 300] [--edits 5] [--queries 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import generate_text, vocabulary
+from near_duplicate import NearDuplicateIndex
+
+
+def edit_words(text, edits, rng, words):
+    """Substitute `edits` random words, like a student touching up an essay"""
+    tokens = text.split(' ')
+    for position in rng.sample(range(len(tokens)), min(edits, len(tokens))):
+        tokens[position] = rng.choice(words)
+    return ' '.join(tokens)
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100000, help='Stored essays')
+    parser.add_argument('--words', type=int, default=300, help='Words per essay')
+    parser.add_argument('--edits', type=int, default=5, help='Words changed per resubmission')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=5000, help='Essays per insert transaction')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = vocabulary()
+    with tempfile.TemporaryDirectory(prefix='near_dup_') as workdir:
+        index = NearDuplicateIndex(path=os.path.join(workdir, 'near_duplicates.db'))
+
+        start = time.perf_counter()
+        for batch_start in range(0, args.size, args.batch):
+            index.add_many([
+                (i, generate_text(args.words, seed=i), None)
+                for i in range(batch_start, min(batch_start + args.batch, args.size))
+            ])
+        build_seconds = time.perf_counter() - start
+
+        latencies, found, false_positives = [], 0, 0
+        for q in range(args.queries):
+            original = rng.randrange(args.size)
+            resubmission = edit_words(generate_text(args.words, seed=original), args.edits, rng, words)
+            start = time.perf_counter()
+            matches = index.query(resubmission)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += any(pid == original for pid, _ in matches)
+
+            unseen = generate_text(args.words, seed=args.size + q)
+            start = time.perf_counter()
+            false_positives += bool(index.query(unseen))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        latencies.sort()
+        report = {
+            'stored': index.count(),
+            'threshold': Config.NEAR_DUPLICATE_THRESHOLD,
+            'bands_x_rows': f"{index.bands}x{index.rows}",
+            'build_seconds': round(build_seconds, 1),
+            'index_mb': round(os.path.getsize(index.path) / 1024 / 1024, 1),
+            'query_ms': {
+                'p50': round(statistics.median(latencies), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'max': round(latencies[-1], 2)
+            },
+            'recall': found / args.queries,
+            'false_positive_rate': false_positives / args.queries
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
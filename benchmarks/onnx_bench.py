@@ -0,0 +1,115 @@
+"""
+Parity check and benchmark: ONNX Runtime backend vs torch backend.
+
+Exports the tiny offline model (or, with --real, the configured detector)
+to ONNX, then
+  - checks that predict_batch probabilities and predict_text verdicts match
+    the torch backend within --tolerance (exit status 1 otherwise), and
+  - times predict_text on the synthetic corpus for both backends.
+
+Usage:
+    python benchmarks/onnx_bench.py [--threads 0] [--repeats 3] [--tolerance 1e-4] [--real]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import SIZES, generate_corpus
+from tiny_model import build_tiny_handler
+
+
+def build_handlers(real, threads, workdir):
+    import copy
+    import torch
+    from model_handler import ModelHandler
+    from onnx_backend import OnnxSequenceClassifier, export_onnx
+
+    if real:
+        torch_handler = ModelHandler(backend='torch')
+        torch_handler.load_model()
+    else:
+        torch_handler = build_tiny_handler(hidden_size=128, num_layers=4)
+
+    # export_onnx merges adapters in place; keep the torch handler untouched
+    onnx_path = export_onnx(copy.deepcopy(torch_handler.model), torch_handler.tokenizer, workdir)
+
+    onnx_handler = ModelHandler(tier=torch_handler.tier, backend='onnx')
+    onnx_handler.device = torch.device('cpu')
+    onnx_handler.tokenizer = torch_handler.tokenizer
+    onnx_handler.model = OnnxSequenceClassifier(onnx_path, num_threads=threads)
+    onnx_handler.loaded = True
+    return torch_handler, onnx_handler
+
+
+def parity(torch_handler, onnx_handler, corpus, tolerance):
+    from onnx_backend import check_parity
+
+    documents = [text for texts in corpus.values() for text in texts]
+    texts = []
+    for document in documents:
+        chunks, _ = torch_handler.preprocessor.preprocess_for_model(document)
+        texts.extend(chunks)
+        texts.extend(torch_handler.preprocessor.split_into_sentences(document)[:20])
+    max_diff, ok = check_parity(torch_handler, onnx_handler, texts, tolerance)
+
+    verdicts_match = all(
+        torch_handler.predict_text(document)['is_ai_generated']
+        == onnx_handler.predict_text(document)['is_ai_generated']
+        for document in documents
+    )
+    return {'texts': len(texts), 'max_abs_diff': max_diff, 'within_tolerance': ok,
+            'verdicts_match': verdicts_match}
+
+
+def time_predict_text(handler, text, repeats):
+    handler.predict_text(text)  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        handler.predict_text(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=Config.ONNX_THREADS,
+                        help='ONNX Runtime intra-op threads (0 = THREADS_PER_WORKER layout)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--real', action='store_true',
+                        help='Use the configured detector instead of the tiny model')
+    args = parser.parse_args()
+
+    corpus = generate_corpus()
+    with tempfile.TemporaryDirectory(prefix='onnx_bench_') as workdir:
+        torch_handler, onnx_handler = build_handlers(args.real, args.threads, workdir)
+
+        report = {'parity': parity(torch_handler, onnx_handler, corpus, args.tolerance),
+                  'predict_text_ms': {}}
+        for size in SIZES:
+            torch_ms = time_predict_text(torch_handler, corpus[size][0], args.repeats)
+            onnx_ms = time_predict_text(onnx_handler, corpus[size][0], args.repeats)
+            report['predict_text_ms'][size] = {
+                'torch': round(torch_ms, 2),
+                'onnx': round(onnx_ms, 2),
+                'speedup': round(torch_ms / onnx_ms, 2) if onnx_ms else None
+            }
+
+    print(json.dumps(report, indent=2))
+    if not (report['parity']['within_tolerance'] and report['parity']['verdicts_match']):
+        print("FAIL: ONNX backend does not match the torch backend")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+FLOPs saved by length-bucketed dynamic padding.
+
+Builds a realistic mixed-length workload (short sentences scored by
+get_sentence_level_predictions next to ~510-token chunks from predict_text),
+then compares the encoder FLOPs of:
+  - naive:    batches in arrival order, padded to the longest item
+  - bucketed: batches sorted by length, padded per bucket to a multiple of 8
+FLOPs use the IndoBERT-base dimensions. With --measure the tiny offline
+model is also timed for both strategies.
+
+Usage:
+    python benchmarks/padding_bench.py [--batch-size 16] [--measure]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import plan_length_buckets, padded_tokens
+from config import Config
+from corpus import generate_text
+from text_preprocessor import TextPreprocessor
+from tiny_model import build_tokenizer
+
+# indobenchmark/indobert-base-p1
+BASE_DIMS = {'hidden': 768, 'ffn': 3072, 'layers': 12}
+
+
+def encoder_flops(length, hidden, ffn, layers):
+    """Forward FLOPs of a BERT encoder over one sequence of `length` tokens"""
+    projections = 2 * length * (4 * hidden * hidden + 2 * hidden * ffn)
+    attention = 2 * 2 * length * length * hidden
+    return layers * (projections + attention)
+
+
+def plan_naive(lengths, batch_size):
+    """Batches in arrival order, each padded to its longest item (padding=True)"""
+    return [
+        (list(range(start, min(start + batch_size, len(lengths)))),
+         max(lengths[start:start + batch_size]))
+        for start in range(0, len(lengths), batch_size)
+    ]
+
+
+def plan_flops(buckets, dims):
+    return sum(len(indices) * encoder_flops(length, **dims) for indices, length in buckets)
+
+
+def build_workload(seed=0, documents=8):
+    """Chunks and sentences from several documents, shuffled like concurrent traffic"""
+    preprocessor = TextPreprocessor()
+    rng = random.Random(seed)
+    texts = []
+    for i in range(documents):
+        document = generate_text(rng.choice([80, 600, 3000]), seed=seed * 100 + i)
+        chunks, _ = preprocessor.preprocess_for_model(document)
+        texts.extend(chunks)
+        texts.extend(preprocessor.split_into_sentences(document))
+    rng.shuffle(texts)
+    return texts
+
+
+def time_strategy(handler, texts, buckets):
+    import torch
+
+    encodings = handler.tokenizer(texts, truncation=True, max_length=Config.MAX_LENGTH)
+    start = time.perf_counter()
+    with torch.no_grad():
+        for indices, length in buckets:
+            batch = handler.tokenizer.pad(
+                {'input_ids': [encodings['input_ids'][i] for i in indices]},
+                padding='max_length', max_length=length, return_tensors='pt'
+            )
+            handler.model(**batch)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE)
+    parser.add_argument('--documents', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--measure', action='store_true', help='Also time the tiny model')
+    args = parser.parse_args()
+
+    tokenizer = build_tokenizer()
+    texts = build_workload(args.seed, args.documents)
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=Config.MAX_LENGTH)['input_ids']]
+
+    naive = plan_naive(lengths, args.batch_size)
+    bucketed = plan_length_buckets(lengths, args.batch_size, Config.PAD_TO_MULTIPLE_OF, Config.MAX_LENGTH)
+    unpadded = [([i], length) for i, length in enumerate(lengths)]
+
+    naive_flops = plan_flops(naive, BASE_DIMS)
+    bucketed_flops = plan_flops(bucketed, BASE_DIMS)
+    report = {
+        'inputs': len(texts),
+        'token_length': {'min': min(lengths), 'max': max(lengths), 'mean': sum(lengths) / len(lengths)},
+        'real_tokens': sum(lengths),
+        'padded_tokens': {'naive': padded_tokens(naive), 'bucketed': padded_tokens(bucketed)},
+        'gflops': {
+            'unpadded_lower_bound': plan_flops(unpadded, BASE_DIMS) / 1e9,
+            'naive': naive_flops / 1e9,
+            'bucketed': bucketed_flops / 1e9
+        },
+        'flops_saved_pct': 100 * (1 - bucketed_flops / naive_flops),
+        'batches': {'naive': len(naive), 'bucketed': len(bucketed)}
+    }
+
+    if args.measure:
+        from tiny_model import build_tiny_handler
+
+        handler = build_tiny_handler()
+        handler.tokenizer = tokenizer
+        time_strategy(handler, texts, bucketed[:1])  # warm-up
+        report['tiny_model_ms'] = {
+            'naive': time_strategy(handler, texts, naive),
+            'bucketed': time_strategy(handler, texts, bucketed)
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory of N inference workers: preload-then-fork vs one model per process.
+
+Builds a BERT-base sized random classifier (offline) and serves a few
+predict_text requests per worker in two setups:
+  - independent: N spawned processes, each building its own model
+  - prefork:     inference_server.PreforkServer, weights in shared memory
+and reports RSS and PSS per worker plus the PSS total (the memory the
+workers really cost the host).
+
+Usage:
+    python benchmarks/prefork_memory.py [--workers 4] [--hidden-size 768] [--layers 12]
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate_text
+from inference_server import PreforkServer, process_memory
+from tiny_model import build_tiny_handler
+
+
+def _independent_worker(hidden_size, layers, requests, ready, done):
+    handler = build_tiny_handler(hidden_size=hidden_size, num_layers=layers)
+    for seed in range(requests):
+        handler.predict_text(generate_text(600, seed=seed))
+    ready.set()
+    done.wait()
+
+
+def run_independent(workers, hidden_size, layers, requests):
+    ctx = mp.get_context('spawn')
+    done = ctx.Event()
+    ready = [ctx.Event() for _ in range(workers)]
+    processes = [
+        ctx.Process(target=_independent_worker, args=(hidden_size, layers, requests, ready[i], done))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for event in ready:
+        event.wait()
+    rows = [{'process': f'worker-{i}', **process_memory(p.pid)} for i, p in enumerate(processes)]
+    done.set()
+    for process in processes:
+        process.join()
+    return {'processes': rows, 'total_pss_mb': round(sum(r['pss_mb'] for r in rows), 1)}
+
+
+def run_prefork(workers, hidden_size, layers, requests):
+    handler = build_tiny_handler(hidden_size=hidden_size, num_layers=layers)
+    server = PreforkServer(workers=workers, handler=handler).start()
+    futures = [server.submit(generate_text(600, seed=seed)) for seed in range(requests * workers)]
+    for future in futures:
+        future.result()
+    report = server.memory_report()
+    server.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hidden-size', type=int, default=768)
+    parser.add_argument('--layers', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=3, help='predict_text calls per worker')
+    args = parser.parse_args()
+
+    independent = run_independent(args.workers, args.hidden_size, args.layers, args.requests)
+    prefork = run_prefork(args.workers, args.hidden_size, args.layers, args.requests)
+    workers_pss = sum(row['pss_mb'] for row in prefork['processes'] if row['process'] != 'parent')
+
+    print(json.dumps({
+        'independent': independent,
+        'prefork': prefork,
+        'summary': {
+            'independent_total_pss_mb': independent['total_pss_mb'],
+            'prefork_total_pss_mb': prefork['total_pss_mb'],
+            'prefork_workers_pss_mb': round(workers_pss, 1),
+            'saved_mb': round(independent['total_pss_mb'] - prefork['total_pss_mb'], 1)
+        }
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
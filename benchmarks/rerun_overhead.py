@@ -0,0 +1,78 @@
+"""
+Per-rerun overhead of creating the Auth/Database resources.
+
+"before" constructs Auth() and Database() the way every Streamlit rerun
+used to; "after" goes through the cached resource layer in resources.py.
+Runs against a scratch database so the real users.db is untouched.
+
+Usage:
+    python benchmarks/rerun_overhead.py [--reruns 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+def time_reruns(setup, reruns):
+    """Run `setup` `reruns` times and return per-call timings in ms"""
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        setup()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        Config.DATABASE_PATH = os.path.join(workdir, 'database', 'users.db')
+
+        from auth import Auth
+        from database import Database
+        from resources import get_auth, get_database
+
+        # Seed once so both variants measure steady-state reruns
+        Database()
+
+        def before():
+            Auth()
+            Database()
+
+        def after():
+            get_auth()
+            get_database()
+
+        results = {
+            'reruns': args.reruns,
+            'before': summarize(time_reruns(before, args.reruns)),
+            'after': summarize(time_reruns(after, args.reruns)),
+        }
+        results['speedup'] = results['before']['mean_ms'] / max(results['after']['mean_ms'], 1e-9)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-session memory of a predict_text result: nested dicts vs PredictionResult.
+
+For synthetic documents of growing size, scores the text once and
+measures the deep size of
+  - dicts:   result.to_dict(), the nested-dict form predict_text used to return
+  - compact: the PredictionResult kept in st.session_state
+The compact result points into the analysed text, which the page holds
+anyway; it is reported both without and with that buffer, and again once
+the chunk_predictions and highlighted_parts views it caches have been
+built. The large reduction holds only with the text excluded; counting
+the text it is about 3x. Also times building the views (first access)
+and reading them again (cached).
+
+Usage:
+    python benchmarks/result_memory.py [--words 2000 20000 200000] [--threshold 0.5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import generate_text
+from tiny_model import build_tiny_handler
+
+
+def deep_size(value, seen=None):
+    """Bytes held by value and everything it references (numpy arrays by nbytes)"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        # getsizeof counts the data only for arrays that own it
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in value)
+    elif hasattr(value, '__slots__'):
+        size += sum(deep_size(getattr(value, name), seen) for name in value.__slots__)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, nargs='+', default=[2000, 20000, 200000])
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='AI_THRESHOLD for the run, so the random model highlights chunks')
+    args = parser.parse_args()
+
+    Config.AI_THRESHOLD = args.threshold
+    handler = build_tiny_handler()
+    rows = []
+    for n_words in args.words:
+        text = generate_text(n_words, seed=n_words)
+        result = handler.predict_text(text)
+        text_bytes = sys.getsizeof(text)
+        compact_bytes = deep_size(result, seen={id(text)})
+
+        start = time.perf_counter()
+        as_dicts = result.to_dict()
+        dict_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        result.to_json()
+        json_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        result['chunk_predictions'], result['highlighted_parts']
+        cached_ms = (time.perf_counter() - start) * 1000
+
+        # The old nested dicts held their own copy of every text (no sharing with the cache)
+        dict_bytes = deep_size(json.loads(result.to_json()))
+        cached_bytes = deep_size(result, seen={id(text)})
+        rows.append({
+            'words': n_words,
+            'chunks': result['total_chunks'],
+            'highlighted': len(as_dicts['highlighted_parts']),
+            'dicts_kb': round(dict_bytes / 1024, 1),
+            'compact_kb': round(compact_bytes / 1024, 1),
+            'compact_with_text_kb': round((compact_bytes + text_bytes) / 1024, 1),
+            'compact_with_views_and_text_kb': round((cached_bytes + text_bytes) / 1024, 1),
+            'reduction_without_text': round(dict_bytes / compact_bytes, 1),
+            'reduction_with_text': round(dict_bytes / (compact_bytes + text_bytes), 1),
+            'reduction_with_views_and_text': round(dict_bytes / (cached_bytes + text_bytes), 1),
+            'dict_view_ms': round(dict_ms, 1),
+            'json_view_ms': round(json_ms, 1),
+            'cached_views_ms': round(cached_ms, 3)
+        })
+    print(json.dumps({
+        'note': 'reduction_without_text ignores the analysed text the result points into; '
+                'the memory a session actually saves is reduction_with_text',
+        'results': rows
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Fair scheduling benchmark: short-text latency next to one huge upload.
+
+One "heavy" user submits a --heavy-words document while --light-users users
+keep sending short texts. Compares the latency of the short texts when
+  fifo:      requests run one at a time in arrival order (inline inference)
+  scheduler: FairScheduler with token buckets and sliced fair queuing
+and reports the heavy document's own completion time and the scheduler's
+queue wait per user class.
+
+Usage:
+    python benchmarks/scheduler_bench.py [--heavy-words 60000] [--light-users 4] [--light-requests 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import generate_text
+from scheduler import FairScheduler
+from tiny_model import build_tiny_handler
+
+
+def run(call, heavy_text, light_texts, light_users):
+    """Heavy request first, light users right behind it; returns latencies in ms"""
+    light_latencies, heavy_ms = [], []
+    lock = threading.Lock()
+
+    def heavy():
+        start = time.perf_counter()
+        call('heavy', heavy_text, 'user')
+        heavy_ms.append((time.perf_counter() - start) * 1000)
+
+    def light(user):
+        for text in light_texts:
+            start = time.perf_counter()
+            call(f'light-{user}', text, 'user')
+            with lock:
+                light_latencies.append((time.perf_counter() - start) * 1000)
+
+    heavy_thread = threading.Thread(target=heavy)
+    heavy_thread.start()
+    time.sleep(0.05)
+    threads = [threading.Thread(target=light, args=(user,)) for user in range(light_users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads + [heavy_thread]:
+        thread.join()
+    light_latencies.sort()
+    return {
+        'light_ms': {
+            'p50': round(statistics.median(light_latencies), 1),
+            'p95': round(light_latencies[min(int(len(light_latencies) * 0.95), len(light_latencies) - 1)], 1),
+            'max': round(light_latencies[-1], 1)
+        },
+        'heavy_ms': round(heavy_ms[0], 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--heavy-words', type=int, default=60000)
+    parser.add_argument('--light-users', type=int, default=4)
+    parser.add_argument('--light-requests', type=int, default=5)
+    parser.add_argument('--light-words', type=int, default=300)
+    args = parser.parse_args()
+
+    # Budgets high enough that only fairness, not rate limits, is measured
+    Config.USER_CHUNKS_PER_MINUTE = {'admin': 10 ** 6, 'user': 10 ** 6}
+    handler = build_tiny_handler()
+    heavy_text = generate_text(args.heavy_words, seed=0)
+    light_texts = [generate_text(args.light_words, seed=seed) for seed in range(1, args.light_requests + 1)]
+    handler.predict_text(light_texts[0])
+
+    fifo_lock = threading.Lock()
+
+    def fifo(user_id, text, user_class):
+        with fifo_lock:
+            return handler.predict_text(text)
+
+    fifo_report = run(fifo, heavy_text, light_texts, args.light_users)
+
+    scheduler = FairScheduler(handler)
+    scheduler_report = run(
+        lambda user_id, text, user_class: scheduler.predict_text(user_id, text, user_class),
+        heavy_text, light_texts, args.light_users
+    )
+    scheduler_report['queue_wait'] = scheduler.queue_stats()
+    scheduler.stop()
+
+    print(json.dumps({
+        'heavy_chunks': len(handler.prepare_chunks(heavy_text)[0]),
+        'slice_chunks': Config.SCHEDULER_SLICE_CHUNKS,
+        'fifo': fifo_report,
+        'scheduler': scheduler_report
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Sentence segmentation benchmark: legacy `[^.!?]+` split vs segment_sentences.
+
+On synthetic Indonesian text (abbreviations such as "Dr.", "No.", "dll.",
+decimals and Rupiah amounts) reports, per text size:
+  - segmentation time and throughput (MB/s) for both segmenters,
+  - sentence counts, i.e. forward passes made by
+    get_sentence_level_predictions, and how many the new segmenter saves.
+Throughput staying flat as the text grows shows the scan is linear.
+
+Usage:
+    python benchmarks/sentence_bench.py [--words 20000 200000 1000000] [--repeats 3]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate_text
+from text_preprocessor import TextPreprocessor
+
+
+def legacy_split(text):
+    """The splitter used before segment_sentences"""
+    sentences = []
+    for match in re.finditer(r'[^.!?]+', text):
+        sentence = match.group().strip()
+        if sentence:
+            start = match.start() + match.group().index(sentence)
+            sentences.append((sentence, start, start + len(sentence)))
+    return sentences
+
+
+def best_time(function, text, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, nargs='+', default=[20000, 200000, 1000000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    preprocessor = TextPreprocessor()
+    rows = []
+    for n_words in args.words:
+        text = generate_text(n_words, seed=n_words)
+        megabytes = len(text.encode('utf-8')) / 1024 / 1024
+
+        legacy_seconds, legacy = best_time(legacy_split, text, args.repeats)
+        new_seconds, new = best_time(preprocessor.split_into_sentences_with_offsets, text, args.repeats)
+        assert all(text[start:end] == sentence for sentence, start, end in new)
+
+        rows.append({
+            'words': n_words,
+            'megabytes': round(megabytes, 2),
+            'legacy': {'ms': round(legacy_seconds * 1000, 1),
+                       'mb_per_s': round(megabytes / legacy_seconds, 1),
+                       'sentences': len(legacy)},
+            'segmenter': {'ms': round(new_seconds * 1000, 1),
+                          'mb_per_s': round(megabytes / new_seconds, 1),
+                          'sentences': len(new)},
+            'forward_passes_saved': len(legacy) - len(new),
+            'forward_passes_saved_pct': round(100 * (len(legacy) - len(new)) / len(legacy), 1)
+        })
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == '__main__':
+    main()
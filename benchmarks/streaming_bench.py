@@ -0,0 +1,75 @@
+"""
+Streaming benchmark: time to first result vs document length.
+
+For each --words size, measures on the tiny offline model
+  full:      predict_text, the result only exists once every chunk is scored
+  streamed:  ModelHandler.iter_predict_text, time to the first PartialResult
+             and to the final one
+  scheduler: FairScheduler.stream, time to the first PartialResult
+The first update should stay flat while full latency grows with length.
+
+Usage:
+    python benchmarks/streaming_bench.py [--words 1000 10000 50000 200000] [--batch-chunks 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import generate_text
+from scheduler import FairScheduler
+from tiny_model import build_tiny_handler
+
+
+def time_stream(updates):
+    """Consume a stream; returns (ms to first update, ms to final update, number of updates)"""
+    start = time.perf_counter()
+    first_ms, count = None, 0
+    for update in updates:
+        count += 1
+        if first_ms is None:
+            first_ms = (time.perf_counter() - start) * 1000
+    return first_ms, (time.perf_counter() - start) * 1000, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, nargs='+', default=[1000, 10000, 50000, 200000])
+    parser.add_argument('--batch-chunks', type=int, default=Config.STREAM_BATCH_CHUNKS)
+    args = parser.parse_args()
+
+    Config.USER_CHUNKS_PER_MINUTE = {'admin': 10 ** 6, 'user': 10 ** 6}
+    handler = build_tiny_handler()
+    handler.predict_text(generate_text(300, seed=1))
+    scheduler = FairScheduler(handler)
+
+    report = []
+    for n_words in args.words:
+        text = generate_text(n_words, seed=n_words)
+
+        start = time.perf_counter()
+        handler.predict_text(text, cascade=False)
+        full_ms = (time.perf_counter() - start) * 1000
+
+        first_ms, final_ms, updates = time_stream(handler.iter_predict_text(text, batch_chunks=args.batch_chunks))
+        scheduler_first_ms, _, _ = time_stream(scheduler.stream('bench', text))
+        report.append({
+            'words': n_words,
+            'full_ms': round(full_ms, 1),
+            'streamed_first_ms': round(first_ms, 1),
+            'streamed_final_ms': round(final_ms, 1),
+            'scheduler_first_ms': round(scheduler_first_ms, 1),
+            'updates': updates
+        })
+    scheduler.stop()
+
+    print(json.dumps({'batch_chunks': args.batch_chunks, 'results': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Sweep of worker x thread layouts for CPU inference.
+
+For each layout, starts `workers` processes that each configure their
+thread pools via cpu_layout.apply_thread_settings (optionally pinned to
+disjoint cores), then drains a shared queue of predict_text requests on
+the tiny offline model. Reports throughput and per-request latency per
+layout and the best layout for this host. The "oversubscribed" row is the
+old behaviour: every worker sized to all cores.
+
+Usage:
+    python benchmarks/thread_layout_bench.py [--requests 48] [--words 600] [--pin] [--output sweep.json]
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate_text
+
+WORKER_START_TIMEOUT = 300  # seconds
+
+
+def candidate_layouts(cores):
+    """(workers, threads_per_worker) pairs that exactly fill the cores"""
+    layouts = []
+    workers = 1
+    while workers <= cores:
+        layouts.append((workers, cores // workers))
+        workers *= 2
+    if cores > 1:
+        # Old behaviour: several workers, each with a full-width pool
+        layouts.append((min(4, cores), cores))
+    return layouts
+
+
+def worker_main(worker_index, workers, threads, pin, words, barrier, requests, results):
+    from cpu_layout import apply_thread_settings
+
+    apply_thread_settings(worker_index=worker_index, workers=workers,
+                          threads_per_worker=threads, pin=pin)
+    from tiny_model import build_tiny_handler
+
+    handler = build_tiny_handler(hidden_size=256, num_layers=4)
+    handler.predict_text(generate_text(words, seed=999))  # warm-up
+    barrier.wait()
+
+    latencies = []
+    while True:
+        seed = requests.get()
+        if seed is None:
+            break
+        text = generate_text(words, seed=seed)
+        start = time.perf_counter()
+        handler.predict_text(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.put(latencies)
+
+
+def run_layout(workers, threads, pin, n_requests, words):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(workers + 1)
+    requests = ctx.Queue()
+    results = ctx.Queue()
+    for seed in range(n_requests):
+        requests.put(seed)
+    for _ in range(workers):
+        requests.put(None)
+
+    processes = [
+        ctx.Process(target=worker_main,
+                    args=(i, workers, threads, pin, words, barrier, requests, results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        # A worker that fails to start would otherwise block the sweep forever
+        barrier.wait(timeout=WORKER_START_TIMEOUT)
+    except Exception:
+        for process in processes:
+            process.terminate()
+        raise RuntimeError(f"Layout {workers}x{threads}: workers failed to start")
+    start = time.perf_counter()
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get())
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return {
+        'workers': workers,
+        'threads_per_worker': threads,
+        'pinned': pin,
+        'throughput_rps': round(n_requests / elapsed, 2),
+        'latency_p50_ms': round(statistics.median(latencies), 2),
+        'latency_p95_ms': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 2)
+    }
+
+
+def main():
+    from cpu_layout import available_cores
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--words', type=int, default=600, help='Words per request')
+    parser.add_argument('--pin', action='store_true', help='Pin each worker to its own cores')
+    parser.add_argument('--output', help='Write the sweep as JSON')
+    args = parser.parse_args()
+
+    cores = len(available_cores())
+    rows = []
+    for workers, threads in candidate_layouts(cores):
+        pin = args.pin and workers * threads <= cores
+        row = run_layout(workers, threads, pin, args.requests, args.words)
+        rows.append(row)
+        print(f"{workers:3d} workers x {threads:3d} threads  pinned={str(pin):5s}  "
+              f"{row['throughput_rps']:8.2f} req/s  p50 {row['latency_p50_ms']:8.1f} ms  "
+              f"p95 {row['latency_p95_ms']:8.1f} ms")
+
+    best_throughput = max(rows, key=lambda r: r['throughput_rps'])
+    best_latency = min(rows, key=lambda r: r['latency_p95_ms'])
+    report = {'cores': cores, 'layouts': rows,
+              'best_throughput': best_throughput, 'best_latency': best_latency}
+    print(f"Best throughput: INFERENCE_WORKERS={best_throughput['workers']} "
+          f"THREADS_PER_WORKER={best_throughput['threads_per_worker']}")
+    print(f"Best p95 latency: INFERENCE_WORKERS={best_latency['workers']} "
+          f"THREADS_PER_WORKER={best_latency['threads_per_worker']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Tiny randomly initialized BERT classifier for offline benchmarks.
+
+Builds a ModelHandler whose tokenizer and model are created locally
+(no download), so benchmarks exercise the real pipeline on CPU. The
+scores are meaningless; only the timings are of interest.
+"""
+
+import os
+import string
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from corpus import vocabulary
+
+SPECIAL_TOKENS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+
+
+def build_tokenizer(workdir=None):
+    """WordPiece tokenizer over the synthetic corpus vocabulary"""
+    from transformers import BertTokenizerFast
+
+    characters = list(string.ascii_lowercase + string.digits)
+    vocab = (
+        SPECIAL_TOKENS
+        + list(string.punctuation)
+        + characters
+        + ['##' + c for c in characters]
+        + vocabulary()
+    )
+    workdir = workdir or tempfile.mkdtemp(prefix='tiny_bert_')
+    vocab_file = os.path.join(workdir, 'vocab.txt')
+    with open(vocab_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(dict.fromkeys(vocab)) + '\n')
+    return BertTokenizerFast(vocab_file=vocab_file, do_lower_case=True)
+
+
+def build_tiny_model(vocab_size, hidden_size=64, num_layers=2, num_heads=2, seed=0):
+    """Randomly initialized BertForSequenceClassification with 2 labels"""
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=vocab_size,
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=num_heads,
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=Config.MAX_LENGTH,
+        num_labels=2
+    )
+    model = BertForSequenceClassification(config)
+    model.eval()
+    return model
+
+
+def build_tiny_handler(hidden_size=64, num_layers=2, seed=0):
+    """ModelHandler wired to the tiny tokenizer/model, ready for predict_text"""
+    import torch
+    from model_handler import ModelHandler
+
+    handler = ModelHandler()
+    handler.device = torch.device('cpu')
+    handler.tokenizer = build_tokenizer()
+    handler.model = build_tiny_model(
+        len(handler.tokenizer), hidden_size=hidden_size, num_layers=num_layers, seed=seed
+    )
+    handler.loaded = True
+    return handler
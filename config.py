@@ -7,16 +7,89 @@ import os
 class Config:
     # Model settings
     MODEL_PATH = "indobert_ai_detector"
+    MODEL_VERSION = os.environ.get("MODEL_VERSION", "")  # kosong = nama folder MODEL_PATH
+    SHADOW_SAMPLE_RATE = 0.1  # fraksi traffic yang juga diskor model kandidat
+    # Adapter LoRA per domain di atas satu base model (lihat multi_adapter.py)
+    DEFAULT_ADAPTER = "default"  # nama adapter dari MODEL_PATH
+    DOMAIN_ADAPTERS = {}  # nama domain -> folder adapter, mis. {"berita": "indobert_ai_detector_berita"}
+    ADAPTER_BATCH_WINDOW_MS = 10  # tunggu request lain untuk adapter yang sama
+    ADAPTER_BATCH_MAX_REQUESTS = 16  # maksimum request per putaran batch
     BASE_MODEL_NAME = "indobenchmark/indobert-base-p1"
     MAX_LENGTH = 512
+    # "full" = IndoBERT + LoRA, "fast" = model student hasil distilasi
+    MODEL_TIER = os.environ.get("MODEL_TIER", "full")
+    FAST_MODEL_PATH = "indobert_ai_detector_fast"
+    # Backend inferensi: "torch" atau "onnx" (ONNX Runtime, lihat onnx_backend.py)
+    INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+    ONNX_MODEL_PATH = "indobert_ai_detector_onnx/model.onnx"
+    ONNX_THREADS = int(os.environ.get("ONNX_THREADS", 0))  # 0 = ikut THREADS_PER_WORKER
+    ONNX_GRAPH_OPTIMIZATION = "all"  # disable, basic, extended atau all
+    
+    # CPU layout: INFERENCE_WORKERS proses x THREADS_PER_WORKER thread (lihat cpu_layout.py)
+    INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 1))
+    THREADS_PER_WORKER = int(os.environ.get("THREADS_PER_WORKER", 0))  # 0 = core dibagi rata
+    INTEROP_THREADS = int(os.environ.get("INTEROP_THREADS", 1))
+    WORKER_INDEX = int(os.environ.get("WORKER_INDEX", 0))  # indeks worker proses ini
+    PIN_WORKER_CORES = os.environ.get("PIN_WORKER_CORES", "0") == "1"  # pin tiap worker ke core-nya
+    # Server inferensi preload-then-fork (lihat inference_server.py)
+    INFERENCE_SERVER_HOST = os.environ.get("INFERENCE_SERVER_HOST", "127.0.0.1")
+    INFERENCE_SERVER_PORT = int(os.environ.get("INFERENCE_SERVER_PORT", 8765))
+    BATCH_SIZE = 16  # jumlah chunk per batch inferensi
+    PAD_TO_MULTIPLE_OF = 8  # padding per batch dibulatkan ke kelipatan ini
+    CHUNKING_MODE = "fixed"  # "fixed" (tanpa overlap) atau "sliding"
+    WINDOW_STRIDE = 128  # jarak antar window (dalam kata) untuk mode sliding
+    STREAM_BATCH_CHUNKS = 8  # chunk per pembaruan hasil sementara di UI
     
     # Thresholds
     AI_THRESHOLD = 0.7  # 70% confidence untuk menentukan teks AI
     HIGH_CONFIDENCE_THRESHOLD = 0.85  # 85% untuk confidence tinggi
     
+    # Cascade (early-exit) scoring - opt-in
+    CASCADE_ENABLED = False
+    CASCADE_MIN_CHUNKS = 8  # dokumen lebih pendek selalu diskor penuh
+    CASCADE_SAMPLE_SIZE = 4  # jumlah chunk pada sampel pertama
+    CASCADE_STEP = 4  # tambahan chunk per langkah berikutnya
+    CASCADE_MAX_FRACTION = 0.5  # di atas ini langsung skor penuh
+    CASCADE_Z = 2.58  # interval kepercayaan 99%
+    CASCADE_MARGIN = 0.05  # lebar pita di sekitar AI_THRESHOLD
+    
+    # Penjadwal inferensi: token bucket per user + weighted fair queuing (lihat scheduler.py)
+    USER_CHUNKS_PER_MINUTE = {"admin": 600, "user": 120}  # kuota chunk per menit per role
+    USER_CLASS_WEIGHTS = {"admin": 2, "user": 1}  # bobot bagian CPU per role
+    SCHEDULER_SLICE_CHUNKS = 16  # dokumen besar dipotong per sekian chunk
+    SCHEDULER_MAX_WAIT_SECONDS = 300  # di atas ini permintaan ditolak (rate limit)
+    
+    # Pekerjaan analisis di latar belakang (lihat job_queue.py)
+    JOBS_DATABASE_PATH = "database/jobs.db"
+    JOB_LEASE_SECONDS = 30  # klaim worker kedaluwarsa jika tidak diperbarui
+    JOB_POLL_SECONDS = 1.0  # jeda worker saat antrian kosong
+    JOB_MAX_ATTEMPTS = 3  # setelah sekian klaim tanpa selesai, job dianggap gagal
+    JOB_RETENTION_DAYS = 30  # job selesai/gagal lebih lama dihapus saat pemeliharaan
+    
+    # Retensi, pemadatan dan backup database (lihat maintenance.py)
+    MAINTENANCE_ENABLED = True
+    ARCHIVE_DATABASE_PATH = "database/predictions_archive.db"
+    PREDICTION_RETENTION_DAYS = 365  # prediksi lebih lama dipindah ke arsip
+    ARCHIVE_BATCH_SIZE = 500  # baris per transaksi pemindahan
+    VACUUM_PAGES_PER_STEP = 1000  # halaman kosong dilepas per transaksi incremental_vacuum
+    MAINTENANCE_INTERVAL_HOURS = 24  # jadwal arsip + vacuum + analyze
+    BACKUP_DIR = "database/backups"
+    BACKUP_INTERVAL_HOURS = 24
+    BACKUP_KEEP = 7  # jumlah backup terbaru yang disimpan
+    BACKUP_PAGES_PER_STEP = -1  # -1 = satu snapshot baca (WAL: tidak memblokir penulis)
+    
     # Database
     DATABASE_PATH = "database/users.db"
     
+    # Near-duplicate detection (MinHash/LSH, indeks di samping database)
+    NEAR_DUPLICATE_ENABLED = True
+    NEAR_DUPLICATE_INDEX_PATH = "database/near_duplicates.db"
+    NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard minimum untuk memakai ulang skor chunk
+    SIMILAR_SUBMISSIONS_THRESHOLD = 0.5  # default pencarian kiriman serupa (admin)
+    MINHASH_PERMUTATIONS = 128
+    LSH_BANDS = 32  # 32 band x 4 baris
+    SHINGLE_SIZE = 3  # jumlah kata per shingle
+    
     # UI Settings
     APP_TITLE = "🤖 Detector Teks AI Indonesia"
     APP_DESCRIPTION = "Sistem deteksi teks yang dibuat oleh AI menggunakan IndoBERT + LoRA"
@@ -29,9 +102,25 @@ class Config:
         "text_color": "#FAFAFA"
     }
     
+    # Chart settings
+    FIGURE_CACHE_SIZE = 64  # jumlah figure Plotly yang disimpan di cache
+    MAX_CHART_POINTS = 1000  # di atas ini riwayat diagregasi per rentang waktu
+    
+    # Metrics (Prometheus text format di http://METRICS_HOST:METRICS_PORT/metrics)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", 9108))
+    
     # Logging
     LOG_LEVEL = "INFO"
     LOG_FILE = "logs/app.log"
     
     # Session settings
     SESSION_TIMEOUT = 3600  # 1 hour in seconds
+    # Secret untuk menandatangani session token; jika kosong dibuat acak per proses
+    SESSION_SECRET = os.environ.get("SESSION_SECRET", "")
+    
+    # Password hashing
+    BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    BCRYPT_MIN_ROUNDS = 10
+    BCRYPT_MAX_ROUNDS = 14
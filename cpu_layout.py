@@ -0,0 +1,93 @@
+"""
+CPU thread layout for AI Text Detector inference workers
+
+A host runs Config.INFERENCE_WORKERS worker processes (Streamlit servers or
+forked inference workers), each with Config.THREADS_PER_WORKER intra-op
+threads. Without this every process sizes its torch/ONNX Runtime thread
+pool to the whole machine and the pools oversubscribe the cores.
+"""
+
+import logging
+import os
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_applied = None
+
+def available_cores():
+    """Cores this process may run on (respects cgroup/taskset restrictions)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def resolve_layout(workers=None, threads_per_worker=None, cores=None):
+    """
+    Fill in defaults for a workers x threads layout
+    threads_per_worker = 0 splits the available cores evenly between workers.
+    Returns: (workers, threads_per_worker)
+    """
+    cores = cores if cores is not None else len(available_cores())
+    workers = max(workers if workers is not None else Config.INFERENCE_WORKERS, 1)
+    threads = threads_per_worker if threads_per_worker is not None else Config.THREADS_PER_WORKER
+    if not threads:
+        threads = max(cores // workers, 1)
+    return workers, threads
+
+def plan_core_sets(workers, threads_per_worker, cores=None):
+    """
+    Disjoint core sets, one per worker, in core order
+    Workers wrap around when workers x threads exceeds the core count.
+    """
+    cores = cores if cores is not None else available_cores()
+    return [
+        [cores[(worker * threads_per_worker + i) % len(cores)] for i in range(threads_per_worker)]
+        for worker in range(workers)
+    ]
+
+def apply_thread_settings(worker_index=None, workers=None, threads_per_worker=None, pin=None,
+                          force=False):
+    """
+    Configure torch thread pools (and optionally core pinning) for this process
+
+    Only the first call in a process takes effect, since torch cannot resize
+    its inter-op pool once it has been used; force=True re-applies it (e.g.
+    in a forked worker, which inherits the parent's settings). Returns:
+    dict describing the applied layout.
+    """
+    global _applied
+    if _applied is not None and not force:
+        return _applied
+
+    import torch
+
+    cores = available_cores()
+    workers, threads = resolve_layout(workers, threads_per_worker, len(cores))
+    worker_index = Config.WORKER_INDEX if worker_index is None else worker_index
+    pin = Config.PIN_WORKER_CORES if pin is None else pin
+
+    pinned = None
+    if pin and hasattr(os, 'sched_setaffinity'):
+        pinned = plan_core_sets(workers, threads, cores)[worker_index % workers]
+        os.sched_setaffinity(0, pinned)
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(Config.INTEROP_THREADS)
+    except RuntimeError:
+        # Inter-op pool already started (e.g. a model ran before this call,
+        # or inherited from the parent of a forked worker)
+        (logger.debug if force else logger.warning)(
+            "Inter-op thread pool already initialized; leaving it unchanged"
+        )
+
+    _applied = {
+        'workers': workers,
+        'worker_index': worker_index,
+        'threads_per_worker': threads,
+        'interop_threads': torch.get_num_interop_threads(),
+        'pinned_cores': pinned
+    }
+    logger.info(f"CPU layout: {_applied}")
+    return _applied
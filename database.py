@@ -7,13 +7,21 @@ import bcrypt
 import json
 from datetime import datetime
 import os
+import threading
 from config import Config
+from job_queue import JobStore
+from metrics import db_timed
+
+# Seed users only need to be checked once per process and database file
+_seed_lock = threading.Lock()
+_seeded_databases = set()
 
 class Database:
     def __init__(self):
         self.db_path = Config.DATABASE_PATH
         self.init_database()
     
+    @db_timed
     def init_database(self):
         """Initialize database and create tables if they don't exist"""
         # Create database directory if it doesn't exist
@@ -22,6 +30,12 @@ class Database:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # New files free pages incrementally (see maintenance.py); needs to
+        # be set before the first table exists, no effect on existing files
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # Readers (and online backups) don't block writers
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Users table - UBAH YANG INI untuk menambah kolom role
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -46,17 +60,52 @@ class Database:
                 is_ai_generated BOOLEAN NOT NULL,
                 highlighted_parts TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                model_version TEXT,
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
         
-        # Create admin user if not exists
-        self.create_admin_user()
-        self.create_guest_user()
+        # Databases created before model versioning lack the column
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(predictions)')]
+        if 'model_version' not in columns:
+            cursor.execute('ALTER TABLE predictions ADD COLUMN model_version TEXT')
+        
+        # Retention picks rows by age
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at)')
+        # Per-user history, stats and the dashboard fingerprint (the index
+        # carries the rowid, so COUNT(*), MAX(id) never touch the table)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_user_id ON predictions (user_id)')
         
         conn.commit()
         conn.close()
+        
+        # Create admin and guest user if not exists (once per process)
+        with _seed_lock:
+            if self.db_path not in _seeded_databases:
+                self.create_admin_user()
+                self.create_guest_user()
+                _seeded_databases.add(self.db_path)
+    
+    def bcrypt_rounds(self):
+        """Configured bcrypt cost, clamped to the allowed range"""
+        return min(max(Config.BCRYPT_ROUNDS, Config.BCRYPT_MIN_ROUNDS), Config.BCRYPT_MAX_ROUNDS)
+    
+    def hash_password(self, password):
+        """Hash password with the configured bcrypt cost"""
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.bcrypt_rounds()))
+    
+    def password_needs_rehash(self, password_hash):
+        """Check if a stored hash was made with a different cost than configured"""
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode('utf-8')
+        try:
+            # Format: $2b$<cost>$<salt+hash>
+            stored_rounds = int(password_hash.split(b'$')[2])
+        except (IndexError, ValueError):
+            return True
+        return stored_rounds != self.bcrypt_rounds()
     
+    @db_timed
     def create_admin_user(self):
         """Create default admin user"""
         try:
@@ -67,7 +116,7 @@ class Database:
             cursor.execute('SELECT id FROM users WHERE username = ?', ('arifaryaaureon1603',))
             if not cursor.fetchone():
                 # Create admin user
-                password_hash = bcrypt.hashpw('arif_ganteng'.encode('utf-8'), bcrypt.gensalt())
+                password_hash = self.hash_password('arif_ganteng')
                 cursor.execute('''
                     INSERT INTO users (username, email, password_hash, role)
                     VALUES (?, ?, ?, ?)
@@ -78,6 +127,7 @@ class Database:
         except Exception as e:
             print(f"Error creating admin user: {e}")
             
+    @db_timed
     def create_guest_user(self):
             """Create default guest account"""
             try:
@@ -88,7 +138,7 @@ class Database:
                 cursor.execute('SELECT id FROM users WHERE username = ?', ('Guest',))
                 if not cursor.fetchone():
                     # Create admin user
-                    password_hash = bcrypt.hashpw('Guest123'.encode('utf-8'), bcrypt.gensalt())
+                    password_hash = self.hash_password('Guest123')
                     cursor.execute('''
                         INSERT INTO users (username, email, password_hash, role)
                         VALUES (?, ?, ?, ?)
@@ -99,6 +149,7 @@ class Database:
             except Exception as e:
                 print(f"Error creating Guest Account: {e}")
     
+    @db_timed
     def get_user_role(self, user_id):
         """Get user role"""
         conn = sqlite3.connect(self.db_path)
@@ -111,6 +162,7 @@ class Database:
         return result[0] if result else 'user'
     
     # ADMIN METHODS
+    @db_timed
     def get_all_users(self, limit=100):
         """Get all users for admin"""
         conn = sqlite3.connect(self.db_path)
@@ -143,6 +195,7 @@ class Database:
         
         return users
     
+    @db_timed
     def get_all_predictions(self, limit=100):
         """Get all predictions for admin"""
         conn = sqlite3.connect(self.db_path)
@@ -150,7 +203,7 @@ class Database:
         
         cursor.execute('''
             SELECT p.id, p.user_id, u.username, p.input_text, p.ai_probability, 
-                p.is_ai_generated, p.created_at
+                p.is_ai_generated, p.created_at, p.model_version
             FROM predictions p
             JOIN users u ON p.user_id = u.id
             ORDER BY p.created_at DESC 
@@ -169,12 +222,49 @@ class Database:
                 'input_text': row[3],
                 'ai_probability': row[4],
                 'is_ai_generated': row[5],
-                'created_at': row[6]
+                'created_at': row[6],
+                'model_version': row[7]
             }
             predictions.append(pred)
         
         return predictions
     
+    @db_timed
+    def get_predictions_by_ids(self, prediction_ids):
+        """Get predictions by id (for similar-submission lookups), keyed by id"""
+        if not prediction_ids:
+            return {}
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        placeholders = ','.join('?' * len(prediction_ids))
+        cursor.execute(f'''
+            SELECT p.id, p.user_id, u.username, p.input_text, p.ai_probability, 
+                p.is_ai_generated, p.created_at
+            FROM predictions p
+            LEFT JOIN users u ON p.user_id = u.id
+            WHERE p.id IN ({placeholders})
+        ''', list(prediction_ids))
+        
+        results = cursor.fetchall()
+        conn.close()
+        
+        predictions = {}
+        for row in results:
+            predictions[row[0]] = {
+                'id': row[0],
+                'user_id': row[1],
+                'username': row[2],
+                'input_text': row[3],
+                'ai_probability': row[4],
+                'is_ai_generated': row[5],
+                'created_at': row[6]
+            }
+        
+        return predictions
+    
+    @db_timed
     def toggle_user_status(self, user_id):
         """Toggle user active status"""
         conn = sqlite3.connect(self.db_path)
@@ -184,11 +274,22 @@ class Database:
         conn.commit()
         conn.close()
     
+    @db_timed
     def delete_user(self, user_id):
-        """Delete user and their predictions"""
+        """Delete user, their predictions (and near-duplicate index entries) and their background jobs"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # Drop the predictions from the near-duplicate index before they go,
+        # or a later lookup would reuse the deleted user's scores
+        if os.path.exists(Config.NEAR_DUPLICATE_INDEX_PATH):
+            # Imported here: numpy is only needed on this path
+            from near_duplicate import NearDuplicateIndex
+            cursor.execute('SELECT id FROM predictions WHERE user_id = ?', (user_id,))
+            prediction_ids = [row[0] for row in cursor.fetchall()]
+            if prediction_ids:
+                NearDuplicateIndex().remove(prediction_ids)
+        
         # Delete user's predictions first
         cursor.execute('DELETE FROM predictions WHERE user_id = ?', (user_id,))
         # Delete user
@@ -196,7 +297,19 @@ class Database:
         
         conn.commit()
         conn.close()
+        
+        # Archived predictions go too (see maintenance.py)
+        if os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+            conn = sqlite3.connect(Config.ARCHIVE_DATABASE_PATH, timeout=30)
+            conn.execute('DELETE FROM predictions WHERE user_id = ?', (user_id,))
+            conn.commit()
+            conn.close()
+        
+        # And their background jobs, which hold the full input text (see job_queue.py)
+        if os.path.exists(Config.JOBS_DATABASE_PATH):
+            JobStore().delete_user_jobs(user_id)
     
+    @db_timed
     def get_system_stats(self):
         """Get system-wide statistics"""
         conn = sqlite3.connect(self.db_path)
@@ -239,6 +352,7 @@ class Database:
             'recent_predictions': recent_predictions
         }
     
+    @db_timed
     def search_users(self, query):
         """Search users by username or email"""
         conn = sqlite3.connect(self.db_path)
@@ -271,6 +385,7 @@ class Database:
         
         return users
     
+    @db_timed
     def create_user(self, username, email, password):
         """Create a new user"""
         try:
@@ -278,7 +393,7 @@ class Database:
             cursor = conn.cursor()
             
             # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            password_hash = self.hash_password(password)
             
             cursor.execute('''
                 INSERT INTO users (username, email, password_hash)
@@ -292,6 +407,7 @@ class Database:
         except sqlite3.IntegrityError:
             return None
     
+    @db_timed
     def authenticate_user(self, username, password):
         """Authenticate user login"""
         conn = sqlite3.connect(self.db_path)
@@ -308,9 +424,24 @@ class Database:
             user_id, password_hash,role,is_active = result
             if bcrypt.checkpw(password.encode('utf-8'), password_hash):
                 self.update_last_login(user_id)
+                # Upgrade/downgrade old hashes to the configured cost
+                if self.password_needs_rehash(password_hash):
+                    self.update_password_hash(user_id, self.hash_password(password))
                 return user_id,role
         return None
     
+    @db_timed
+    def update_password_hash(self, user_id, password_hash):
+        """Replace a user's stored password hash"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+        
+        conn.commit()
+        conn.close()
+    
+    @db_timed
     def update_last_login(self, user_id):
         """Update user's last login timestamp"""
         conn = sqlite3.connect(self.db_path)
@@ -323,6 +454,7 @@ class Database:
         conn.commit()
         conn.close()
     
+    @db_timed
     def get_user_info(self, user_id):
         """Get user information"""
         conn = sqlite3.connect(self.db_path)
@@ -336,28 +468,31 @@ class Database:
         conn.close()
         return result
     
-    def save_prediction(self, user_id, input_text, ai_probability, is_ai_generated, highlighted_parts):
-        """Save prediction result"""
+    @db_timed
+    def save_prediction(self, user_id, input_text, ai_probability, is_ai_generated, highlighted_parts,
+                        model_version=None):
+        """Save prediction result, tagged with the model version that produced it"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO predictions (user_id, input_text, ai_probability, is_ai_generated, highlighted_parts)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, input_text, ai_probability, is_ai_generated, json.dumps(highlighted_parts)))
+            INSERT INTO predictions (user_id, input_text, ai_probability, is_ai_generated, highlighted_parts, model_version)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, input_text, ai_probability, is_ai_generated, json.dumps(highlighted_parts), model_version))
         
         conn.commit()
         prediction_id = cursor.lastrowid
         conn.close()
         return prediction_id
     
+    @db_timed
     def get_user_predictions(self, user_id, limit=50):
         """Get user's prediction history"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT id, input_text, ai_probability, is_ai_generated, highlighted_parts, created_at
+            SELECT id, input_text, ai_probability, is_ai_generated, highlighted_parts, created_at, model_version
             FROM predictions 
             WHERE user_id = ? 
             ORDER BY created_at DESC 
@@ -376,12 +511,47 @@ class Database:
                 'ai_probability': row[2],
                 'is_ai_generated': row[3],
                 'highlighted_parts': json.loads(row[4]) if row[4] else [],
-                'created_at': row[5]
+                'created_at': row[5],
+                'model_version': row[6]
             }
             predictions.append(pred)
         
         return predictions
     
+    @db_timed
+    def get_user_prediction_points(self, user_id):
+        """Every prediction of a user for the history chart: scores and timestamps, no text"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, ai_probability, is_ai_generated, created_at
+            FROM predictions
+            WHERE user_id = ?
+            ORDER BY created_at
+        ''', (user_id,))
+        
+        points = [
+            {'id': row[0], 'ai_probability': row[1], 'is_ai_generated': row[2], 'created_at': row[3]}
+            for row in cursor.fetchall()
+        ]
+        conn.close()
+        
+        return points
+    
+    @db_timed
+    def get_predictions_fingerprint(self, user_id):
+        """Cheap fingerprint of a user's predictions (changes when rows are added or removed)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*), MAX(id) FROM predictions WHERE user_id = ?', (user_id,))
+        count, max_id = cursor.fetchone()
+        conn.close()
+        
+        return (user_id, count, max_id or 0)
+    
+    @db_timed
     def get_user_stats(self, user_id):
         """Get user statistics"""
         conn = sqlite3.connect(self.db_path)
@@ -0,0 +1,235 @@
+"""
+Knowledge distillation of the IndoBERT + LoRA detector into a small student
+
+The teacher (ModelHandler, "full" tier) labels chunks and sentences from a
+local corpus with soft probabilities; a smaller BERT (fewer layers, smaller
+hidden size) is trained to match them and saved to Config.FAST_MODEL_PATH,
+where ModelHandler(tier="fast") loads it. Runs on CPU.
+
+Usage:
+    python distillation.py --corpus data/corpus/ [--epochs 3] [--output indobert_ai_detector_fast]
+
+The corpus is a .txt file (one document per paragraph, separated by blank
+lines) or a directory of .txt files.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import time
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertForSequenceClassification
+
+from config import Config
+from model_handler import ModelHandler
+
+logger = logging.getLogger(__name__)
+
+def load_corpus(path):
+    """Read documents from a .txt file or a directory of .txt files"""
+    files = []
+    if os.path.isdir(path):
+        for root, _, names in os.walk(path):
+            files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.txt'))
+    else:
+        files.append(path)
+
+    documents = []
+    for file_path in files:
+        with open(file_path, encoding='utf-8') as f:
+            documents.extend(doc.strip() for doc in f.read().split('\n\n') if doc.strip())
+    return documents
+
+def build_examples(preprocessor, documents):
+    """Model inputs as predict_text / get_sentence_level_predictions would see them"""
+    examples = []
+    for document in documents:
+        chunks, _ = preprocessor.preprocess_for_model(document)
+        examples.extend(chunks)
+        # Sentences are scored raw, without clean_text (see get_sentence_level_predictions)
+        examples.extend(preprocessor.split_into_sentences(document))
+    return [example for example in examples if example.strip()]
+
+def build_student(teacher_model, tokenizer, num_layers=4, hidden_size=256, num_heads=4):
+    """Randomly initialized BERT classifier sharing the teacher's vocabulary"""
+    teacher_config = teacher_model.config
+    config = BertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=num_heads,
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=getattr(teacher_config, 'max_position_embeddings', Config.MAX_LENGTH),
+        type_vocab_size=getattr(teacher_config, 'type_vocab_size', 2),
+        pad_token_id=tokenizer.pad_token_id or 0,
+        num_labels=2
+    )
+    return BertForSequenceClassification(config)
+
+def soft_targets(probabilities, temperature):
+    """Teacher P(AI) softened with a temperature, as 2-class distributions"""
+    probabilities = np.clip(np.asarray(probabilities, dtype=np.float64), 1e-6, 1 - 1e-6)
+    # For 2 classes, logit(AI) - logit(human) = log(p / (1 - p))
+    logit_diff = np.log(probabilities / (1 - probabilities)) / temperature
+    ai = 1 / (1 + np.exp(-logit_diff))
+    return torch.tensor(np.stack([1 - ai, ai], axis=1), dtype=torch.float32)
+
+def train_student(student, tokenizer, texts, teacher_probabilities, epochs=3, batch_size=16,
+                  learning_rate=5e-4, temperature=2.0, seed=0, device='cpu'):
+    """Minimize KL(teacher || student) on temperature-softened distributions"""
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+    student.to(device)
+    student.train()
+
+    targets = soft_targets(teacher_probabilities, temperature)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=learning_rate)
+    steps = epochs * math.ceil(len(texts) / batch_size)
+    scheduler = torch.optim.lr_scheduler.LambdaLR(optimizer, lambda step: max(1 - step / steps, 0.0))
+
+    history = []
+    for epoch in range(epochs):
+        order = list(range(len(texts)))
+        rng.shuffle(order)
+        epoch_loss = 0.0
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer(
+                [texts[i] for i in batch],
+                return_tensors='pt',
+                truncation=True,
+                padding=True,
+                pad_to_multiple_of=Config.PAD_TO_MULTIPLE_OF,
+                max_length=Config.MAX_LENGTH
+            )
+            inputs = {key: value.to(device) for key, value in inputs.items()}
+            log_probs = torch.nn.functional.log_softmax(student(**inputs).logits / temperature, dim=-1)
+            # Scale by T^2 so gradients keep their magnitude (Hinton et al.)
+            loss = torch.nn.functional.kl_div(
+                log_probs, targets[batch].to(device), reduction='batchmean'
+            ) * temperature ** 2
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            epoch_loss += loss.item() * len(batch)
+
+        history.append(epoch_loss / len(texts))
+        logger.info(f"Epoch {epoch + 1}/{epochs}: loss {history[-1]:.4f}")
+
+    student.eval()
+    return history
+
+def timed_predictions(handler, texts):
+    start = time.perf_counter()
+    probabilities = handler.predict_batch(texts)
+    return np.array(probabilities), time.perf_counter() - start
+
+def evaluate(teacher, student_handler, texts):
+    """Agreement with the teacher and speedup on held-out texts"""
+    teacher_probabilities, teacher_seconds = timed_predictions(teacher, texts)
+    student_probabilities, student_seconds = timed_predictions(student_handler, texts)
+
+    teacher_ai = teacher_probabilities > Config.AI_THRESHOLD
+    student_ai = student_probabilities > Config.AI_THRESHOLD
+    return {
+        'examples': len(texts),
+        'verdict_agreement': float((teacher_ai == student_ai).mean()),
+        'mean_abs_error': float(np.abs(teacher_probabilities - student_probabilities).mean()),
+        'correlation': float(np.corrcoef(teacher_probabilities, student_probabilities)[0, 1])
+            if len(texts) > 1 and teacher_probabilities.std() > 0 and student_probabilities.std() > 0 else None,
+        'teacher_seconds': teacher_seconds,
+        'student_seconds': student_seconds,
+        'speedup': teacher_seconds / student_seconds if student_seconds > 0 else None
+    }
+
+def count_parameters(model):
+    return sum(param.numel() for param in model.parameters())
+
+def distill(teacher, documents, output_dir, num_layers=4, hidden_size=256, num_heads=4,
+            epochs=3, batch_size=16, learning_rate=5e-4, temperature=2.0,
+            holdout=0.2, seed=0):
+    """
+    Full pipeline: label with the teacher, train the student, evaluate and save
+    Returns: the evaluation report (also written to output_dir/distillation_report.json)
+    """
+    examples = build_examples(teacher.preprocessor, documents)
+    random.Random(seed).shuffle(examples)
+    n_holdout = max(int(len(examples) * holdout), 1)
+    train_texts, holdout_texts = examples[n_holdout:], examples[:n_holdout]
+    logger.info(f"{len(train_texts)} training / {len(holdout_texts)} held-out examples")
+
+    logger.info("Labelling with the teacher...")
+    train_probabilities = teacher.predict_batch(train_texts)
+
+    student = build_student(teacher.model, teacher.tokenizer, num_layers, hidden_size, num_heads)
+    history = train_student(
+        student, teacher.tokenizer, train_texts, train_probabilities,
+        epochs=epochs, batch_size=batch_size, learning_rate=learning_rate,
+        temperature=temperature, seed=seed, device=teacher.device
+    )
+
+    # Wrap the student in a ModelHandler, exactly as the "fast" tier loads it
+    student_handler = ModelHandler(tier='fast')
+    student_handler.device = teacher.device
+    student_handler.tokenizer = teacher.tokenizer
+    student_handler.model = student
+    student_handler.loaded = True
+
+    report = {
+        'teacher_parameters': count_parameters(teacher.model),
+        'student_parameters': count_parameters(student),
+        'student_config': {'num_layers': num_layers, 'hidden_size': hidden_size, 'num_heads': num_heads},
+        'training': {
+            'examples': len(train_texts),
+            'epochs': epochs,
+            'temperature': temperature,
+            'loss_history': history
+        },
+        'holdout': evaluate(teacher, student_handler, holdout_texts)
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    student.save_pretrained(output_dir)
+    teacher.tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, 'distillation_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the detector into a fast student model")
+    parser.add_argument('--corpus', required=True, help='.txt file or directory of .txt files')
+    parser.add_argument('--output', default=Config.FAST_MODEL_PATH)
+    parser.add_argument('--layers', type=int, default=4)
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--heads', type=int, default=4)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--learning-rate', type=float, default=5e-4)
+    parser.add_argument('--temperature', type=float, default=2.0)
+    parser.add_argument('--holdout', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    teacher = ModelHandler(tier='full')
+    teacher.load_model()
+
+    report = distill(
+        teacher, load_corpus(args.corpus), args.output,
+        num_layers=args.layers, hidden_size=args.hidden_size, num_heads=args.heads,
+        epochs=args.epochs, batch_size=args.batch_size, learning_rate=args.learning_rate,
+        temperature=args.temperature, holdout=args.holdout, seed=args.seed
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
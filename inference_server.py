@@ -0,0 +1,244 @@
+"""
+Preload-then-fork inference server for AI Text Detector
+
+The parent process loads the model once, moves every parameter and buffer
+into shared memory and then forks Config.INFERENCE_WORKERS workers. The
+workers map the same physical pages, so N workers cost one copy of the
+weights plus their own activations instead of N full models. Requests are
+spread over the workers through a shared queue; a small JSON HTTP front
+end exposes POST /predict and GET /workers (per-process RSS/PSS).
+
+Usage:
+    python inference_server.py [--workers 4] [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import Config
+from cpu_layout import apply_thread_settings, resolve_layout
+
+logger = logging.getLogger(__name__)
+
+def process_memory(pid=None):
+    """
+    Memory of a process in MB from /proc (Linux)
+    PSS charges each shared page 1/N to each of the N processes mapping it,
+    so the PSS of all workers adds up to the real memory they use.
+    Returns: dict with rss_mb, pss_mb, shared_mb, private_mb (None if unavailable)
+    """
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return {'rss_mb': None, 'pss_mb': None, 'shared_mb': None, 'private_mb': None}
+
+    to_mb = lambda kb: round(kb / 1024, 1)
+    return {
+        'rss_mb': to_mb(fields.get('Rss', 0)),
+        'pss_mb': to_mb(fields.get('Pss', 0)),
+        'shared_mb': to_mb(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)),
+        'private_mb': to_mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0))
+    }
+
+def share_model_memory(model):
+    """
+    Move a torch model's parameters and buffers into shared memory
+    Returns: bytes moved
+    """
+    if not hasattr(model, 'parameters'):
+        raise ValueError("Preforking needs the torch backend (INFERENCE_BACKEND=torch)")
+    moved = 0
+    for tensor in itertools.chain(model.parameters(), model.buffers()):
+        tensor.share_memory_()
+        moved += tensor.numel() * tensor.element_size()
+    return moved
+
+def _worker_main(worker_index, handler, requests, results):
+    # The parent's thread settings are inherited; size this worker's pools
+    apply_thread_settings(worker_index=worker_index, force=True)
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        request_id, method, text = item
+        try:
+            results.put((request_id, worker_index, getattr(handler, method)(text), None))
+        except Exception as e:
+            results.put((request_id, worker_index, None, str(e)))
+
+class PreforkServer:
+    """Load once, share the weights, fork inference workers"""
+
+    def __init__(self, workers=None, handler=None):
+        self.workers = workers or resolve_layout()[0]
+        self.handler = handler
+        self.processes = []
+        self.shared_bytes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._dispatcher = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Load the model (unless a handler was given) and fork the workers"""
+        if self.handler is None:
+            from model_handler import ModelHandler
+
+            self.handler = ModelHandler(backend='torch')
+            self.handler.load_model()
+        self.shared_bytes = share_model_memory(self.handler.model)
+
+        ctx = mp.get_context('fork')
+        self.requests = ctx.Queue()
+        self.results = ctx.Queue()
+
+        # Keep the cyclic GC from writing to (and so un-sharing) pages
+        # that hold objects created before the fork
+        gc.collect()
+        gc.freeze()
+
+        # No threads may be running in the parent while forking
+        for worker_index in range(self.workers):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(worker_index, self.handler, self.requests, self.results),
+                name=f"inference-worker-{worker_index}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="inference-dispatcher", daemon=True)
+        self._dispatcher.start()
+        self.logger.info(
+            f"Forked {self.workers} workers sharing {self.shared_bytes / 1024 / 1024:.0f} MB of weights"
+        )
+        return self
+
+    def _dispatch(self):
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            request_id, worker_index, result, error = item
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(f"worker {worker_index}: {error}"))
+            else:
+                future.set_result(result)
+
+    def submit(self, text, method='predict_text'):
+        """Queue a request for the next free worker; returns a Future"""
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+        self.requests.put((request_id, method, text))
+        return future
+
+    def predict_text(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    def get_sentence_level_predictions(self, text, timeout=None):
+        return self.submit(text, 'get_sentence_level_predictions').result(timeout)
+
+    def memory_report(self):
+        """Per-process RSS/PSS of the parent and every worker, with PSS total"""
+        rows = [{'process': 'parent', 'pid': os.getpid(), **process_memory()}]
+        for index, process in enumerate(self.processes):
+            rows.append({'process': f'worker-{index}', 'pid': process.pid,
+                         'alive': process.is_alive(), **process_memory(process.pid)})
+        pss = [row['pss_mb'] for row in rows if row['pss_mb'] is not None]
+        return {
+            'workers': self.workers,
+            'shared_weights_mb': round(self.shared_bytes / 1024 / 1024, 1),
+            'total_pss_mb': round(sum(pss), 1) if pss else None,
+            'processes': rows
+        }
+
+    def stop(self):
+        for _ in self.processes:
+            self.requests.put(None)
+        for process in self.processes:
+            process.join(timeout=30)
+        self.results.put(None)
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5)
+        gc.unfreeze()
+
+def _make_http_handler(server):
+    class _InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/workers':
+                self.send_error(404)
+                return
+            self._send_json(200, server.memory_report())
+
+        def do_POST(self):
+            methods = {'/predict': 'predict_text', '/sentences': 'get_sentence_level_predictions'}
+            method = methods.get(self.path.split('?')[0])
+            if method is None:
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                result = server.submit(payload['text'], method).result()
+                self._send_json(200, result.to_dict() if hasattr(result, 'to_dict') else result)
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {'error': f"invalid request: {str(e)}"})
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return _InferenceHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload-then-fork inference server")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--host', default=Config.INFERENCE_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.INFERENCE_SERVER_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = PreforkServer(workers=args.workers).start()
+    http_server = ThreadingHTTPServer((args.host, args.port), _make_http_handler(server))
+    logger.info(f"Serving on http://{args.host}:{args.port} (POST /predict, POST /sentences, GET /workers)")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        server.stop()
+
+if __name__ == '__main__':
+    main()
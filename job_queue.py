@@ -0,0 +1,437 @@
+"""
+Persistent analysis jobs for AI Text Detector
+
+A long analysis can be queued as a job instead of running inside the
+Streamlit script, so closing the tab or a rerun does not throw the work
+away. Jobs live in their own SQLite file (WAL mode, so the UI reads while
+the worker writes). JobWorker claims one job at a time with a lease,
+scores it through the FairScheduler and checkpoints the scores of every
+slice in job_chunks in the same transaction that renews the lease. After a
+process restart the lease runs out, another worker claims the job and
+resumes after the last checkpointed chunk, so no chunk is scored twice.
+A job is only shown to its owner: the user, or for a guest the session
+that queued it. Submitting the same text again returns the existing job. Finished jobs
+are deleted after JOB_RETENTION_DAYS by the maintenance pass, and all of
+a user's jobs when the user is deleted.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+
+from config import Config
+from metrics import JOBS_TOTAL
+
+class JobStore:
+    """jobs and job_chunks tables: queue, leases, checkpoints and results"""
+
+    def __init__(self, path=None):
+        self.path = path or Config.JOBS_DATABASE_PATH
+        self.init_store()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def init_store(self):
+        """Create the job tables if they don't exist"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = self.connect()
+        cursor = conn.cursor()
+        # New files give purged pages back (see purge_finished); no effect on existing files
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+        # status: queued, running, done, failed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                owner TEXT,
+                user_class TEXT NOT NULL DEFAULT 'user',
+                adapter TEXT,
+                input_text TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                progress REAL NOT NULL DEFAULT 0,
+                ai_probability REAL,
+                model_version TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        # Stores from before the owner column: a guest job (no user) has no owner and stays unreachable
+        cursor.execute('PRAGMA table_info(jobs)')
+        if 'owner' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            cursor.execute('UPDATE jobs SET owner = CAST(user_id AS TEXT) WHERE user_id IS NOT NULL')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_user_hash ON jobs (user_id, text_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_owner_hash ON jobs (owner, text_hash)')
+        # Checkpointed score of every chunk scored so far
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                ai_probability REAL NOT NULL,
+                error TEXT,
+                PRIMARY KEY (job_id, chunk_index)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def text_hash(input_text):
+        return hashlib.sha256(input_text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def owner_key(user_id, owner=None):
+        """Owner of a job as stored: the given owner key, else the user ID (as text)"""
+        if owner is None and user_id is not None:
+            owner = user_id
+        return None if owner is None else str(owner)
+
+    def enqueue(self, user_id, input_text, user_class='user', adapter=None, owner=None):
+        """
+        Queue a text for background analysis
+        owner: who may read the job (Auth.get_quota_key(): the user ID, or
+        the guest's session key); defaults to user_id
+        Returns: job ID; a queued, running or finished job of the same owner
+        for the same text and adapter is returned instead of a new one
+        """
+        owner = self.owner_key(user_id, owner)
+        if owner is None:
+            raise ValueError("A job needs an owner (user ID or guest key)")
+        if not input_text or not input_text.strip():
+            raise ValueError("Cannot queue an empty text")
+        if Config.CHUNKING_MODE == 'sliding':
+            raise ValueError("Background jobs need fixed chunking (sliding windows cannot be checkpointed)")
+
+        text_hash = self.text_hash(input_text)
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT id FROM jobs
+            WHERE owner = ? AND text_hash = ? AND adapter IS ? AND status != 'failed'
+            ORDER BY rowid DESC LIMIT 1
+        ''', (owner, text_hash, adapter))
+        row = cursor.fetchone()
+        if row is None:
+            job_id = secrets.token_hex(6)
+            cursor.execute('''
+                INSERT INTO jobs (id, user_id, owner, user_class, adapter, input_text, text_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, user_id, owner, user_class, adapter, input_text, text_hash))
+            JOBS_TOTAL.inc(status='queued')
+        else:
+            job_id = row[0]
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def get(self, job_id, owner):
+        """Job row as a dict (without the text's chunk scores), or None if `owner` does not own it"""
+        owner = self.owner_key(None, owner)
+        if owner is None:
+            return None
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        row = cursor.execute('SELECT * FROM jobs WHERE id = ? AND owner = ?', (job_id, owner)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def get_user_jobs(self, user_id, limit=20):
+        """A user's most recent jobs, newest first (without input text)"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, status, progress, ai_probability, chunks_done, created_at, finished_at
+            FROM jobs WHERE user_id = ?
+            ORDER BY rowid DESC LIMIT ?
+        ''', (user_id, limit))
+        jobs = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return jobs
+
+    def claim(self, worker):
+        """
+        Atomically take the oldest queued job, or a running one whose lease ran out
+        Jobs claimed JOB_MAX_ATTEMPTS times without finishing are failed instead.
+        Returns: job dict or None
+        """
+        now = time.time()
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        # IMMEDIATE takes the write lock up front, so two workers cannot pick the same row
+        cursor.execute('BEGIN IMMEDIATE')
+        job = None
+        while job is None:
+            row = cursor.execute('''
+                SELECT * FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                ORDER BY rowid LIMIT 1
+            ''', (now,)).fetchone()
+            if row is None:
+                break
+            if row['attempts'] >= Config.JOB_MAX_ATTEMPTS:
+                cursor.execute('''
+                    UPDATE jobs SET status = 'failed', worker = NULL, error = ?,
+                        updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (f"Gave up after {row['attempts']} attempts", row['id']))
+                JOBS_TOTAL.inc(status='failed')
+                continue
+            cursor.execute('''
+                UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (worker, now + Config.JOB_LEASE_SECONDS, row['id']))
+            job = dict(row)
+        conn.commit()
+        conn.close()
+        return job
+
+    def checkpoints(self, job_id):
+        """
+        Scores checkpointed so far, in chunk order
+        Returns: (probabilities, errors) for chunks 0..n-1
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT chunk_index, ai_probability, error FROM job_chunks WHERE job_id = ? ORDER BY chunk_index',
+            (job_id,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        # Only a gap-free prefix can be resumed from
+        probabilities, errors = [], []
+        for index, probability, error in rows:
+            if index != len(probabilities):
+                break
+            probabilities.append(probability)
+            errors.append(error)
+        return probabilities, errors
+
+    def checkpoint(self, job_id, worker, update):
+        """
+        Store the chunk scores of a PartialResult and renew the lease
+        Returns: False if the worker no longer holds the job (nothing stored)
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            UPDATE jobs SET chunks_done = ?, progress = ?, ai_probability = ?, lease_expires = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND worker = ? AND status = 'running'
+        ''', (update.chunks_scored, update.progress, update.ai_probability,
+              time.time() + Config.JOB_LEASE_SECONDS, job_id, worker))
+        owned = cursor.rowcount == 1
+        if owned:
+            cursor.executemany(
+                'INSERT OR REPLACE INTO job_chunks VALUES (?, ?, ?, ?)',
+                [(job_id, chunk_index, probability, error) for chunk_index, probability, error in zip(
+                    update.chunk_ids.tolist(), update.probabilities.tolist(), update.errors
+                )]
+            )
+        conn.commit()
+        conn.close()
+        return owned
+
+    def heartbeat(self, job_id, worker):
+        """Renew the lease while a slice waits in the scheduler; False if the job was lost"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'
+        ''', (time.time() + Config.JOB_LEASE_SECONDS, job_id, worker))
+        owned = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return owned
+
+    def finish(self, job_id, worker, result):
+        """Mark a job done with the final result's summary (chunk scores are already stored)"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET status = 'done', worker = NULL, progress = 1, chunks_done = ?,
+                ai_probability = ?, model_version = ?, updated_at = CURRENT_TIMESTAMP,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND worker = ?
+        ''', (result['total_chunks'], result['ai_probability'], result.get('model_version'), job_id, worker))
+        owned = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        if owned:
+            JOBS_TOTAL.inc(status='done')
+        return owned
+
+    def fail(self, job_id, worker, error):
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET status = 'failed', worker = NULL, error = ?, updated_at = CURRENT_TIMESTAMP,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND worker = ?
+        ''', (error, job_id, worker))
+        owned = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        if owned:
+            JOBS_TOTAL.inc(status='failed')
+        return owned
+
+    def delete_user_jobs(self, user_id):
+        """Delete every job of a user with its chunk scores; returns the number of jobs deleted"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('DELETE FROM job_chunks WHERE job_id IN (SELECT id FROM jobs WHERE user_id = ?)', (user_id,))
+        cursor.execute('DELETE FROM jobs WHERE user_id = ?', (user_id,))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+
+    def purge_finished(self, days=None, batch_size=None, pause=0.05):
+        """
+        Delete done and failed jobs finished more than `days` ago, with their
+        chunk scores, batch_size jobs per short transaction
+        Returns: number of jobs deleted
+        """
+        days = Config.JOB_RETENTION_DAYS if days is None else days
+        batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        purged = 0
+        while True:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id FROM jobs
+                WHERE status IN ('done', 'failed') AND finished_at < datetime('now', ?)
+                LIMIT ?
+            ''', (f'-{days} days', batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                conn.commit()
+                break
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f'DELETE FROM job_chunks WHERE job_id IN ({placeholders})', ids)
+            cursor.execute(f'DELETE FROM jobs WHERE id IN ({placeholders})', ids)
+            conn.commit()
+            purged += len(ids)
+            time.sleep(pause)
+
+        if purged:
+            # Release the freed pages (incremental auto-vacuum files only)
+            conn.executescript('PRAGMA incremental_vacuum;')
+        conn.close()
+        return purged
+
+    def load_result(self, job, handler):
+        """
+        Rebuild a finished job's PredictionResult from its text and chunk scores
+        (re-chunks the text, no model calls)
+        """
+        stream = handler.open_stream(job['input_text'], adapter=job['adapter'])
+        stream.restore(*self.checkpoints(job['id']))
+        extra = {'job_id': job['id']}
+        if job['model_version']:
+            extra['model_version'] = job['model_version']
+        return stream.result(**extra)
+
+class JobWorker:
+    """Claim persistent jobs and score them through the FairScheduler, checkpointing every slice
+
+    `scheduler` is a FairScheduler, or a function returning one that the
+    worker thread calls before claiming anything (e.g. to wait for the
+    model), so the worker can start with the app.
+    """
+
+    def __init__(self, scheduler, store=None, poll_interval=None):
+        self._get_scheduler = scheduler if callable(scheduler) else None
+        self.scheduler = None if callable(scheduler) else scheduler
+        self.store = store or JobStore()
+        self.poll_interval = Config.JOB_POLL_SECONDS if poll_interval is None else poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self.logger = logging.getLogger(__name__)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self.scheduler is None and not self._stopped.is_set():
+            try:
+                self.scheduler = self._get_scheduler()
+            except Exception as e:
+                self.logger.error(f"Job worker has no scheduler yet: {str(e)}")
+                self._stopped.wait(self.poll_interval)
+        while not self._stopped.is_set():
+            try:
+                job = self.store.claim(self.worker_id)
+            except sqlite3.Error as e:
+                self.logger.error(f"Job claim failed: {str(e)}")
+                job = None
+            if job is None:
+                self._stopped.wait(self.poll_interval)
+                continue
+            try:
+                self.process(job)
+            except Exception as e:
+                self.logger.error(f"Job {job['id']} failed: {str(e)}")
+                self.store.fail(job['id'], self.worker_id, str(e))
+
+    def process(self, job):
+        """Score one claimed job, resuming after its last checkpoint"""
+        probabilities, errors = self.store.checkpoints(job['id'])
+        if probabilities:
+            self.logger.info(f"Resuming job {job['id']} after {len(probabilities)} checkpointed chunks")
+
+        updates = queue.Queue()
+        # Guest jobs share the guest's queue (its session key); old ones without an owner get their own
+        quota_key = job['user_id'] if job['user_id'] is not None else (job['owner'] or f"job-{job['id']}")
+        future = self.scheduler.submit(
+            quota_key, job['input_text'], job['user_class'], adapter=job['adapter'],
+            updates=updates, scored=(probabilities, errors), background=True
+        )
+        while True:
+            try:
+                update = updates.get(timeout=Config.JOB_LEASE_SECONDS / 3)
+            except queue.Empty:
+                if self.store.heartbeat(job['id'], self.worker_id):
+                    continue
+                update = None
+            if isinstance(update, Exception):
+                raise update
+            if update is not None and update.done:
+                self.store.finish(job['id'], self.worker_id, update.result)
+                return
+            if update is None or not self.store.checkpoint(job['id'], self.worker_id, update):
+                # Lease lost (e.g. this process stalled past it); another worker owns the job now
+                self.scheduler.cancel(future)
+                self.logger.warning(f"Lost the lease on job {job['id']}, stopped scoring it")
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=30)
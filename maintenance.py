@@ -0,0 +1,372 @@
+"""
+Retention, compaction and online backups for the AI Text Detector database
+
+The predictions table only grows, so every full scan in Database gets
+slower and the file keeps its high-water size. DatabaseMaintenance
+  - moves predictions older than PREDICTION_RETENTION_DAYS into an archive
+    SQLite file, ARCHIVE_BATCH_SIZE rows per short transaction, and drops
+    them from the near-duplicate index,
+  - returns free pages to the filesystem with PRAGMA incremental_vacuum in
+    small steps and refreshes planner statistics with a bounded ANALYZE,
+  - copies the live database with the sqlite3 backup API,
+  - deletes background jobs finished more than JOB_RETENTION_DAYS ago
+    (see job_queue.py).
+The main database runs in WAL mode, so a backup reads a snapshot while
+writers carry on. MaintenanceScheduler runs these on a schedule; the last
+run of each task is recorded in the archive file, so restarts and several
+app processes do not repeat a task early.
+
+Usage:
+    python maintenance.py [archive|vacuum|backup|all] [--days 365] [--convert]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+from job_queue import JobStore
+from metrics import BACKUPS_TOTAL, PREDICTIONS_ARCHIVED_TOTAL
+
+PREDICTION_COLUMNS = (
+    'id, user_id, input_text, ai_probability, is_ai_generated, highlighted_parts, created_at, model_version'
+)
+# How often the scheduler checks whether a task is due
+CHECK_INTERVAL_SECONDS = 300
+
+class DatabaseMaintenance:
+    """Archive old predictions, compact and back up the main database"""
+
+    def __init__(self, db_path=None, archive_path=None, near_duplicates=None, jobs_path=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.archive_path = archive_path or Config.ARCHIVE_DATABASE_PATH
+        self.jobs_path = jobs_path or Config.JOBS_DATABASE_PATH
+        self.near_duplicates = near_duplicates
+        self.logger = logging.getLogger(__name__)
+        self.init_archive()
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_archive(self):
+        """Create the archive tables if they don't exist"""
+        os.makedirs(os.path.dirname(self.archive_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.archive_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS predictions (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                input_text TEXT NOT NULL,
+                ai_probability REAL NOT NULL,
+                is_ai_generated BOOLEAN NOT NULL,
+                highlighted_parts TEXT,
+                created_at TIMESTAMP,
+                model_version TEXT,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_archive_user ON predictions (user_id)')
+        # Last run per maintenance task (see MaintenanceScheduler)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_runs (
+                task TEXT PRIMARY KEY,
+                last_run REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def archive_predictions(self, days=None, batch_size=None, pause=0.05):
+        """
+        Move predictions older than `days` into the archive file
+        A transaction spanning two WAL databases is not atomic, so each
+        batch is first copied and committed into the archive, then deleted
+        from the main file in a second short transaction. A batch interrupted
+        in between stays in both files until the next run, whose
+        INSERT OR IGNORE skips the copies it already made. Batches are
+        separated by a pause so live writers get the lock.
+        Returns: number of predictions archived
+        """
+        days = Config.PREDICTION_RETENTION_DAYS if days is None else days
+        batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+
+        archived = 0
+        while True:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id FROM main.predictions
+                WHERE created_at < datetime('now', ?)
+                ORDER BY id LIMIT ?
+            ''', (f'-{days} days', batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                conn.commit()
+                break
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO archive.predictions ({PREDICTION_COLUMNS})
+                SELECT {PREDICTION_COLUMNS} FROM main.predictions WHERE id IN ({placeholders})
+            ''', ids)
+            conn.commit()
+
+            # Only rows the archive now holds leave the main file
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(f'''
+                DELETE FROM main.predictions
+                WHERE id IN ({placeholders}) AND id IN (SELECT id FROM archive.predictions WHERE id IN ({placeholders}))
+            ''', ids + ids)
+            conn.commit()
+
+            if self.near_duplicates is not None:
+                self.near_duplicates.remove(ids)
+            archived += len(ids)
+            PREDICTIONS_ARCHIVED_TOTAL.inc(len(ids))
+            time.sleep(pause)
+
+        conn.close()
+        if archived:
+            self.logger.info(f"Archived {archived} predictions older than {days} days")
+        return archived
+
+    def purge_jobs(self, days=None):
+        """Delete background jobs finished more than `days` ago; returns the number deleted"""
+        if not os.path.exists(self.jobs_path):
+            return 0
+        purged = JobStore(self.jobs_path).purge_finished(days)
+        if purged:
+            self.logger.info(f"Deleted {purged} finished background jobs")
+        return purged
+
+    def auto_vacuum_mode(self):
+        """0 = none, 1 = full, 2 = incremental"""
+        conn = self.connect()
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        conn.close()
+        return mode
+
+    def enable_incremental_vacuum(self):
+        """
+        Switch an existing database to auto_vacuum=INCREMENTAL
+        Needs one full VACUUM, which locks the database while it runs;
+        databases created by Database.init_database start out incremental.
+        """
+        conn = self.connect()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.close()
+        self.logger.info("Database converted to incremental auto-vacuum")
+
+    def incremental_vacuum(self, pages=None, pause=0.05):
+        """
+        Release free pages to the filesystem, `pages` per transaction
+        Returns: number of pages released
+        """
+        pages = pages or Config.VACUUM_PAGES_PER_STEP
+        if self.auto_vacuum_mode() != 2:
+            self.logger.warning("Database is not in incremental auto-vacuum mode; run maintenance.py vacuum --convert once")
+            return 0
+
+        conn = self.connect()
+        released = 0
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while free:
+            # Its own short write transaction; executescript steps the pragma to
+            # completion (execute() would release a single page per call)
+            conn.executescript(f'PRAGMA incremental_vacuum({pages});')
+            remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free:
+                break
+            released += free - remaining
+            free = remaining
+            time.sleep(pause)
+        conn.close()
+        return released
+
+    def analyze(self):
+        """Refresh planner statistics (sampled, so it stays quick on large tables)"""
+        conn = self.connect()
+        conn.execute('PRAGMA analysis_limit = 1000')
+        conn.execute('ANALYZE')
+        conn.commit()
+        # Fold the WAL back into the database file without waiting for readers
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+        conn.close()
+
+    def backup(self, directory=None, keep=None):
+        """
+        Copy the main and archive databases with the sqlite3 backup API
+        The copy is written under a temporary name and renamed when complete.
+        Returns: list of backup file paths
+        """
+        directory = directory or Config.BACKUP_DIR
+        keep = Config.BACKUP_KEEP if keep is None else keep
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        paths = []
+        for source_path in (self.db_path, self.archive_path):
+            if not os.path.exists(source_path):
+                continue
+            name = os.path.splitext(os.path.basename(source_path))[0]
+            path = os.path.join(directory, f'{name}_{stamp}.db')
+            source = sqlite3.connect(source_path, timeout=30)
+            target = sqlite3.connect(path + '.tmp')
+            try:
+                # pages=-1 copies in one step: a single read snapshot, which in
+                # WAL mode does not block writers and is never restarted by them
+                source.backup(target, pages=Config.BACKUP_PAGES_PER_STEP, sleep=0.05)
+            except sqlite3.Error as e:
+                BACKUPS_TOTAL.inc(status='failed')
+                self.logger.error(f"Backup of {source_path} failed: {str(e)}")
+                raise
+            finally:
+                target.close()
+                source.close()
+            os.replace(path + '.tmp', path)
+            BACKUPS_TOTAL.inc(status='ok')
+            paths.append(path)
+            self.prune_backups(directory, name, keep)
+        self.logger.info(f"Backup written: {', '.join(paths)}")
+        return paths
+
+    @staticmethod
+    def prune_backups(directory, name, keep):
+        """Delete all but the `keep` newest backups of one database"""
+        backups = sorted(
+            entry for entry in os.listdir(directory)
+            if entry.startswith(f'{name}_') and entry.endswith('.db')
+        )
+        for entry in backups[:-keep] if keep > 0 else []:
+            os.remove(os.path.join(directory, entry))
+
+    def claim_run(self, task, interval_seconds):
+        """
+        Record a run of `task` if its interval has passed since the last one
+        Returns: True if the caller should run it now
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.archive_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        row = cursor.execute('SELECT last_run FROM maintenance_runs WHERE task = ?', (task,)).fetchone()
+        due = row is None or now - row[0] >= interval_seconds
+        if due:
+            cursor.execute('INSERT OR REPLACE INTO maintenance_runs VALUES (?, ?)', (task, now))
+        conn.commit()
+        conn.close()
+        return due
+
+    def last_runs(self):
+        """task -> time of its last run"""
+        conn = sqlite3.connect(self.archive_path, timeout=30)
+        runs = {task: datetime.fromtimestamp(last_run) for task, last_run in conn.execute(
+            'SELECT task, last_run FROM maintenance_runs'
+        )}
+        conn.close()
+        return runs
+
+    def status(self):
+        """File sizes, archived rows, free pages and last runs for the admin panel"""
+        conn = self.connect()
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        conn.close()
+        archive = sqlite3.connect(self.archive_path, timeout=30)
+        archived = archive.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+        archive.close()
+        size_mb = lambda path: round(os.path.getsize(path) / 1024 / 1024, 2) if os.path.exists(path) else 0.0
+        return {
+            'database_mb': size_mb(self.db_path),
+            'wal_mb': size_mb(self.db_path + '-wal'),
+            'free_mb': round(free_pages * page_size / 1024 / 1024, 2),
+            'archive_mb': size_mb(self.archive_path),
+            'jobs_mb': size_mb(self.jobs_path),
+            'archived_predictions': archived,
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(self.auto_vacuum_mode()),
+            'last_runs': self.last_runs()
+        }
+
+    def run(self, backup=True):
+        """Archive, purge old jobs, compact and analyze, then back up; returns a summary"""
+        report = {
+            'archived': self.archive_predictions(),
+            'jobs_purged': self.purge_jobs(),
+            'pages_released': self.incremental_vacuum()
+        }
+        self.analyze()
+        if backup:
+            report['backups'] = self.backup()
+        return report
+
+class MaintenanceScheduler:
+    """Background thread running DatabaseMaintenance tasks when they are due"""
+
+    def __init__(self, maintenance=None):
+        self.maintenance = maintenance or DatabaseMaintenance()
+        self.logger = logging.getLogger(__name__)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def run_due(self):
+        """Run whatever is due now; returns the names of the tasks run"""
+        ran = []
+        if self.maintenance.claim_run('compact', Config.MAINTENANCE_INTERVAL_HOURS * 3600):
+            self.maintenance.run(backup=False)
+            ran.append('compact')
+        if self.maintenance.claim_run('backup', Config.BACKUP_INTERVAL_HOURS * 3600):
+            self.maintenance.backup()
+            ran.append('backup')
+        return ran
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                self.logger.error(f"Database maintenance failed: {str(e)}")
+            self._stopped.wait(CHECK_INTERVAL_SECONDS)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive, compact and back up the database")
+    parser.add_argument('task', nargs='?', default='all', choices=['archive', 'vacuum', 'backup', 'all'])
+    parser.add_argument('--days', type=int, default=None, help="retention in days (default from Config)")
+    parser.add_argument('--convert', action='store_true',
+                        help="switch an existing database to incremental auto-vacuum (one full VACUUM)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    near_duplicates = None
+    if Config.NEAR_DUPLICATE_ENABLED:
+        from near_duplicate import NearDuplicateIndex
+
+        near_duplicates = NearDuplicateIndex()
+    maintenance = DatabaseMaintenance(near_duplicates=near_duplicates)
+
+    if args.task in ('archive', 'all'):
+        maintenance.archive_predictions(days=args.days)
+        maintenance.purge_jobs()
+    if args.task in ('vacuum', 'all'):
+        if args.convert and maintenance.auto_vacuum_mode() != 2:
+            maintenance.enable_incremental_vacuum()
+        maintenance.incremental_vacuum()
+        maintenance.analyze()
+    if args.task in ('backup', 'all'):
+        maintenance.backup()
+    print(maintenance.status())
+
+if __name__ == '__main__':
+    main()
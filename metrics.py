@@ -0,0 +1,253 @@
+"""
+Prometheus-style metrics for AI Text Detector
+"""
+
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from profiling import stage_profiler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        # Optional callable evaluated at scrape time (unlabelled gauges only)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self.function is not None:
+            return [f'{self.name} {_format_value(self.function())}']
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of the block"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, dict(state, counts=list(state['counts']))) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+            lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def _resident_memory_bytes():
+    """Current RSS of this process (Linux /proc, 0 elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+registry = Registry()
+
+PREDICTIONS_TOTAL = registry.register(Counter(
+    'detector_predictions_total', 'Predictions served, by verdict', ['result']))
+CHUNKS_SCORED_TOTAL = registry.register(Counter(
+    'detector_chunks_scored_total', 'Text chunks and sentences scored by the model'))
+ADAPTER_SWITCHES_TOTAL = registry.register(Counter(
+    'detector_adapter_switches_total', 'Times the active LoRA adapter was changed'))
+NEAR_DUPLICATE_HITS_TOTAL = registry.register(Counter(
+    'detector_near_duplicate_hits_total', 'Submissions that reused chunk scores of a near-duplicate'))
+INFERENCE_SECONDS = registry.register(Histogram(
+    'detector_inference_seconds', 'Inference latency per pipeline stage', ['stage']))
+INFERENCE_QUEUE_DEPTH = registry.register(Gauge(
+    'detector_inference_queue_depth', 'Inference requests waiting or in progress'))
+SCHEDULER_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    'detector_scheduler_queue_wait_seconds', 'Time from submit to first scored slice, by user class',
+    ['user_class'], buckets=DEFAULT_BUCKETS + (60, 120, 300)))
+SCHEDULER_QUEUED_CHUNKS = registry.register(Gauge(
+    'detector_scheduler_queued_chunks', 'Chunks waiting in the inference scheduler, by user class', ['user_class']))
+SCHEDULER_REJECTIONS_TOTAL = registry.register(Counter(
+    'detector_scheduler_rejections_total', 'Requests refused by per-user rate limits', ['user_class']))
+JOBS_TOTAL = registry.register(Counter(
+    'detector_jobs_total', 'Background analysis jobs queued, done and failed', ['status']))
+PREDICTIONS_ARCHIVED_TOTAL = registry.register(Counter(
+    'detector_predictions_archived_total', 'Predictions moved to the archive database by the retention policy'))
+BACKUPS_TOTAL = registry.register(Counter(
+    'detector_backups_total', 'Online database backups, by outcome', ['status']))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    'detector_db_query_seconds', 'SQLite latency per Database method', ['method'], buckets=DB_BUCKETS))
+MODEL_PARAMETERS_BYTES = registry.register(Gauge(
+    'detector_model_parameters_bytes', 'Memory held by loaded model parameters'))
+MODEL_LOADED = registry.register(Gauge(
+    'detector_model_loaded', '1 when the model is loaded and ready'))
+PROCESS_RESIDENT_MEMORY_BYTES = registry.register(Gauge(
+    'process_resident_memory_bytes', 'Resident memory size in bytes', function=_resident_memory_bytes))
+
+# Inference stage spans recorded by ModelHandler feed the latency histogram
+stage_profiler.add_listener(lambda stage, seconds: INFERENCE_SECONDS.observe(seconds, stage=stage))
+
+
+def db_timed(method):
+    """Decorator recording a Database method's latency in DB_QUERY_SECONDS"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(method=method.__name__):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the app log
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve /metrics on host:port from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
@@ -8,25 +8,50 @@ from peft import PeftModel
 import numpy as np
 from config import Config
 from text_preprocessor import TextPreprocessor
+from batching import plan_length_buckets
+from results import PartialResult, PredictionResult, confidence_level
+from cpu_layout import apply_thread_settings
+from profiling import stage_profiler
+from metrics import (
+    PREDICTIONS_TOTAL, CHUNKS_SCORED_TOTAL, INFERENCE_QUEUE_DEPTH,
+    MODEL_PARAMETERS_BYTES, MODEL_LOADED
+)
 import logging
+import os
+import time
+from contextlib import nullcontext
 
 class ModelHandler:
-    def __init__(self):
+    def __init__(self, tier=None, backend=None, adapter_path=None):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # "full" = IndoBERT + LoRA, "fast" = distilled student (see distillation.py)
+        self.tier = tier or Config.MODEL_TIER
+        # "torch" or "onnx" (see onnx_backend.py)
+        self.backend = backend or Config.INFERENCE_BACKEND
+        # LoRA adapter directory (a versioned deployment, see model_manager.py)
+        self.adapter_path = adapter_path or Config.MODEL_PATH
         self.tokenizer = None
         self.model = None
         self.preprocessor = TextPreprocessor()
         self.loaded = False
+        self.profiler = stage_profiler
+        # Size torch thread pools for this worker before any model runs
+        self.cpu_layout = apply_thread_settings()
         
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
     def load_model(self):
-        """Load the fine-tuned model with LoRA adapters"""
+        """Load the fine-tuned model with LoRA adapters (or the fast student)"""
+        if self.backend == 'onnx':
+            return self.load_onnx_model()
+        if self.tier == 'fast':
+            return self.load_fast_model()
+        
         try:
             self.logger.info("Loading tokenizer...")
             # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(Config.MODEL_PATH)
+            self.tokenizer = AutoTokenizer.from_pretrained(self.adapter_path)
             
             self.logger.info("Loading base model...")
             # Load base model
@@ -38,157 +63,730 @@ class ModelHandler:
             
             self.logger.info("Loading LoRA adapters...")
             # Load model with LoRA adapters
-            self.model = PeftModel.from_pretrained(base_model, Config.MODEL_PATH)
+            self.model = PeftModel.from_pretrained(base_model, self.adapter_path)
             self.model = self.model.to(self.device)
             self.model.eval()
             
             self.loaded = True
+            MODEL_LOADED.set(1)
+            MODEL_PARAMETERS_BYTES.set(sum(
+                param.numel() * param.element_size() for param in self.model.parameters()
+            ))
             self.logger.info(f"Model loaded successfully on {self.device}")
             
         except Exception as e:
             self.logger.error(f"Error loading model: {str(e)}")
             raise e
     
+    def load_fast_model(self):
+        """Load the distilled student model from Config.FAST_MODEL_PATH"""
+        try:
+            self.logger.info("Loading fast (distilled) model...")
+            self.tokenizer = AutoTokenizer.from_pretrained(Config.FAST_MODEL_PATH)
+            self.model = AutoModelForSequenceClassification.from_pretrained(Config.FAST_MODEL_PATH)
+            self.model = self.model.to(self.device)
+            self.model.eval()
+            
+            self.loaded = True
+            MODEL_LOADED.set(1)
+            MODEL_PARAMETERS_BYTES.set(sum(
+                param.numel() * param.element_size() for param in self.model.parameters()
+            ))
+            self.logger.info(f"Fast model loaded successfully on {self.device}")
+            
+        except Exception as e:
+            self.logger.error(f"Error loading fast model: {str(e)}")
+            raise e
+    
+    def load_onnx_model(self):
+        """Load the exported ONNX graph from Config.ONNX_MODEL_PATH into ONNX Runtime"""
+        try:
+            from onnx_backend import OnnxSequenceClassifier
+            
+            self.logger.info("Loading ONNX model...")
+            self.device = torch.device("cpu")
+            self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(Config.ONNX_MODEL_PATH))
+            self.model = OnnxSequenceClassifier(Config.ONNX_MODEL_PATH)
+            
+            self.loaded = True
+            MODEL_LOADED.set(1)
+            MODEL_PARAMETERS_BYTES.set(self.model.size_bytes())
+            self.logger.info("ONNX model loaded successfully (ONNX Runtime, CPU)")
+            
+        except Exception as e:
+            self.logger.error(f"Error loading ONNX model: {str(e)}")
+            raise e
+    
     def predict_single_chunk(self, text_chunk):
         """Predict AI probability for a single text chunk"""
         if not self.loaded:
             raise ValueError("Model not loaded. Call load_model() first.")
         
         # Tokenize
-        inputs = self.tokenizer(
-            text_chunk,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=Config.MAX_LENGTH
-        )
+        with self.profiler.span('tokenize'):
+            inputs = self.tokenizer(
+                text_chunk,
+                return_tensors="pt",
+                truncation=True,
+                padding=True,
+                max_length=Config.MAX_LENGTH
+            )
         
         # Move to device
-        inputs = {key: value.to(self.device) for key, value in inputs.items()}
+        with self.profiler.span('device_transfer'):
+            inputs = {key: value.to(self.device) for key, value in inputs.items()}
         
         # Predict
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.nn.functional.softmax(logits, dim=-1)
+            with self.profiler.span('forward'):
+                outputs = self.model(**inputs)
+                logits = outputs.logits
             
-            # Assuming label 1 is AI-generated
-            ai_probability = probabilities[0][1].cpu().item()
+            with self.profiler.span('softmax'):
+                probabilities = torch.nn.functional.softmax(logits, dim=-1)
+                
+                # Assuming label 1 is AI-generated
+                ai_probability = probabilities[0][1].cpu().item()
         
+        CHUNKS_SCORED_TOTAL.inc()
         return ai_probability
     
-    def predict_text(self, input_text):
+    def predict_batch(self, texts):
         """
-        Predict AI probability for input text
-        Returns: dict with prediction results
+        Predict AI probabilities for many texts with length-bucketed padding
+        
+        Texts are tokenized without padding, sorted by token length into
+        batches of Config.BATCH_SIZE and each batch is padded only to its own
+        longest input (rounded up to Config.PAD_TO_MULTIPLE_OF). Results are
+        returned in the original order.
         """
-        if not input_text or not input_text.strip():
-            return {
-                'ai_probability': 0.0,
-                'is_ai_generated': False,
-                'confidence_level': 'low',
-                'highlighted_parts': [],
-                'chunk_predictions': []
-            }
+        if not self.loaded:
+            raise ValueError("Model not loaded. Call load_model() first.")
+        if not texts:
+            return []
         
-        # Preprocess text
-        chunks, cleaned_text = self.preprocessor.preprocess_for_model(input_text)
+        # Tokenize without padding
+        with self.profiler.span('tokenize'):
+            encodings = self.tokenizer(
+                list(texts),
+                truncation=True,
+                padding=False,
+                max_length=Config.MAX_LENGTH
+            )
+        
+        input_ids = encodings['input_ids']
+        buckets = plan_length_buckets(
+            [len(ids) for ids in input_ids],
+            Config.BATCH_SIZE,
+            Config.PAD_TO_MULTIPLE_OF,
+            Config.MAX_LENGTH
+        )
+        pad_token_id = self.tokenizer.pad_token_id or 0
+        
+        ai_probabilities = [0.0] * len(texts)
+        for indices, padded_length in buckets:
+            # Pad this bucket only
+            with self.profiler.span('pad'):
+                inputs = {
+                    'input_ids': torch.full((len(indices), padded_length), pad_token_id, dtype=torch.long),
+                    'attention_mask': torch.zeros((len(indices), padded_length), dtype=torch.long)
+                }
+                if 'token_type_ids' in encodings:
+                    inputs['token_type_ids'] = torch.zeros((len(indices), padded_length), dtype=torch.long)
+                for row, index in enumerate(indices):
+                    ids = input_ids[index]
+                    inputs['input_ids'][row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                    inputs['attention_mask'][row, :len(ids)] = 1
+                    if 'token_type_ids' in encodings:
+                        inputs['token_type_ids'][row, :len(ids)] = torch.tensor(
+                            encodings['token_type_ids'][index], dtype=torch.long
+                        )
+            
+            # Move to device
+            with self.profiler.span('device_transfer'):
+                inputs = {key: value.to(self.device) for key, value in inputs.items()}
+            
+            with torch.no_grad():
+                with self.profiler.span('forward'):
+                    logits = self.model(**inputs).logits
+                
+                with self.profiler.span('softmax'):
+                    # Assuming label 1 is AI-generated
+                    batch_probabilities = torch.nn.functional.softmax(logits.float(), dim=-1)[:, 1].cpu().tolist()
+            
+            # Put results back in the original order
+            for index, ai_prob in zip(indices, batch_probabilities):
+                ai_probabilities[index] = ai_prob
         
-        chunk_predictions = []
-        ai_probabilities = []
+        CHUNKS_SCORED_TOTAL.inc(len(texts))
+        return ai_probabilities
+    
+    def score_texts(self, texts):
+        """
+        Score texts in batches, falling back to one-by-one scoring if a batch fails
+        Returns: list of (ai_probability, error message or None)
+        """
+        try:
+            return [(ai_prob, None) for ai_prob in self.predict_batch(texts)]
+        except Exception as e:
+            self.logger.error(f"Batch prediction failed, scoring one by one: {str(e)}")
         
-        # Predict each chunk
-        for i, chunk in enumerate(chunks):
+        scores = []
+        for text in texts:
             try:
-                ai_prob = self.predict_single_chunk(chunk)
-                chunk_predictions.append({
-                    'chunk_id': i,
-                    'text': chunk,
-                    'ai_probability': ai_prob,
-                    'is_ai': ai_prob > Config.AI_THRESHOLD
-                })
-                ai_probabilities.append(ai_prob)
+                scores.append((self.predict_single_chunk(text), None))
             except Exception as e:
-                self.logger.error(f"Error predicting chunk {i}: {str(e)}")
-                chunk_predictions.append({
-                    'chunk_id': i,
-                    'text': chunk,
-                    'ai_probability': 0.0,
-                    'is_ai': False,
-                    'error': str(e)
-                })
-                ai_probabilities.append(0.0)
+                scores.append((0.0, str(e)))
+        return scores
+    
+    def check_adapter(self, adapter):
+        """
+        Raise ValueError if this handler cannot serve `adapter`
+        A plain handler serves one model, the default adapter; named domain
+        adapters need a MultiAdapterHandler (see multi_adapter.py).
+        """
+        if adapter not in (None, Config.DEFAULT_ADAPTER):
+            raise ValueError(f"Adapter {adapter!r} requested, but this model handler has no domain adapters")
+    
+    def predict_text(self, input_text, profile=None, cascade=None, known_scores=None, adapter=None):
+        """
+        Predict AI probability for input text
+        profile: optional 'cprofile' or 'torch' to capture a profile of this request
+        cascade: score a sample of chunks first and stop early when the result
+                 is clear (defaults to Config.CASCADE_ENABLED; fixed chunking only)
+        known_scores: chunk text -> probability from a near-duplicate earlier
+                      submission (anything with .get); only the other chunks
+                      are scored (fixed chunking only)
+        adapter: only the default adapter (see check_adapter); MultiAdapterHandler
+                 serves the others
+        Returns: PredictionResult (reads like the old result dict, see results.py)
+        """
+        self.check_adapter(adapter)
+        if profile:
+            with self.profiler.capture(profile, label=f"predict_text ({len(input_text or '')} chars)"):
+                return self.predict_text(input_text, cascade=cascade, known_scores=known_scores)
         
-        # Calculate overall AI probability (weighted average by chunk length)
-        if ai_probabilities:
-            chunk_lengths = [len(chunk.split()) for chunk in chunks]
-            total_length = sum(chunk_lengths)
-            
-            if total_length > 0:
-                weighted_ai_prob = sum(
-                    prob * length for prob, length in zip(ai_probabilities, chunk_lengths)
-                ) / total_length
-            else:
-                weighted_ai_prob = np.mean(ai_probabilities)
-        else:
-            weighted_ai_prob = 0.0
+        if cascade is None:
+            cascade = Config.CASCADE_ENABLED
+        
+        INFERENCE_QUEUE_DEPTH.inc()
+        try:
+            with self.profiler.span('predict_text'):
+                result = self._predict_text(input_text, cascade, known_scores)
+        finally:
+            INFERENCE_QUEUE_DEPTH.dec()
+        
+        PREDICTIONS_TOTAL.inc(result='ai' if result['is_ai_generated'] else 'human')
+        return result
+    
+    def iter_predict_text(self, input_text, known_scores=None, batch_chunks=None, **options):
+        """
+        Score input_text batch by batch in document order
+        Yields: a PartialResult after every batch_chunks chunks (default
+        Config.STREAM_BATCH_CHUNKS), then a final one whose .result is the
+        PredictionResult. Chunks are cut lazily, so the first update costs
+        one batch whatever the length of the text. Cascade scoring does not
+        apply; empty input and sliding mode give only the final update.
+        options: passed on to predict_text / open_stream (e.g. adapter)
+        """
+        if not input_text or not input_text.strip() or Config.CHUNKING_MODE == 'sliding':
+            yield PartialResult.final(self.predict_text(input_text, known_scores=known_scores, **options))
+            return
+        
+        batch_chunks = batch_chunks or Config.STREAM_BATCH_CHUNKS
+        stream = self.open_stream(input_text, known_scores, **options)
+        INFERENCE_QUEUE_DEPTH.inc()
+        try:
+            while not stream.exhausted:
+                yield stream.score_next(batch_chunks)
+            result = stream.result()
+        finally:
+            INFERENCE_QUEUE_DEPTH.dec()
+        
+        PREDICTIONS_TOTAL.inc(result='ai' if result['is_ai_generated'] else 'human')
+        yield PartialResult.final(result)
+    
+    def open_stream(self, input_text, known_scores=None, adapter=None):
+        """ChunkStream over input_text (fixed chunking)"""
+        self.check_adapter(adapter)
+        return ChunkStream(self, input_text, known_scores, adapter)
+    
+    def _predict_text(self, input_text, cascade=False, known_scores=None):
+        if not input_text or not input_text.strip():
+            return PredictionResult.empty(input_text)
         
-        # Determine if text is AI-generated
-        is_ai_generated = weighted_ai_prob > Config.AI_THRESHOLD
+        if Config.CHUNKING_MODE == 'sliding':
+            return self._predict_text_sliding(input_text)
         
-        # Determine confidence level
-        if weighted_ai_prob > Config.HIGH_CONFIDENCE_THRESHOLD:
-            confidence_level = 'high'
-        elif weighted_ai_prob > Config.AI_THRESHOLD:
-            confidence_level = 'medium'
+        chunks, starts, ends, lengths = self.prepare_chunks(input_text)
+        chunks_reused = 0
+        
+        if known_scores:
+            # Reuse scores of unchanged chunks, score only the ones that differ
+            probabilities, errors, reused = self.score_with_known(chunks, known_scores)
+            scored = np.ones(len(chunks), dtype=bool)
+            scoring_path = 'near_duplicate'
+            chunks_reused = int(reused.sum())
+        elif cascade and len(chunks) >= Config.CASCADE_MIN_CHUNKS:
+            # Score a sample first, the rest only if the result is unclear
+            probabilities, errors, scored, scoring_path = self.cascade_score(chunks, lengths)
         else:
-            confidence_level = 'low'
-        
-        # Generate highlighted parts (chunks that are likely AI)
-        highlighted_parts = []
-        for chunk_pred in chunk_predictions:
-            if chunk_pred['ai_probability'] > Config.AI_THRESHOLD:
-                highlighted_parts.append({
-                    'text': chunk_pred['text'],
-                    'probability': chunk_pred['ai_probability'],
-                    'chunk_id': chunk_pred['chunk_id']
-                })
+            # Predict all chunks in length-bucketed batches
+            probabilities, errors = self.score_arrays(chunks)
+            scored = np.ones(len(chunks), dtype=bool)
+            scoring_path = 'full'
+        
+        return self.build_chunk_result(
+            input_text, chunks, starts, ends, lengths, probabilities, errors, scored,
+            scoring_path=scoring_path, chunks_reused=chunks_reused
+        )
+    
+    def prepare_chunks(self, input_text):
+        """
+        Split text into fixed chunks for scoring
+        Returns: (chunks, starts, ends, word lengths), offsets as numpy arrays
+        """
+        with self.profiler.span('clean'):
+            words = self.preprocessor.clean_words_with_offsets(input_text)
+        with self.profiler.span('chunk'):
+            chunk_spans = self.preprocessor.split_words_into_chunks(words)
+        
+        chunks = [chunk for chunk, _, _ in chunk_spans]
+        starts = np.array([start for _, start, _ in chunk_spans], dtype=np.int64)
+        ends = np.array([end for _, _, end in chunk_spans], dtype=np.int64)
+        # Chunks are single-space joined words, so spaces + 1 = word count
+        lengths = np.fromiter((chunk.count(' ') + 1 for chunk in chunks), dtype=np.int64, count=len(chunks))
+        return chunks, starts, ends, lengths
+    
+    def build_chunk_result(self, input_text, chunks, starts, ends, lengths, probabilities, errors, scored, **extra):
+        """Aggregate fixed-chunk scores into the predict_text PredictionResult"""
+        with self.profiler.span('aggregate'):
+            # Calculate overall AI probability (weighted average by chunk length)
+            weighted_ai_prob = self.weighted_probability(probabilities[scored], lengths[scored])
+            
+            # Chunks that are likely AI
+            highlighted = np.flatnonzero((probabilities > Config.AI_THRESHOLD) & scored)
         
-        return {
-            'ai_probability': weighted_ai_prob,
-            'is_ai_generated': is_ai_generated,
-            'confidence_level': confidence_level,
-            'highlighted_parts': highlighted_parts,
-            'chunk_predictions': chunk_predictions,
-            'cleaned_text': cleaned_text,
-            'total_chunks': len(chunks)
-        }
+        # Only chunks that were actually scored are reported
+        scored_ids = np.flatnonzero(scored)
+        # Position of each scored chunk in the result's chunk arrays
+        positions = np.cumsum(scored) - 1
+        return PredictionResult.from_chunks(
+            input_text, [chunks[i] for i in scored_ids.tolist()], scored_ids,
+            starts[scored], ends[scored], probabilities[scored],
+            [errors[i] for i in scored_ids.tolist()], weighted_ai_prob,
+            starts[highlighted], ends[highlighted], probabilities[highlighted], positions[highlighted],
+            total_chunks=len(chunks),
+            chunks_scored=len(scored_ids),
+            **extra
+        )
+    
+    def predict_many(self, texts):
+        """
+        predict_text for several texts with their chunks scored together
+        
+        All chunks of all texts go through one score_arrays call, so short
+        requests share length-bucketed batches instead of each running its
+        own mostly empty batch. Returns: list of results in input order.
+        """
+        if Config.CHUNKING_MODE == 'sliding':
+            return [self.predict_text(text) for text in texts]
+        
+        results = [None] * len(texts)
+        prepared = []
+        for index, text in enumerate(texts):
+            if not text or not text.strip():
+                results[index] = self.predict_text(text)
+                continue
+            prepared.append((index, text, *self.prepare_chunks(text)))
+        
+        all_chunks = [chunk for _, _, chunks, _, _, _ in prepared for chunk in chunks]
+        INFERENCE_QUEUE_DEPTH.inc(len(prepared))
+        try:
+            all_probabilities, all_errors = self.score_arrays(all_chunks)
+        finally:
+            INFERENCE_QUEUE_DEPTH.dec(len(prepared))
+        
+        offset = 0
+        for index, text, chunks, starts, ends, lengths in prepared:
+            n_chunks = len(chunks)
+            result = self.build_chunk_result(
+                text, chunks, starts, ends, lengths,
+                all_probabilities[offset:offset + n_chunks],
+                all_errors[offset:offset + n_chunks],
+                np.ones(n_chunks, dtype=bool),
+                scoring_path='full', chunks_reused=0
+            )
+            offset += n_chunks
+            PREDICTIONS_TOTAL.inc(result='ai' if result['is_ai_generated'] else 'human')
+            results[index] = result
+        return results
+    
+    def score_with_known(self, chunks, known_scores):
+        """
+        Take chunk probabilities from known_scores where available, score the rest
+        Returns: (probabilities, errors, boolean mask of reused chunks)
+        """
+        known = [known_scores.get(chunk) for chunk in chunks]
+        reused = np.array([score is not None for score in known], dtype=bool)
+        probabilities = np.array([score or 0.0 for score in known], dtype=np.float64)
+        errors = [None] * len(chunks)
+        
+        missing = np.flatnonzero(~reused).tolist()
+        if missing:
+            missing_probabilities, missing_errors = self.score_arrays(
+                [chunks[i] for i in missing], chunk_ids=missing
+            )
+            probabilities[missing] = missing_probabilities
+            for i, error in zip(missing, missing_errors):
+                errors[i] = error
+        return probabilities, errors, reused
+    
+    def cascade_score(self, chunks, lengths):
+        """
+        Score chunks in a random (seeded) order, a few at a time, and stop as
+        soon as the confidence interval of the length-weighted mean lies
+        entirely outside [AI_THRESHOLD - CASCADE_MARGIN, AI_THRESHOLD + CASCADE_MARGIN]
+        Returns: (probabilities, errors, scored mask, scoring path) where
+        the path is 'cascade_early_exit' or 'cascade_full'
+        """
+        n_chunks = len(chunks)
+        probabilities = np.zeros(n_chunks, dtype=np.float64)
+        errors = [None] * n_chunks
+        scored = np.zeros(n_chunks, dtype=bool)
+        
+        # Seeded by document size so repeated requests take the same path
+        order = np.random.default_rng(n_chunks).permutation(n_chunks)
+        max_sampled = int(np.ceil(n_chunks * Config.CASCADE_MAX_FRACTION))
+        
+        position = 0
+        next_size = Config.CASCADE_SAMPLE_SIZE
+        while position < max_sampled:
+            batch = order[position:min(position + next_size, max_sampled)]
+            batch_probabilities, batch_errors = self.score_arrays(
+                [chunks[i] for i in batch.tolist()], chunk_ids=batch.tolist()
+            )
+            probabilities[batch] = batch_probabilities
+            for i, error in zip(batch.tolist(), batch_errors):
+                errors[i] = error
+            scored[batch] = True
+            position += len(batch)
+            next_size = Config.CASCADE_STEP
+            
+            lower, upper = self.confidence_interval(
+                probabilities[scored], lengths[scored], n_chunks, Config.CASCADE_Z
+            )
+            if upper < Config.AI_THRESHOLD - Config.CASCADE_MARGIN or lower > Config.AI_THRESHOLD + Config.CASCADE_MARGIN:
+                return probabilities, errors, scored, 'cascade_early_exit'
+        
+        # Unclear: fall back to scoring everything
+        remaining = order[position:]
+        if len(remaining):
+            rest_probabilities, rest_errors = self.score_arrays(
+                [chunks[i] for i in remaining.tolist()], chunk_ids=remaining.tolist()
+            )
+            probabilities[remaining] = rest_probabilities
+            for i, error in zip(remaining.tolist(), rest_errors):
+                errors[i] = error
+            scored[remaining] = True
+        return probabilities, errors, scored, 'cascade_full'
+    
+    @staticmethod
+    def confidence_interval(probabilities, lengths, population_size, z):
+        """
+        Normal-approximation interval for the length-weighted mean of a
+        sample drawn without replacement from population_size chunks
+        """
+        weights = lengths.astype(np.float64)
+        if weights.sum() <= 0:
+            weights = np.ones(len(probabilities))
+        weights = weights / weights.sum()
+        mean = float(np.dot(weights, probabilities))
+        n = len(probabilities)
+        if n < 2:
+            return 0.0, 1.0
+        
+        # Weighted variance and Kish effective sample size
+        variance = float(np.dot(weights, (probabilities - mean) ** 2)) * n / (n - 1)
+        effective_n = 1.0 / float(np.dot(weights, weights))
+        finite_population = max(1 - n / population_size, 0.0)
+        margin = z * np.sqrt(variance / effective_n * finite_population)
+        return mean - margin, mean + margin
+    
+    def _predict_text_sliding(self, input_text):
+        """
+        Sliding-window variant of predict_text
+        
+        Windows overlap by (window - Config.WINDOW_STRIDE) words. Every word
+        gets the mean probability of all windows covering it; the overall
+        score is the mean over words and highlighted parts are the runs of
+        words above Config.AI_THRESHOLD.
+        """
+        # Preprocess text
+        with self.profiler.span('clean'):
+            words = self.preprocessor.clean_words_with_offsets(input_text)
+        with self.profiler.span('chunk'):
+            windows = self.preprocessor.split_words_into_windows(
+                words, Config.MAX_LENGTH, Config.WINDOW_STRIDE
+            )
+        
+        # Predict all windows in length-bucketed batches
+        texts = [window[0] for window in windows]
+        probabilities, errors = self.score_arrays(texts)
+        
+        with self.profiler.span('aggregate'):
+            window_array = np.array([window[1:] for window in windows], dtype=np.int64).reshape(-1, 4)
+            word_spans = np.array([(start, end) for _, start, end in words], dtype=np.int64).reshape(-1, 2)
+            
+            # Failed windows don't vote
+            valid = np.array([error is None for error in errors], dtype=bool)
+            word_probabilities = self.aggregate_window_scores(
+                len(words), window_array[valid, 2], window_array[valid, 3], probabilities[valid]
+            )
+            weighted_ai_prob = float(word_probabilities.mean()) if len(words) else 0.0
+            
+            # Highlight runs of consecutive words above the threshold
+            runs = np.array(self.threshold_runs(word_probabilities, Config.AI_THRESHOLD), dtype=np.int64).reshape(-1, 2)
+            run_probabilities = [float(word_probabilities[first:last].mean()) for first, last in runs.tolist()]
+        
+        # Highlighted runs are not chunks (position -1); their text is the source span
+        return PredictionResult.from_chunks(
+            input_text, texts, np.arange(len(texts)), window_array[:, 0], window_array[:, 1],
+            probabilities, errors, weighted_ai_prob,
+            word_spans[runs[:, 0], 0], word_spans[runs[:, 1] - 1, 1], run_probabilities,
+            np.full(len(runs), -1), chunking='sliding'
+        )
+    
+    def score_arrays(self, texts, chunk_ids=None):
+        """
+        Score texts with score_texts
+        Returns: (probabilities as a numpy array, list of error messages or None)
+        Failed texts get probability 0.0; errors are logged under chunk_ids[i]
+        (default: the position in texts).
+        """
+        scores = self.score_texts(texts)
+        probabilities = np.array([ai_prob for ai_prob, _ in scores], dtype=np.float64)
+        errors = [error for _, error in scores]
+        for i, error in enumerate(errors):
+            if error is not None:
+                probabilities[i] = 0.0
+                chunk_id = chunk_ids[i] if chunk_ids is not None else i
+                self.logger.error(f"Error predicting chunk {chunk_id}: {error}")
+        return probabilities, errors
+    
+    @staticmethod
+    def weighted_probability(probabilities, lengths):
+        """Length-weighted mean probability (plain mean if all lengths are 0)"""
+        if len(probabilities) == 0:
+            return 0.0
+        total_length = lengths.sum()
+        if total_length > 0:
+            return float(np.dot(probabilities, lengths) / total_length)
+        return float(probabilities.mean())
+    
+    @staticmethod
+    def get_confidence_level(ai_probability):
+        """Map an overall probability to 'high', 'medium' or 'low'"""
+        return confidence_level(ai_probability)
+    
+    @staticmethod
+    def aggregate_window_scores(n_words, first_words, last_words, probabilities):
+        """
+        Mean probability per word over all windows covering it
+        
+        Uses difference arrays: +p at each window's first word and -p just
+        past its last word, then a cumulative sum, so the cost is
+        O(words + windows) regardless of overlap.
+        """
+        probability_delta = np.zeros(n_words + 1)
+        coverage_delta = np.zeros(n_words + 1)
+        np.add.at(probability_delta, first_words, probabilities)
+        np.add.at(probability_delta, last_words, -probabilities)
+        np.add.at(coverage_delta, first_words, 1)
+        np.add.at(coverage_delta, last_words, -1)
+        
+        probability_sum = np.cumsum(probability_delta[:-1])
+        coverage = np.cumsum(coverage_delta[:-1])
+        return np.divide(
+            probability_sum, coverage,
+            out=np.zeros(n_words), where=coverage > 0
+        )
+    
+    @staticmethod
+    def threshold_runs(values, threshold):
+        """
+        (first, last) index ranges (last exclusive) of consecutive values above threshold
+        """
+        above = np.concatenate(([False], values > threshold, [False]))
+        edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
     
     def get_sentence_level_predictions(self, input_text):
         """
         Get sentence-level predictions for more granular highlighting
         """
-        sentences = self.preprocessor.split_into_sentences(input_text)
+        sentences = self.preprocessor.split_into_sentences_with_offsets(input_text)
+        sentences = [(i, sentence, start, end) for i, (sentence, start, end) in enumerate(sentences) if sentence.strip()]
         sentence_predictions = []
         
-        for i, sentence in enumerate(sentences):
-            if sentence.strip():
-                try:
-                    ai_prob = self.predict_single_chunk(sentence)
-                    sentence_predictions.append({
-                        'sentence_id': i,
-                        'text': sentence,
-                        'ai_probability': ai_prob,
-                        'is_ai': ai_prob > Config.AI_THRESHOLD
-                    })
-                except Exception as e:
-                    self.logger.error(f"Error predicting sentence {i}: {str(e)}")
-                    sentence_predictions.append({
-                        'sentence_id': i,
-                        'text': sentence,
-                        'ai_probability': 0.0,
-                        'is_ai': False,
-                        'error': str(e)
-                    })
-        
-        return sentence_predictions
\ No newline at end of file
+        # Score all sentences in length-bucketed batches
+        scores = self.score_texts([sentence for _, sentence, _, _ in sentences])
+        
+        for (i, sentence, start, end), (ai_prob, error) in zip(sentences, scores):
+            if error is None:
+                sentence_predictions.append({
+                    'sentence_id': i,
+                    'text': sentence,
+                    'start': start,
+                    'end': end,
+                    'ai_probability': ai_prob,
+                    'is_ai': ai_prob > Config.AI_THRESHOLD
+                })
+            else:
+                self.logger.error(f"Error predicting sentence {i}: {error}")
+                sentence_predictions.append({
+                    'sentence_id': i,
+                    'text': sentence,
+                    'start': start,
+                    'end': end,
+                    'ai_probability': 0.0,
+                    'is_ai': False,
+                    'error': error
+                })
+        
+        return sentence_predictions
+
+
+class ChunkStream:
+    """
+    Incremental fixed-chunk scoring of one text
+    
+    Chunks come from TextPreprocessor.iter_chunks, so only the text covered
+    by the chunks scored so far has been cleaned. score_next scores the next
+    batch; result() builds the same PredictionResult as predict_text once
+    the stream is exhausted.
+    """
+    
+    def __init__(self, handler, input_text, known_scores=None, adapter=None):
+        self.handler = handler
+        self.text = input_text
+        self.known_scores = known_scores or {}
+        self.adapter = adapter
+        self.chunks, self.starts, self.ends, self.lengths = [], [], [], []
+        self.probabilities, self.errors = [], []
+        self.chunks_reused = 0
+        self._weighted_sum = 0.0
+        # Cleaning and chunking run interleaved; the time spent cleaning is
+        # counted separately so take() can report the two stages apart
+        self._clean_seconds = 0.0
+        preprocessor = handler.preprocessor
+        self._pending = preprocessor.iter_words_into_chunks(
+            self._timed_clean(preprocessor.iter_clean_words(input_text))
+        )
+        self._next = next(self._pending, None)  # one chunk of lookahead for `exhausted`
+    
+    def _timed_clean(self, words):
+        """Pass cleaned words through, adding the time spent producing them to _clean_seconds"""
+        while True:
+            start = time.perf_counter()
+            word = next(words, None)
+            self._clean_seconds += time.perf_counter() - start
+            if word is None:
+                return
+            yield word
+    
+    @property
+    def exhausted(self):
+        return self._next is None
+    
+    def _take(self, n):
+        batch = []
+        while self._next is not None and len(batch) < n:
+            batch.append(self._next)
+            self._next = next(self._pending, None)
+        return batch
+    
+    def restore(self, probabilities, errors):
+        """
+        Take the next len(probabilities) chunks as already scored (a checkpoint)
+        Returns: number of chunks restored
+        """
+        batch = self._take(len(probabilities))
+        if len(batch) != len(probabilities):
+            raise ValueError("Checkpoint has more chunks than the text")
+        lengths = [chunk.count(' ') + 1 for chunk, _, _ in batch]
+        self.chunks.extend(chunk for chunk, _, _ in batch)
+        self.starts.extend(start for _, start, _ in batch)
+        self.ends.extend(end for _, _, end in batch)
+        self.lengths.extend(lengths)
+        self.probabilities.extend(float(p) for p in probabilities)
+        self.errors.extend(errors)
+        self._weighted_sum += float(np.dot(probabilities, lengths)) if batch else 0.0
+        return len(batch)
+    
+    def take(self, n):
+        """Cut the next n chunks as (chunk, start, end), to be scored elsewhere and passed to add_scores"""
+        self._clean_seconds = 0.0
+        start = time.perf_counter()
+        batch = self._take(n)
+        elapsed = time.perf_counter() - start
+        self.handler.profiler.observe('clean', self._clean_seconds)
+        self.handler.profiler.observe('chunk', elapsed - self._clean_seconds)
+        return batch
+    
+    def score_next(self, n):
+        """Score the next n chunks; returns a PartialResult for them"""
+        batch = self.take(n)
+        first = len(self.chunks)
+        texts = [chunk for chunk, _, _ in batch]
+        
+        # Hold the request's adapter for this batch only (multi-adapter handlers)
+        use_adapter = getattr(self.handler, 'use_adapter', None)
+        with use_adapter(self.adapter) if use_adapter else nullcontext():
+            if self.known_scores:
+                probabilities, errors, reused = self.handler.score_with_known(texts, self.known_scores)
+                self.chunks_reused += int(reused.sum())
+            else:
+                probabilities, errors = self.handler.score_arrays(
+                    texts, chunk_ids=list(range(first, first + len(texts)))
+                )
+        return self.add_scores(batch, probabilities, errors)
+    
+    def add_scores(self, batch, probabilities, errors):
+        """Record the scores of chunks from take(); returns a PartialResult for them"""
+        first = len(self.chunks)
+        texts = [chunk for chunk, _, _ in batch]
+        lengths = [chunk.count(' ') + 1 for chunk in texts]
+        self.chunks.extend(texts)
+        self.starts.extend(start for _, start, _ in batch)
+        self.ends.extend(end for _, _, end in batch)
+        self.lengths.extend(lengths)
+        self.probabilities.extend(probabilities.tolist())
+        self.errors.extend(errors)
+        self._weighted_sum += float(np.dot(probabilities, lengths)) if texts else 0.0
+        
+        covered = self.ends[-1] if self.ends else 0
+        return PartialResult(
+            ai_probability=self._weighted_sum / sum(self.lengths) if self.lengths else 0.0,
+            chunks_scored=len(self.chunks),
+            progress=1.0 if self.exhausted else covered / len(self.text),
+            chunk_ids=np.arange(first, len(self.chunks), dtype=np.int32),
+            starts=np.array(self.starts[first:], dtype=np.int32),
+            ends=np.array(self.ends[first:], dtype=np.int32),
+            probabilities=probabilities,
+            errors=list(errors)
+        )
+    
+    def result(self, **extra):
+        """PredictionResult over every chunk scored so far"""
+        n_chunks = len(self.chunks)
+        if self.adapter:
+            extra['adapter'] = self.adapter
+        return self.handler.build_chunk_result(
+            self.text, self.chunks,
+            np.array(self.starts, dtype=np.int64), np.array(self.ends, dtype=np.int64),
+            np.array(self.lengths, dtype=np.int64), np.array(self.probabilities, dtype=np.float64),
+            self.errors, np.ones(n_chunks, dtype=bool),
+            scoring_path='near_duplicate' if self.known_scores else 'full',
+            chunks_reused=self.chunks_reused, **extra
+        )
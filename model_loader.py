@@ -0,0 +1,76 @@
+"""
+Background model loading for AI Text Detector
+"""
+
+import threading
+import logging
+
+class ModelLoader:
+    """Load the model in a background thread, once per process.
+
+    The handler is wrapped in a ModelManager, so new adapter versions can
+    later be swapped in without restarting the app.
+
+    `model_handler` (and with it torch, transformers and peft) is only
+    imported inside the worker thread, so pages that never run inference
+    render without paying for those imports.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.handler = None
+        self.error = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Start loading the model if it is not loading or loaded yet"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._load, name="model-loader", daemon=True
+            )
+            self._thread.start()
+
+    def _load(self):
+        try:
+            from model_manager import ModelManager, create_handler
+
+            handler = create_handler()
+            handler.load_model()
+            self.handler = ModelManager(handler)
+            self.logger.info("Model loaded successfully in background")
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Failed to load model: {str(e)}")
+        finally:
+            self._ready.set()
+
+    def is_ready(self):
+        """Check if loading has finished (successfully or not)"""
+        return self._ready.is_set()
+
+    def get_handler(self, timeout=None):
+        """
+        Return the ModelManager, waiting up to `timeout` seconds.
+        Raises the loading error if the model failed to load.
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.handler
+
+    def reset(self):
+        """Forget a failed load so the next start() tries again"""
+        with self._lock:
+            if self._ready.is_set() and self.error is not None:
+                self._thread = None
+                self.error = None
+                self._ready.clear()
+
+
+model_loader = ModelLoader()
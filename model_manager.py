@@ -0,0 +1,242 @@
+"""
+Versioned model serving with zero-downtime hot-swap for AI Text Detector
+
+ModelManager wraps the active ModelHandler together with its version tag.
+A new LoRA adapter version is loaded and warmed up in a background thread,
+then traffic is switched by replacing a single (handler, version) tuple;
+requests already running keep the handler they started with, and the old
+model is released once they finish. A candidate version can also shadow a
+sample of live traffic to compare latency and verdicts before promotion.
+"""
+
+import gc
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+WARMUP_TEXTS = [
+    "Ini adalah teks pemanasan.",
+    " ".join(["Pemerintah meningkatkan kualitas pendidikan di wilayah Jawa Barat."] * 40)
+]
+SHADOW_MAX_PENDING = 4
+
+def create_handler(tier=None, adapter_path=None):
+    """ModelHandler, or MultiAdapterHandler when Config.DOMAIN_ADAPTERS are set"""
+    if Config.DOMAIN_ADAPTERS:
+        from multi_adapter import MultiAdapterHandler
+
+        return MultiAdapterHandler(tier=tier, adapter_path=adapter_path)
+    from model_handler import ModelHandler
+
+    return ModelHandler(tier=tier, adapter_path=adapter_path)
+
+def version_from_path(adapter_path):
+    """Default version tag: the adapter directory name"""
+    return os.path.basename(os.path.normpath(adapter_path))
+
+class ShadowStats:
+    """Rolling comparison of active vs candidate predictions"""
+
+    def __init__(self, maxlen=1000):
+        self.samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, active_ms, candidate_ms, active_probability, candidate_probability):
+        with self._lock:
+            self.samples.append((active_ms, candidate_ms, active_probability, candidate_probability))
+
+    def summary(self):
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return {'samples': 0}
+        threshold = Config.AI_THRESHOLD
+        agree = sum((a > threshold) == (c > threshold) for _, _, a, c in samples)
+        return {
+            'samples': len(samples),
+            'verdict_agreement': agree / len(samples),
+            'mean_abs_diff': sum(abs(a - c) for _, _, a, c in samples) / len(samples),
+            'active_mean_ms': sum(s[0] for s in samples) / len(samples),
+            'candidate_mean_ms': sum(s[1] for s in samples) / len(samples)
+        }
+
+class ModelManager:
+    """Serve the active model version and hot-swap new adapter versions"""
+
+    def __init__(self, handler=None, version=None):
+        self.logger = logging.getLogger(__name__)
+        self._active = (handler, version or Config.MODEL_VERSION or version_from_path(Config.MODEL_PATH))
+        self._candidate = None  # (handler, version) scored in shadow
+        self.shadow_sample_rate = Config.SHADOW_SAMPLE_RATE
+        self.shadow_stats = ShadowStats()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        # Drop shadow samples instead of queueing them when the candidate falls behind
+        self._shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+        self._deploy_lock = threading.Lock()
+        self.status = 'idle'  # idle, loading, error
+        self.last_error = None
+        self.history = []  # (timestamp, event, version)
+
+    @property
+    def handler(self):
+        return self._active[0]
+
+    @property
+    def version(self):
+        return self._active[1]
+
+    @property
+    def candidate_version(self):
+        candidate = self._candidate
+        return candidate[1] if candidate else None
+
+    def __getattr__(self, name):
+        # Everything else (get_sentence_level_predictions, preprocessor, ...) goes to the active handler
+        handler = self.__dict__.get('_active', (None, None))[0]
+        if handler is None:
+            raise AttributeError(name)
+        return getattr(handler, name)
+
+    def load_version(self, adapter_path, tier=None):
+        """Load and warm up a ModelHandler for an adapter directory (blocking)"""
+        handler = create_handler(tier=tier, adapter_path=adapter_path)
+        handler.load_model()
+        for text in WARMUP_TEXTS:
+            handler.predict_text(text)
+        return handler
+
+    def _record(self, event, version):
+        self.history.append((time.strftime('%Y-%m-%d %H:%M:%S'), event, version))
+        self.logger.info(f"Model {event}: {version}")
+
+    def _run_in_background(self, target, *args):
+        if not self._deploy_lock.acquire(blocking=False):
+            raise RuntimeError("Another model version is already loading")
+        self.status = 'loading'
+        self.last_error = None
+
+        def run():
+            try:
+                target(*args)
+                self.status = 'idle'
+            except Exception as e:
+                self.status = 'error'
+                self.last_error = str(e)
+                self.logger.error(f"Model load failed: {str(e)}")
+            finally:
+                self._deploy_lock.release()
+
+        thread = threading.Thread(target=run, name="model-deploy", daemon=True)
+        thread.start()
+        return thread
+
+    def deploy(self, adapter_path, version=None, background=True):
+        """Load, warm up and switch traffic to a new adapter version"""
+        version = version or version_from_path(adapter_path)
+
+        def load_and_swap():
+            handler = self.load_version(adapter_path)
+            self.swap(handler, version)
+
+        if background:
+            return self._run_in_background(load_and_swap)
+        load_and_swap()
+
+    def swap(self, handler, version):
+        """Atomically make `handler` the active model and release the old one"""
+        old_handler, old_version = self._active
+        self._active = (handler, version)
+        self._record('activated', version)
+        del old_handler
+        self.release_memory()
+
+    def start_shadow(self, adapter_path, version=None, sample_rate=None, background=True):
+        """Load a candidate version that scores a sample of traffic in the background"""
+        version = version or version_from_path(adapter_path)
+        if sample_rate is not None:
+            self.shadow_sample_rate = sample_rate
+
+        def load_candidate():
+            handler = self.load_version(adapter_path)
+            self.shadow_stats = ShadowStats()
+            self._candidate = (handler, version)
+            self._record('shadowing', version)
+
+        if background:
+            return self._run_in_background(load_candidate)
+        load_candidate()
+
+    def stop_shadow(self):
+        candidate, self._candidate = self._candidate, None
+        if candidate:
+            self._record('shadow stopped', candidate[1])
+            del candidate
+            self.release_memory()
+
+    def promote(self):
+        """Switch traffic to the shadow candidate"""
+        candidate, self._candidate = self._candidate, None
+        if candidate is None:
+            raise RuntimeError("No candidate model to promote")
+        self.swap(*candidate)
+
+    @staticmethod
+    def release_memory():
+        gc.collect()
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def predict_text(self, input_text, **kwargs):
+        """predict_text on the active version; result is tagged with 'model_version'"""
+        handler, version = self._active
+        start = time.perf_counter()
+        result = handler.predict_text(input_text, **kwargs)
+        active_ms = (time.perf_counter() - start) * 1000
+        result['model_version'] = version
+        if not kwargs.get('profile'):
+            self.maybe_shadow(input_text, result, kwargs.get('adapter'), active_ms)
+        return result
+
+    def maybe_shadow(self, input_text, result, adapter=None, active_ms=0.0):
+        """
+        Score a sample of finished results with the candidate version as well
+        Called by predict_text and by FairScheduler for the jobs it scores.
+        Returns: True if the text was queued for shadow scoring
+        """
+        candidate = self._candidate
+        if (candidate is None or random.random() >= self.shadow_sample_rate
+                or not self._shadow_slots.acquire(blocking=False)):
+            return False
+        # Same domain adapter as the active request (multi-adapter handlers)
+        shadow_kwargs = {'adapter': adapter} if adapter else {}
+        self._shadow_executor.submit(self._shadow_score, candidate, input_text, result, active_ms, shadow_kwargs)
+        return True
+
+    def _shadow_score(self, candidate, input_text, active_result, active_ms, shadow_kwargs):
+        handler, version = candidate
+        try:
+            start = time.perf_counter()
+            shadow_result = handler.predict_text(input_text, **shadow_kwargs)
+            candidate_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            self.logger.error(f"Shadow scoring with {version} failed: {str(e)}")
+            return
+        finally:
+            self._shadow_slots.release()
+        self.shadow_stats.add(active_ms, candidate_ms, active_result['ai_probability'], shadow_result['ai_probability'])
+        self.logger.info(
+            f"Shadow {version}: {candidate_ms:.0f} ms vs {active_ms:.0f} ms, "
+            f"p={shadow_result['ai_probability']:.3f} vs {active_result['ai_probability']:.3f}, "
+            f"agree={shadow_result['is_ai_generated'] == active_result['is_ai_generated']}"
+        )
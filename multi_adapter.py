@@ -0,0 +1,234 @@
+"""
+Multi-adapter serving for AI Text Detector
+
+One IndoBERT base model is loaded once and several LoRA adapters (one per
+text domain, e.g. essays, news, social media) are registered on it with
+PEFT. Each request picks its adapter; switching only flips which adapter
+weights are active, so every extra domain costs the adapter size instead
+of a full base model. AdapterBatcher collects concurrent requests and runs
+them grouped by adapter, so requests for the same domain share batches and
+the adapter is switched once per group rather than once per request.
+App traffic goes through FairScheduler, which groups the slices of
+concurrent same-adapter requests into shared batches the same way.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from peft import PeftModel
+
+from config import Config
+from metrics import ADAPTER_SWITCHES_TOTAL, MODEL_LOADED, MODEL_PARAMETERS_BYTES
+from model_handler import ModelHandler
+
+class MultiAdapterHandler(ModelHandler):
+    """ModelHandler with several named LoRA adapters on one shared base model"""
+
+    def __init__(self, adapters=None, **kwargs):
+        super().__init__(**kwargs)
+        # Default adapter first, then the domain adapters
+        self.adapters = {Config.DEFAULT_ADAPTER: self.adapter_path}
+        self.adapters.update(Config.DOMAIN_ADAPTERS if adapters is None else adapters)
+        self.active_adapter = None
+        self._selected = None  # adapter pinned by the enclosing use_adapter
+        self._adapter_lock = threading.RLock()
+
+    @property
+    def adapter_names(self):
+        return list(self.adapters)
+
+    def load_model(self):
+        """Load the tokenizer and base model once, then every registered adapter"""
+        if self.backend == 'onnx' or self.tier == 'fast':
+            raise ValueError("Multi-adapter serving needs the full torch model (tier=full, backend=torch)")
+
+        try:
+            self.logger.info("Loading tokenizer...")
+            # All adapters share the base model's vocabulary
+            self.tokenizer = AutoTokenizer.from_pretrained(self.adapter_path)
+
+            self.logger.info("Loading base model...")
+            base_model = AutoModelForSequenceClassification.from_pretrained(
+                Config.BASE_MODEL_NAME,
+                num_labels=2,
+                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+            )
+            self.attach_adapters(base_model)
+
+        except Exception as e:
+            self.logger.error(f"Error loading model: {str(e)}")
+            raise e
+
+    def attach_adapters(self, base_model):
+        """Wrap an already loaded base model and load every adapter in self.adapters"""
+        names = list(self.adapters)
+        self.logger.info(f"Loading LoRA adapters: {', '.join(names)}")
+        self.model = PeftModel.from_pretrained(
+            base_model, self.adapters[names[0]], adapter_name=names[0]
+        )
+        for name in names[1:]:
+            self.model.load_adapter(self.adapters[name], adapter_name=name)
+        self.model = self.model.to(self.device)
+        self.model.eval()
+        self.active_adapter = names[0]
+
+        self.loaded = True
+        MODEL_LOADED.set(1)
+        self._update_memory_metric()
+        self.logger.info(f"Model loaded successfully on {self.device} with {len(names)} adapters")
+
+    def register_adapter(self, name, adapter_path):
+        """Load another adapter onto the running base model"""
+        if not self.loaded:
+            raise ValueError("Model not loaded. Call load_model() first.")
+        with self._adapter_lock:
+            if name in self.adapters:
+                raise ValueError(f"Adapter already registered: {name}")
+            self.model.load_adapter(adapter_path, adapter_name=name)
+            self.model.eval()
+            self.adapters[name] = adapter_path
+        self._update_memory_metric()
+        self.logger.info(f"Registered adapter {name} from {adapter_path}")
+
+    def adapter_bytes(self, name):
+        """Memory held by one adapter's parameters"""
+        marker = f'.{name}.'
+        return sum(
+            param.numel() * param.element_size()
+            for param_name, param in self.model.named_parameters()
+            if marker in param_name
+        )
+
+    def memory_report(self):
+        """Parameter memory in MB: shared base and each adapter"""
+        total = sum(param.numel() * param.element_size() for param in self.model.parameters())
+        adapters = {name: self.adapter_bytes(name) for name in self.adapters}
+        to_mb = lambda size: round(size / 1024 / 1024, 2)
+        return {
+            'base_mb': to_mb(total - sum(adapters.values())),
+            'adapters_mb': {name: to_mb(size) for name, size in adapters.items()},
+            'total_mb': to_mb(total)
+        }
+
+    def _update_memory_metric(self):
+        MODEL_PARAMETERS_BYTES.set(sum(
+            param.numel() * param.element_size() for param in self.model.parameters()
+        ))
+
+    @contextmanager
+    def use_adapter(self, name=None):
+        """
+        Hold the model with adapter `name` active
+        None keeps the adapter chosen by an enclosing use_adapter, else the default.
+        """
+        with self._adapter_lock:
+            name = name or self._selected or Config.DEFAULT_ADAPTER
+            if name not in self.adapters:
+                raise ValueError(f"Unknown adapter: {name}")
+            if name != self.active_adapter:
+                self.model.set_adapter(name)
+                self.active_adapter = name
+                ADAPTER_SWITCHES_TOTAL.inc()
+            previous, self._selected = self._selected, name
+            try:
+                yield name
+            finally:
+                self._selected = previous
+
+    def check_adapter(self, adapter):
+        """Raise ValueError for an adapter that is not registered"""
+        if adapter is not None and adapter not in self.adapters:
+            raise ValueError(f"Unknown adapter: {adapter}")
+
+    def predict_text(self, input_text, adapter=None, **kwargs):
+        """predict_text with the given adapter; the result records it under 'adapter'"""
+        with self.use_adapter(adapter) as name:
+            result = super().predict_text(input_text, **kwargs)
+        result['adapter'] = name
+        return result
+
+    def predict_many(self, texts, adapter=None):
+        with self.use_adapter(adapter) as name:
+            results = super().predict_many(texts)
+        for result in results:
+            result['adapter'] = name
+        return results
+
+    def get_sentence_level_predictions(self, input_text, adapter=None):
+        with self.use_adapter(adapter):
+            return super().get_sentence_level_predictions(input_text)
+
+class AdapterBatcher:
+    """Collect concurrent requests for a short window and score them grouped by adapter"""
+
+    def __init__(self, handler, window_ms=None, max_requests=None):
+        self.handler = handler
+        self.window = (Config.ADAPTER_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_requests = max_requests or Config.ADAPTER_BATCH_MAX_REQUESTS
+        self._queue = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="adapter-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, adapter=None):
+        """Queue a request; returns a Future with the predict_text result"""
+        future = Future()
+        self._queue.put((text, adapter or Config.DEFAULT_ADAPTER, future))
+        return future
+
+    def predict_text(self, text, adapter=None, timeout=None):
+        return self.submit(text, adapter).result(timeout)
+
+    def _collect(self):
+        """Block for one request, then gather more until the window closes"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        pending = [first]
+        deadline = time.monotonic() + self.window
+        while len(pending) < self.max_requests:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this round, then stop
+                self._queue.put(None)
+                break
+            pending.append(item)
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                break
+            groups = {}
+            for text, adapter, future in pending:
+                groups.setdefault(adapter, []).append((text, future))
+            # Start with the adapter that is already active to save a switch
+            order = sorted(groups, key=lambda name: name != getattr(self.handler, 'active_adapter', None))
+            for adapter in order:
+                items = groups[adapter]
+                try:
+                    results = self.handler.predict_many([text for text, _ in items], adapter=adapter)
+                except Exception as e:
+                    self.logger.error(f"Batch for adapter {adapter} failed: {str(e)}")
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=30)
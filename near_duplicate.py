@@ -0,0 +1,258 @@
+"""
+Near-duplicate submission index for AI Text Detector
+
+Each saved prediction gets a MinHash signature over word shingles of its
+clean_text() output. Signatures are split into LSH bands; two texts share
+a band bucket with high probability when their Jaccard similarity is high,
+so a lookup only touches a few candidates instead of every stored text.
+The index lives in its own SQLite file next to the main database, together
+with the per-chunk scores of each prediction so a resubmission with a few
+words changed only rescores the chunks that differ. Chunk scores are
+stored with the model version that produced them and only reused for the
+same version, so a hot-swapped model never inherits its predecessor's.
+"""
+
+import hashlib
+import os
+import sqlite3
+import zlib
+
+import numpy as np
+
+from config import Config
+from text_preprocessor import TextPreprocessor
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def _signed64(digest):
+    """8-byte digest as a signed integer (SQLite INTEGER range)"""
+    return int.from_bytes(digest, 'big', signed=True)
+
+def chunk_key(text):
+    """Stable 64-bit key for a chunk of model input"""
+    return _signed64(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest())
+
+class KnownChunkScores:
+    """Chunk scores of earlier predictions, looked up by chunk text"""
+
+    def __init__(self, scores_by_key, model_version=None):
+        self.scores_by_key = scores_by_key
+        self.model_version = model_version
+
+    def get(self, text, default=None):
+        return self.scores_by_key.get(chunk_key(text), default)
+
+    def __len__(self):
+        return len(self.scores_by_key)
+
+class MinHasher:
+    """MinHash signatures over word shingles of cleaned text"""
+
+    def __init__(self, num_perm=None, shingle_size=None, seed=1):
+        self.num_perm = num_perm or Config.MINHASH_PERMUTATIONS
+        self.shingle_size = shingle_size or Config.SHINGLE_SIZE
+        self.preprocessor = TextPreprocessor()
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 61, size=self.num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 61, size=self.num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """Set of hashed word n-grams of clean_text(text)"""
+        words = self.preprocessor.clean_text(text).lower().split()
+        if not words:
+            return set()
+        k = min(self.shingle_size, len(words))
+        return {
+            zlib.crc32(' '.join(words[i:i + k]).encode('utf-8'))
+            for i in range(len(words) - k + 1)
+        }
+
+    def signature(self, text):
+        """uint32 signature of num_perm values, or None for empty text"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # (a * h + b) mod p, truncated to 32 bits; products wrap like datasketch
+        permuted = ((hashes[:, None] * self.a + self.b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def jaccard(signature, other):
+        """Estimated Jaccard similarity of the texts behind two signatures"""
+        return float(np.count_nonzero(signature == other)) / len(signature)
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of past predictions"""
+
+    def __init__(self, path=None, num_perm=None, bands=None, shingle_size=None):
+        self.path = path or Config.NEAR_DUPLICATE_INDEX_PATH
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands = bands or Config.LSH_BANDS
+        if self.hasher.num_perm % self.bands:
+            raise ValueError("MINHASH_PERMUTATIONS must be divisible by LSH_BANDS")
+        self.rows = self.hasher.num_perm // self.bands
+        self.init_index()
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def init_index(self):
+        """Create the index tables if they don't exist"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS signatures (
+                prediction_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+        ''')
+        # One row per (band, bucket) a prediction falls into
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                prediction_id INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket, prediction_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chunk_scores (
+                prediction_id INTEGER NOT NULL,
+                chunk_hash INTEGER NOT NULL,
+                ai_probability REAL NOT NULL,
+                model_version TEXT,
+                PRIMARY KEY (prediction_id, chunk_hash)
+            ) WITHOUT ROWID
+        ''')
+        # Indexes created before versioned chunk scores lack the column;
+        # their rows stay NULL and are never reused by a versioned model
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(chunk_scores)')]
+        if 'model_version' not in columns:
+            cursor.execute('ALTER TABLE chunk_scores ADD COLUMN model_version TEXT')
+
+        conn.commit()
+        conn.close()
+
+    def band_keys(self, signature):
+        """LSH bucket key for each band of a signature"""
+        return [
+            _signed64(hashlib.blake2b(
+                signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8
+            ).digest())
+            for band in range(self.bands)
+        ]
+
+    def add(self, prediction_id, text, chunk_predictions=None, model_version=None):
+        """Index a saved prediction (and its chunk scores); False for empty text"""
+        return self.add_many([(prediction_id, text, chunk_predictions)], model_version) == 1
+
+    def add_many(self, items, model_version=None):
+        """
+        Index many (prediction_id, text, chunk_predictions or None) in one transaction
+        model_version: version of the model that produced the chunk scores
+        Returns: number of predictions indexed
+        """
+        signature_rows, bucket_rows, chunk_rows = [], [], []
+        for prediction_id, text, chunk_predictions in items:
+            signature = self.hasher.signature(text)
+            if signature is None:
+                continue
+            signature_rows.append((prediction_id, signature.tobytes()))
+            bucket_rows.extend(
+                (band, key, prediction_id) for band, key in enumerate(self.band_keys(signature))
+            )
+            for chunk in chunk_predictions or []:
+                if 'error' not in chunk:
+                    chunk_rows.append((prediction_id, chunk_key(chunk['text']), chunk['ai_probability'], model_version))
+
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.executemany('INSERT OR REPLACE INTO signatures VALUES (?, ?)', signature_rows)
+        cursor.executemany('INSERT OR IGNORE INTO lsh_buckets VALUES (?, ?, ?)', bucket_rows)
+        cursor.executemany('INSERT OR REPLACE INTO chunk_scores VALUES (?, ?, ?, ?)', chunk_rows)
+        conn.commit()
+        conn.close()
+        return len(signature_rows)
+
+    def query(self, text, threshold=None, limit=10):
+        """
+        Stored predictions similar to `text`
+        Returns: list of (prediction_id, estimated Jaccard similarity), most similar first
+        """
+        threshold = Config.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return []
+
+        conn = self.connect()
+        cursor = conn.cursor()
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            cursor.execute(
+                'SELECT prediction_id FROM lsh_buckets WHERE band = ? AND bucket = ?', (band, key)
+            )
+            candidates.update(row[0] for row in cursor.fetchall())
+
+        matches = []
+        candidates = list(candidates)
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(candidates), 500):
+            batch = candidates[start:start + 500]
+            cursor.execute(
+                f'SELECT prediction_id, signature FROM signatures WHERE prediction_id IN ({",".join("?" * len(batch))})',
+                batch
+            )
+            for prediction_id, blob in cursor.fetchall():
+                similarity = MinHasher.jaccard(signature, np.frombuffer(blob, dtype=np.uint32))
+                if similarity >= threshold:
+                    matches.append((prediction_id, similarity))
+        conn.close()
+
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit]
+
+    def known_chunk_scores(self, prediction_ids, model_version=None):
+        """KnownChunkScores for the chunks of the given predictions scored by model_version"""
+        if not prediction_ids:
+            return KnownChunkScores({}, model_version)
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT chunk_hash, ai_probability FROM chunk_scores '
+            f'WHERE prediction_id IN ({",".join("?" * len(prediction_ids))}) AND model_version IS ?',
+            list(prediction_ids) + [model_version]
+        )
+        scores = dict(cursor.fetchall())
+        conn.close()
+        return KnownChunkScores(scores, model_version)
+
+    def remove(self, prediction_ids):
+        """Drop predictions from the index"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        for prediction_id in prediction_ids:
+            row = cursor.execute(
+                'SELECT signature FROM signatures WHERE prediction_id = ?', (prediction_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            # lsh_buckets is keyed by (band, bucket); recompute them from the signature
+            keys = self.band_keys(np.frombuffer(row[0], dtype=np.uint32))
+            cursor.executemany(
+                'DELETE FROM lsh_buckets WHERE band = ? AND bucket = ? AND prediction_id = ?',
+                [(band, key, prediction_id) for band, key in enumerate(keys)]
+            )
+            cursor.execute('DELETE FROM signatures WHERE prediction_id = ?', (prediction_id,))
+            cursor.execute('DELETE FROM chunk_scores WHERE prediction_id = ?', (prediction_id,))
+        conn.commit()
+        conn.close()
+
+    def count(self):
+        conn = self.connect()
+        count = conn.execute('SELECT COUNT(*) FROM signatures').fetchone()[0]
+        conn.close()
+        return count
@@ -0,0 +1,156 @@
+"""
+ONNX export and ONNX Runtime inference backend for AI Text Detector
+
+export_onnx() merges the LoRA adapters into the base classifier and writes
+an ONNX graph with dynamic batch and sequence axes. OnnxSequenceClassifier
+runs that graph with ONNX Runtime behind the same call signature as the
+torch model (`model(**inputs).logits`), so ModelHandler's batching,
+padding and aggregation code is shared by both backends.
+
+Usage:
+    python onnx_backend.py [--tier full] [--output indobert_ai_detector_onnx]
+"""
+
+import argparse
+import logging
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from config import Config
+from cpu_layout import resolve_layout
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILENAME = "model.onnx"
+INPUT_NAMES = ['input_ids', 'attention_mask', 'token_type_ids']
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL'
+}
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap a HF classifier so the exported graph has a single `logits` output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids
+        ).logits
+
+def merge_adapters(model):
+    """Fold LoRA weights into the base model (no-op for plain HF models)"""
+    if hasattr(model, 'merge_and_unload'):
+        return model.merge_and_unload()
+    return model
+
+def export_onnx(model, tokenizer, output_dir, opset=17):
+    """
+    Export a (merged) sequence classifier to output_dir/model.onnx
+    The tokenizer is saved next to it so the directory is self-contained.
+    Returns: path of the ONNX file
+    """
+    model = merge_adapters(model).float().cpu().eval()
+    os.makedirs(output_dir, exist_ok=True)
+    onnx_path = os.path.join(output_dir, ONNX_FILENAME)
+
+    sample = tokenizer(
+        ["contoh teks untuk ekspor", "teks kedua"],
+        return_tensors='pt',
+        padding=True,
+        return_token_type_ids=True
+    )
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in INPUT_NAMES}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model).eval(),
+            tuple(sample[name] for name in INPUT_NAMES),
+            onnx_path,
+            input_names=INPUT_NAMES,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False
+        )
+    tokenizer.save_pretrained(output_dir)
+    logger.info(f"Exported ONNX model to {onnx_path}")
+    return onnx_path
+
+class OnnxSequenceClassifier:
+    """ONNX Runtime session with the call signature of a HF classifier"""
+
+    def __init__(self, onnx_path, num_threads=None, graph_optimization=None):
+        import onnxruntime as ort
+
+        num_threads = Config.ONNX_THREADS if num_threads is None else num_threads
+        if not num_threads:
+            num_threads = resolve_layout()[1]
+        graph_optimization = graph_optimization or Config.ONNX_GRAPH_OPTIMIZATION
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+        )
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, **inputs):
+        feed = {}
+        for name in self.input_names:
+            value = inputs.get(name)
+            if value is None:
+                # Single-segment inputs: token types are all zero
+                value = torch.zeros_like(inputs['input_ids'])
+            feed[name] = value.detach().cpu().numpy().astype(np.int64)
+        logits = self.session.run(['logits'], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def size_bytes(self):
+        return os.path.getsize(self.onnx_path)
+
+def check_parity(torch_handler, onnx_handler, texts, tolerance=1e-4):
+    """
+    Compare predict_batch between two handlers
+    Returns: (max absolute difference, whether it is within tolerance)
+    """
+    torch_probabilities = np.array(torch_handler.predict_batch(texts))
+    onnx_probabilities = np.array(onnx_handler.predict_batch(texts))
+    max_diff = float(np.abs(torch_probabilities - onnx_probabilities).max()) if texts else 0.0
+    return max_diff, max_diff <= tolerance
+
+def main():
+    from model_handler import ModelHandler
+
+    parser = argparse.ArgumentParser(description="Export the detector to ONNX")
+    parser.add_argument('--tier', default=Config.MODEL_TIER, choices=['full', 'fast'])
+    parser.add_argument('--output', default=os.path.dirname(Config.ONNX_MODEL_PATH))
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    handler = ModelHandler(tier=args.tier, backend='torch')
+    handler.load_model()
+    export_onnx(handler.model, handler.tokenizer, args.output, opset=args.opset)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+In-process latency profiling for AI Text Detector
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value_ms
+            if value_ms > self.max:
+                self.max = value_ms
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) as the upper bound of its bucket"""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = self.count * q / 100
+            seen = 0
+            for i, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= target:
+                    return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max,
+            'total_ms': self.total
+        }
+
+
+class StageProfiler:
+    """Collect timing spans per pipeline stage plus on-demand profile captures"""
+
+    def __init__(self, max_captures=10):
+        self.histograms = {}
+        self.captures = deque(maxlen=max_captures)
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record one duration (in seconds) for a stage"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.observe(seconds * 1000)
+        for listener in self.listeners:
+            listener(stage, seconds)
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one observation of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add_listener(self, listener):
+        """Call listener(stage, seconds) for every observation"""
+        self.listeners.append(listener)
+
+    def summary(self):
+        """Histogram summary per stage, sorted by total time spent"""
+        with self._lock:
+            items = list(self.histograms.items())
+        rows = [dict(stage=stage, **histogram.summary()) for stage, histogram in items]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.captures.clear()
+
+    @contextmanager
+    def capture(self, mode='cprofile', label='', row_limit=30):
+        """
+        Profile the enclosed block with cProfile ('cprofile') or the torch
+        profiler ('torch') and keep the report in `captures`
+        """
+        started_at = datetime.now().isoformat(timespec='seconds')
+        start = time.perf_counter()
+
+        if mode == 'torch':
+            from torch.profiler import profile, ProfilerActivity
+
+            with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+                yield
+            report = prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=row_limit)
+        elif mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(row_limit)
+            report = stream.getvalue()
+        else:
+            raise ValueError(f"Unknown profile mode: {mode}")
+
+        self.captures.appendleft({
+            'mode': mode,
+            'label': label,
+            'started_at': started_at,
+            'duration_ms': (time.perf_counter() - start) * 1000,
+            'report': report
+        })
+
+
+stage_profiler = StageProfiler()
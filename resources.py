@@ -0,0 +1,73 @@
+"""
+Process-wide cached resources for AI Text Detector
+"""
+
+import logging
+import streamlit as st
+from auth import Auth
+from config import Config
+from database import Database
+from job_queue import JobStore, JobWorker
+from maintenance import DatabaseMaintenance, MaintenanceScheduler
+from metrics import start_metrics_server
+from model_loader import model_loader
+from near_duplicate import NearDuplicateIndex
+from scheduler import FairScheduler
+
+# Streamlit re-executes the script on every interaction. These resources
+# are created once per process and shared by all sessions; per-user state
+# lives in st.session_state, never on these objects.
+
+@st.cache_resource(show_spinner=False)
+def get_database():
+    """Shared Database instance (schema is initialized once, at startup)"""
+    return Database()
+
+@st.cache_resource(show_spinner=False)
+def get_auth():
+    """Shared Auth instance backed by the shared Database"""
+    return Auth(db=get_database())
+
+@st.cache_resource(show_spinner=False)
+def get_near_duplicate_index():
+    """Shared MinHash/LSH index of past predictions (None if disabled)"""
+    if not Config.NEAR_DUPLICATE_ENABLED:
+        return None
+    return NearDuplicateIndex()
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler(_handler):
+    """Shared fair scheduler in front of the loaded model (all sessions queue here)"""
+    return FairScheduler(_handler)
+
+@st.cache_resource(show_spinner=False)
+def get_job_store():
+    """Shared store of persistent background analysis jobs"""
+    return JobStore()
+
+@st.cache_resource(show_spinner=False)
+def get_job_worker():
+    """
+    Background worker that resumes and runs queued jobs through the shared scheduler
+    (started with the app; its thread waits for the model before claiming jobs)
+    """
+    return JobWorker(lambda: get_scheduler(model_loader.get_handler()), get_job_store())
+
+@st.cache_resource(show_spinner=False)
+def get_maintenance():
+    """Archive, compact and back up the database on schedule (None if disabled)"""
+    if not Config.MAINTENANCE_ENABLED:
+        return None
+    get_database()  # schema (WAL mode, indexes) first
+    return MaintenanceScheduler(DatabaseMaintenance(near_duplicates=get_near_duplicate_index()))
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server():
+    """Start the /metrics endpoint once per process (None if disabled or port busy)"""
+    if not Config.METRICS_ENABLED:
+        return None
+    try:
+        return start_metrics_server(Config.METRICS_PORT, Config.METRICS_HOST)
+    except OSError as e:
+        logging.getLogger(__name__).error(f"Failed to start metrics server: {str(e)}")
+        return None
@@ -0,0 +1,262 @@
+"""
+Compact prediction results for AI Text Detector
+
+predict_text used to return nested dicts in which every chunk prediction
+carried its own copy of the chunk text, highlighted parts copied it again
+and the cleaned text was stored next to them, all kept per session in
+st.session_state. PredictionResult keeps one reference to the analysed
+text plus numpy arrays of offsets and probabilities; chunk texts,
+chunk_predictions, highlighted_parts and the JSON export are built on
+demand. chunk_predictions and highlighted_parts are cached on first
+access, so reruns that read them again don't re-clean the text. The
+arrays are one to two orders of magnitude smaller than the old dicts, but
+only counting the result alone: with the analysed text, which the page
+holds anyway, the saving is about 3x (benchmarks/result_memory.py), and
+about 1.4x once the cached views exist, which trade that memory for
+rerun time. It still answers result['key'], result.get(key) and
+result['key'] = value like the old dict. PartialResult is one update of
+a streamed analysis (ModelHandler.iter_predict_text).
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from config import Config
+from text_preprocessor import TextPreprocessor
+
+_TOKEN = re.compile(r'\S+')
+_preprocessor = TextPreprocessor()
+
+# Keys served from the arrays; anything else lives in `extra`
+VIEW_KEYS = (
+    'ai_probability', 'is_ai_generated', 'confidence_level', 'highlighted_parts',
+    'chunk_predictions', 'cleaned_text', 'total_chunks'
+)
+
+def confidence_level(ai_probability):
+    """Map an overall probability to 'high', 'medium' or 'low'"""
+    if ai_probability > Config.HIGH_CONFIDENCE_THRESHOLD:
+        return 'high'
+    elif ai_probability > Config.AI_THRESHOLD:
+        return 'medium'
+    return 'low'
+
+def _chunk_layout(text, chunks, starts):
+    """
+    Locate each chunk's words inside text[start:end]
+
+    A chunk is the cleaned words of the source tokens between its offsets,
+    except that its first token may have given some words to the previous
+    chunk (skip) and its last token some to the next one (count). Chunks
+    that cannot be rebuilt that way unambiguously (e.g. a single overlong
+    word cut by the chunker) are kept verbatim in the overrides.
+    Returns: (word skips, word counts, {position: chunk text})
+    """
+    skips = np.zeros(len(chunks), dtype=np.int32)
+    counts = np.zeros(len(chunks), dtype=np.int32)
+    overrides = {}
+    for i, (chunk, start) in enumerate(zip(chunks, starts)):
+        words = chunk.split(' ')
+        counts[i] = len(words)
+        match = _TOKEN.match(text, start)
+        token_words = _preprocessor.clean_text(match.group()).split() if match else []
+        candidates = [
+            skip for skip in range(len(token_words))
+            if words[:len(token_words) - skip] == token_words[skip:skip + len(words)]
+        ]
+        if len(candidates) == 1:
+            skips[i] = candidates[0]
+        else:
+            overrides[i] = chunk
+    return skips, counts, overrides
+
+@dataclass(slots=True, eq=False)
+class PredictionResult:
+    """predict_text result: score arrays with offsets into the analysed text"""
+
+    text: str
+    ai_probability: float
+    total_chunks: int
+    chunk_ids: np.ndarray  # chunk index in the document, per scored chunk
+    starts: np.ndarray  # character offsets into text
+    ends: np.ndarray
+    word_skips: np.ndarray
+    word_counts: np.ndarray
+    probabilities: np.ndarray
+    highlight_starts: np.ndarray
+    highlight_ends: np.ndarray
+    highlight_probabilities: np.ndarray
+    highlight_chunks: np.ndarray  # position in the chunk arrays, -1 for word runs (sliding)
+    errors: dict = field(default_factory=dict)  # position -> error message
+    text_overrides: dict = field(default_factory=dict)  # position -> chunk text
+    extra: dict = field(default_factory=dict)  # scoring_path, model_version, ...
+    # Views built on first access (see chunk_predictions, highlighted_parts)
+    _chunk_predictions: list = field(default=None, init=False, repr=False)
+    _highlighted_parts: list = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_chunks(cls, text, chunks, chunk_ids, starts, ends, probabilities, errors, ai_probability,
+                    highlight_starts, highlight_ends, highlight_probabilities, highlight_chunks,
+                    total_chunks=None, **extra):
+        starts = np.asarray(starts, dtype=np.int32)
+        skips, counts, overrides = _chunk_layout(text, chunks, starts.tolist())
+        return cls(
+            text=text,
+            ai_probability=float(ai_probability),
+            total_chunks=len(chunks) if total_chunks is None else total_chunks,
+            chunk_ids=np.asarray(chunk_ids, dtype=np.int32),
+            starts=starts,
+            ends=np.asarray(ends, dtype=np.int32),
+            word_skips=skips,
+            word_counts=counts,
+            probabilities=np.asarray(probabilities, dtype=np.float64),
+            highlight_starts=np.asarray(highlight_starts, dtype=np.int32),
+            highlight_ends=np.asarray(highlight_ends, dtype=np.int32),
+            highlight_probabilities=np.asarray(highlight_probabilities, dtype=np.float64),
+            highlight_chunks=np.asarray(highlight_chunks, dtype=np.int32),
+            errors={i: error for i, error in enumerate(errors) if error is not None},
+            text_overrides=overrides,
+            extra=extra
+        )
+
+    @classmethod
+    def empty(cls, text=''):
+        """Result for empty input"""
+        no_ints = np.zeros(0, dtype=np.int32)
+        no_floats = np.zeros(0, dtype=np.float64)
+        return cls(text or '', 0.0, 0, no_ints, no_ints, no_ints, no_ints, no_ints, no_floats,
+                   no_ints, no_ints, no_floats, no_ints)
+
+    @property
+    def is_ai_generated(self):
+        return self.ai_probability > Config.AI_THRESHOLD
+
+    @property
+    def confidence_level(self):
+        return confidence_level(self.ai_probability)
+
+    @property
+    def cleaned_text(self):
+        return _preprocessor.clean_text(self.text)
+
+    def chunk_text(self, position):
+        """Text of the chunk at `position` in the chunk arrays, as it was scored"""
+        if position in self.text_overrides:
+            return self.text_overrides[position]
+        words = _preprocessor.clean_text(self.text[self.starts[position]:self.ends[position]]).split()
+        skip = int(self.word_skips[position])
+        return ' '.join(words[skip:skip + int(self.word_counts[position])])
+
+    @property
+    def chunk_predictions(self):
+        if self._chunk_predictions is None:
+            self._chunk_predictions = self._build_chunk_predictions()
+        return self._chunk_predictions
+
+    def _build_chunk_predictions(self):
+        is_ai = (self.probabilities > Config.AI_THRESHOLD).tolist()
+        chunk_predictions = []
+        for position, (chunk_id, start, end, ai_prob, flag) in enumerate(zip(
+            self.chunk_ids.tolist(), self.starts.tolist(), self.ends.tolist(),
+            self.probabilities.tolist(), is_ai
+        )):
+            chunk_prediction = {
+                'chunk_id': chunk_id,
+                'text': self.chunk_text(position),
+                'start': start,
+                'end': end,
+                'ai_probability': ai_prob,
+                'is_ai': flag
+            }
+            if position in self.errors:
+                chunk_prediction['error'] = self.errors[position]
+            chunk_predictions.append(chunk_prediction)
+        return chunk_predictions
+
+    @property
+    def highlighted_parts(self):
+        if self._highlighted_parts is None:
+            self._highlighted_parts = self._build_highlighted_parts()
+        return self._highlighted_parts
+
+    def _build_highlighted_parts(self):
+        # Sliding-window highlights (-1) are word runs and need no chunk texts
+        chunk_predictions = self.chunk_predictions if (self.highlight_chunks >= 0).any() else []
+        highlighted_parts = []
+        for index, (start, end, probability, position) in enumerate(zip(
+            self.highlight_starts.tolist(), self.highlight_ends.tolist(),
+            self.highlight_probabilities.tolist(), self.highlight_chunks.tolist()
+        )):
+            if position >= 0:
+                # Same text object as the cached chunk prediction
+                text, chunk_id = chunk_predictions[position]['text'], int(self.chunk_ids[position])
+            else:
+                text, chunk_id = self.text[start:end], index
+            highlighted_parts.append({
+                'text': text,
+                'probability': probability,
+                'chunk_id': chunk_id,
+                'start': start,
+                'end': end
+            })
+        return highlighted_parts
+
+    # Dict-style access, so callers written for the old result dicts keep working
+
+    def __getitem__(self, key):
+        if key in VIEW_KEYS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in VIEW_KEYS:
+            raise KeyError(f"{key} is derived from the score arrays")
+        self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in VIEW_KEYS or key in self.extra
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(VIEW_KEYS) + list(self.extra)
+
+    def to_dict(self):
+        """The old nested-dict form (builds every view)"""
+        return {key: self[key] for key in self.keys()}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+@dataclass(slots=True, eq=False)
+class PartialResult:
+    """One streamed update: the chunks scored in the last batch and the running totals"""
+
+    ai_probability: float  # length-weighted over all chunks scored so far
+    chunks_scored: int
+    progress: float  # share of the text covered so far, 0..1
+    chunk_ids: np.ndarray  # this batch only
+    starts: np.ndarray
+    ends: np.ndarray
+    probabilities: np.ndarray
+    errors: list  # error message or None per chunk of this batch
+    result: PredictionResult = None  # set on the final update
+
+    @classmethod
+    def final(cls, result):
+        """Last update of a stream, carrying the complete result"""
+        no_ints = np.zeros(0, dtype=np.int32)
+        return cls(result.ai_probability, len(result.chunk_ids), 1.0,
+                   no_ints, no_ints, no_ints, np.zeros(0, dtype=np.float64), [], result)
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    @property
+    def is_ai_generated(self):
+        return self.ai_probability > Config.AI_THRESHOLD
@@ -0,0 +1,451 @@
+"""
+Per-user admission control and fair scheduling for AI Text Detector
+
+Every analysis goes through one FairScheduler in front of the model
+instead of running inline in the Streamlit script. Each user has a token
+bucket of Config.USER_CHUNKS_PER_MINUTE chunks for their role (guests one
+per browser session, so a new session gets a fresh bucket; see
+Auth.get_quota_key); a request
+whose backlog could not be served within SCHEDULER_MAX_WAIT_SECONDS is
+refused with RateLimitExceeded. Accepted documents are scored in slices of
+SCHEDULER_SLICE_CHUNKS chunks, served by start-time weighted fair queuing
+across users (weights from USER_CLASS_WEIGHTS), so a 300-page upload
+interleaves with everyone else's short texts instead of blocking them.
+Slices of different users' jobs on the same model version and adapter are
+picked in that same order and scored in one model batch, so the adapter is
+switched once per group rather than once per request.
+Chunks are cut lazily as slices run (ModelHandler.open_stream); admission
+prices a job from its word count. stream() yields a PartialResult per
+slice; submit(scored=...) resumes a job from checkpointed chunk scores
+(see job_queue.py). Jobs run on the version pinned at submit; finished
+results go back to ModelManager.maybe_shadow, so shadow scoring samples
+scheduled traffic. Queue wait per user class is exported as a histogram and kept for
+the admin panel.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from config import Config
+from metrics import (
+    PREDICTIONS_TOTAL, SCHEDULER_QUEUE_WAIT_SECONDS, SCHEDULER_QUEUED_CHUNKS,
+    SCHEDULER_REJECTIONS_TOTAL
+)
+from results import PartialResult
+
+class RateLimitExceeded(Exception):
+    """Raised by FairScheduler.submit when a user is over their chunk budget"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Chunks-per-minute budget, refilled continuously up to one minute's worth"""
+
+    def __init__(self, chunks_per_minute, now=None):
+        self.rate = chunks_per_minute / 60
+        self.capacity = float(chunks_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens have accumulated (0 if available now)"""
+        self._refill(now)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+class _Job:
+    """One submitted text, scored slice by slice through a ChunkStream"""
+
+    def __init__(self, job_id, user_class, text, handler, version, adapter, known_scores, updates=None,
+                 scored=None, manager=None):
+        self.job_id = job_id
+        self.user_class = user_class
+        self.text = text
+        self.handler = handler
+        self.version = version
+        self.manager = manager  # ModelManager to hand the result to for shadow scoring
+        self.adapter = adapter
+        if getattr(known_scores, 'model_version', version) != version:
+            # Scored by another model version (swapped since the lookup)
+            known_scores = None
+        self.known_scores = known_scores or {}
+        self.updates = updates  # queue.Queue fed with PartialResults (stream), or None
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.started = None
+        self.scoring_seconds = 0.0  # model time over all slices, for shadow comparisons
+        self.cancelled = False
+
+        if Config.CHUNKING_MODE == 'sliding' or not text or not text.strip():
+            # Scored in one go by predict_text
+            self.stream = None
+        else:
+            self.stream = handler.open_stream(text, known_scores, adapter=adapter)
+        restored = self.stream.restore(*scored) if scored and self.stream is not None else 0
+        self.cost = max(self.estimate_chunks(text) - restored, 1)
+        self.remaining_cost = self.cost
+
+    @staticmethod
+    def estimate_chunks(text):
+        """Chunk count before chunking: the chunker fits about (MAX_LENGTH - 2) / 2 words per chunk"""
+        words_per_chunk = (Config.MAX_LENGTH - 2) // 2
+        return max(-(-len((text or '').split()) // words_per_chunk), 1)
+
+    def next_cost(self, slice_chunks):
+        """Chunks charged up front for the next slice (settled after scoring)"""
+        if self.cancelled:
+            # Nothing left to score; run at once so the job is dropped
+            return 0
+        if self.stream is None:
+            return self.cost
+        return max(min(slice_chunks, self.remaining_cost), 1)
+
+    def shareable(self):
+        """Whether the next slice can be scored in a batch shared with other jobs"""
+        return (self.stream is not None and not self.stream.exhausted
+                and not self.known_scores and not self.cancelled)
+
+    def batches_with(self, other):
+        """Whether this job's next slice can share a model batch with other's"""
+        return (self.handler is other.handler and self.adapter == other.adapter
+                and self.shareable() and other.shareable())
+
+    def publish(self, update):
+        if self.updates is not None:
+            self.updates.put(update)
+
+class _UserQueue:
+    def __init__(self, user_class):
+        self.user_class = user_class
+        self.weight = Config.USER_CLASS_WEIGHTS.get(user_class, 1)
+        self.bucket = TokenBucket(
+            Config.USER_CHUNKS_PER_MINUTE.get(user_class, Config.USER_CHUNKS_PER_MINUTE['user'])
+        )
+        self.jobs = deque()
+        # Virtual finish time of the user's last slice; an idle user restarts
+        # from the scheduler's virtual time, so idling earns no extra share
+        self.finish_tag = 0.0
+
+    def queued_chunks(self):
+        return sum(max(job.remaining_cost, 0) for job in self.jobs)
+
+class FairScheduler:
+    """Admit, slice and fairly interleave inference work from many users"""
+
+    def __init__(self, handler, slice_chunks=None):
+        self.handler = handler
+        self.slice_chunks = slice_chunks or Config.SCHEDULER_SLICE_CHUNKS
+        self._users = {}  # user_id (or a guest's session key) -> _UserQueue
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._ids = itertools.count(1)
+        self._waits = {}  # user_class -> recent queue waits in seconds
+        self._stopped = False
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, input_text, user_class='user', known_scores=None, adapter=None, updates=None,
+               scored=None, background=False):
+        """
+        Queue a text for analysis on behalf of a user
+        updates: optional queue.Queue that receives a PartialResult per slice,
+                 the final one (with .result) or the exception that failed the job
+        scored: (probabilities, errors) of the text's first chunks, taken as
+                already scored (fixed chunking only)
+        background: never refuse; the job waits for the user's budget instead
+        Returns: Future with the predict_text result
+        Raises: RateLimitExceeded if the user's backlog exceeds their budget,
+                ValueError if the handler cannot serve `adapter`
+        """
+        # Pin the model version for all slices of this job (see model_manager.py)
+        handler = getattr(self.handler, 'handler', self.handler)
+        version = getattr(self.handler, 'version', None)
+        # Refuse an adapter the handler cannot serve now, not when a slice runs
+        handler.check_adapter(adapter)
+        manager = self.handler if hasattr(self.handler, 'maybe_shadow') else None
+        job = _Job(next(self._ids), user_class, input_text, handler, version, adapter,
+                   known_scores, updates, scored, manager)
+
+        with self._condition:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserQueue(user_class)
+            now = time.monotonic()
+            wait = user.bucket.wait_time(user.queued_chunks() + job.cost, now)
+            if wait > Config.SCHEDULER_MAX_WAIT_SECONDS and not background:
+                SCHEDULER_REJECTIONS_TOTAL.inc(user_class=user_class)
+                raise RateLimitExceeded(wait - Config.SCHEDULER_MAX_WAIT_SECONDS)
+            user.jobs.append(job)
+            SCHEDULER_QUEUED_CHUNKS.inc(job.cost, user_class=user_class)
+            self._condition.notify()
+        return job.future
+
+    def predict_text(self, user_id, input_text, user_class='user', timeout=None, **kwargs):
+        return self.submit(user_id, input_text, user_class, **kwargs).result(timeout)
+
+    def stream(self, user_id, input_text, user_class='user', **kwargs):
+        """
+        Like predict_text, but yields a PartialResult as each slice is scored;
+        the last one has .done set and carries the result. Closing the
+        generator early (e.g. a Streamlit rerun or Stop) cancels the job.
+        Raises: RateLimitExceeded, or the exception that failed the job
+        """
+        updates = queue.Queue()
+        future = self.submit(user_id, input_text, user_class, updates=updates, **kwargs)
+        finished = False
+        try:
+            while not finished:
+                update = updates.get()
+                if isinstance(update, Exception):
+                    finished = True
+                    raise update
+                finished = update.done
+                yield update
+        finally:
+            if not finished:
+                # Nobody reads the rest; stop using the model and the user's budget
+                self.cancel(future)
+
+    def cancel(self, future):
+        """Stop scoring the job behind a Future from submit; returns False if it is unknown or finished"""
+        with self._condition:
+            for user in self._users.values():
+                for job in user.jobs:
+                    if job.future is future:
+                        job.cancelled = True
+                        return True
+        return False
+
+    def _next_slice(self):
+        """
+        Pick the slice with the smallest virtual start time among users whose
+        bucket can pay for it now, then, in the same order, slices of other
+        users' jobs that can share its model batch (up to
+        ADAPTER_BATCH_MAX_REQUESTS slices in all)
+        Returns: ([(user, job, charged chunks), ...], None) or (None, seconds until one can run)
+        """
+        now = time.monotonic()
+        for user_id, user in list(self._users.items()):
+            if not user.jobs and user.bucket.wait_time(user.bucket.capacity, now) == 0:
+                # Idle with a full bucket, so there is nothing left to track
+                del self._users[user_id]
+
+        first, retry = self._pick(now)
+        if first is None:
+            return None, retry
+        work = [first]
+        if first[1].shareable():
+            while len(work) < Config.ADAPTER_BATCH_MAX_REQUESTS:
+                more, _ = self._pick(now, like=first[1], taken=[user for user, _, _ in work])
+                if more is None:
+                    break
+                work.append(more)
+        return work, None
+
+    def _pick(self, now, like=None, taken=()):
+        """
+        Charge the fairest slice that can run now, optionally only among jobs
+        that can share a batch with job `like` and users not in `taken`
+        Returns: ((user, job, charged chunks), None) or (None, seconds until one can run)
+        """
+        best, best_tag, retry = None, None, None
+        for user in self._users.values():
+            if not user.jobs or user in taken:
+                continue
+            job = user.jobs[0]
+            if like is not None and not job.batches_with(like):
+                continue
+            cost = job.next_cost(self.slice_chunks)
+            wait = user.bucket.wait_time(min(cost, user.bucket.capacity), now)
+            if wait > 0:
+                retry = wait if retry is None else min(retry, wait)
+                continue
+            tag = max(self._virtual_time, user.finish_tag)
+            if best is None or tag < best_tag or (tag == best_tag and job.submitted < best[1].submitted):
+                best, best_tag = (user, job), tag
+        if best is None:
+            return None, retry
+        user, job = best
+        cost = job.next_cost(self.slice_chunks)
+        user.bucket.take(cost, now)
+        user.finish_tag = best_tag + cost / user.weight
+        self._virtual_time = best_tag
+        return (user, job, cost), None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    work, retry = self._next_slice()
+                    if work is not None:
+                        break
+                    self._condition.wait(retry)
+            scored = self._score_slices([job for _, job, _ in work])
+            with self._condition:
+                for (user, job, charged), chunks in zip(work, scored):
+                    # The charge was an estimate; settle it with the chunks actually scored
+                    user.bucket.take(chunks - charged, time.monotonic())
+                    job.remaining_cost -= chunks
+                    SCHEDULER_QUEUED_CHUNKS.dec(chunks, user_class=user.user_class)
+                    if job.future.done() or job.cancelled:
+                        # Finished, failed or cancelled; drop whatever the estimate had left over
+                        user.jobs.remove(job)
+                        SCHEDULER_QUEUED_CHUNKS.dec(job.remaining_cost, user_class=user.user_class)
+                        job.remaining_cost = 0
+
+    def _score_slices(self, jobs):
+        """
+        Score the next slice of each job, in one model batch when there are several
+        Returns: number of chunks scored per job
+        """
+        running = [job for job in jobs if self._begin(job)]
+        if len(running) > 1:
+            scored = dict(zip(running, self._score_shared_slice(running)))
+        else:
+            scored = {job: self._score_slice(job) for job in running}
+        return [scored.get(job, 0) for job in jobs]
+
+    def _begin(self, job):
+        """Record the queue wait before a job's first slice; False if the job was cancelled"""
+        if job.started is None:
+            job.started = time.monotonic()
+            self._record_wait(job.user_class, job.started - job.submitted)
+        if job.cancelled:
+            job.future.cancel()
+            return False
+        return True
+
+    def _score_slice(self, job):
+        """Score the job's next slice; returns the number of chunks scored"""
+        start = time.perf_counter()
+        try:
+            if job.stream is None:
+                options = {'adapter': job.adapter} if job.adapter else {}
+                result = job.handler.predict_text(job.text, known_scores=job.known_scores, **options)
+                job.scoring_seconds += time.perf_counter() - start
+                self._finish(job, result)
+                return job.cost
+
+            scored = 0
+            # A job resumed from a complete checkpoint has nothing left to score
+            if not job.stream.exhausted:
+                update = job.stream.score_next(self.slice_chunks)
+                job.publish(update)
+                scored = len(update.chunk_ids)
+            job.scoring_seconds += time.perf_counter() - start
+            if job.stream.exhausted:
+                self._finish_stream(job)
+            return scored
+        except Exception as e:
+            self._fail(job, e)
+            return 0
+
+    def _score_shared_slice(self, jobs):
+        """
+        Score the next slice of several jobs with one score_arrays call; the
+        jobs share a handler and adapter (see _Job.batches_with)
+        Returns: number of chunks scored per job
+        """
+        start = time.perf_counter()
+        handler, adapter = jobs[0].handler, jobs[0].adapter
+        batches = [job.stream.take(self.slice_chunks) for job in jobs]
+        texts = [chunk for batch in batches for chunk, _, _ in batch]
+        # Errors are logged with each job's own chunk index, not the position in the combined batch
+        chunk_ids = [
+            f"{first + i} of job {job.job_id}"
+            for job, batch, first in zip(jobs, batches, (len(job.stream.chunks) for job in jobs))
+            for i in range(len(batch))
+        ]
+        use_adapter = getattr(handler, 'use_adapter', None)
+        try:
+            with use_adapter(adapter) if use_adapter else nullcontext():
+                probabilities, errors = handler.score_arrays(texts, chunk_ids=chunk_ids)
+        except Exception as e:
+            for job in jobs:
+                self._fail(job, e)
+            return [0] * len(jobs)
+        elapsed = time.perf_counter() - start
+
+        scored, offset = [], 0
+        for job, batch in zip(jobs, batches):
+            end = offset + len(batch)
+            job.scoring_seconds += elapsed
+            try:
+                job.publish(job.stream.add_scores(batch, probabilities[offset:end], errors[offset:end]))
+                if job.stream.exhausted:
+                    self._finish_stream(job)
+                scored.append(len(batch))
+            except Exception as e:
+                self._fail(job, e)
+                scored.append(0)
+            offset = end
+        return scored
+
+    def _finish_stream(self, job):
+        result = job.stream.result()
+        PREDICTIONS_TOTAL.inc(result='ai' if result['is_ai_generated'] else 'human')
+        self._finish(job, result)
+
+    def _finish(self, job, result):
+        result['queue_wait_seconds'] = job.started - job.submitted
+        if job.version is not None:
+            result['model_version'] = job.version
+        if job.adapter:
+            result['adapter'] = job.adapter
+        job.future.set_result(result)
+        job.publish(PartialResult.final(result))
+        if job.manager is not None:
+            job.manager.maybe_shadow(job.text, result, job.adapter, job.scoring_seconds * 1000)
+
+    def _fail(self, job, error):
+        self.logger.error(f"Scheduled job {job.job_id} failed: {str(error)}")
+        job.future.set_exception(error)
+        job.publish(error)
+
+    def _record_wait(self, user_class, seconds):
+        SCHEDULER_QUEUE_WAIT_SECONDS.observe(seconds, user_class=user_class)
+        with self._condition:
+            self._waits.setdefault(user_class, deque(maxlen=1000)).append(seconds)
+
+    def queue_stats(self):
+        """Per user class: queued chunks and queue wait (mean, p95, max) over recent jobs"""
+        with self._condition:
+            queued = {}
+            for user in self._users.values():
+                queued[user.user_class] = queued.get(user.user_class, 0) + user.queued_chunks()
+            waits = {user_class: sorted(values) for user_class, values in self._waits.items()}
+        stats = {}
+        for user_class in sorted(set(queued) | set(waits)):
+            values = waits.get(user_class, [])
+            stats[user_class] = {
+                'queued_chunks': queued.get(user_class, 0),
+                'jobs': len(values),
+                'mean_wait_s': sum(values) / len(values) if values else 0.0,
+                'p95_wait_s': values[min(int(len(values) * 0.95), len(values) - 1)] if values else 0.0,
+                'max_wait_s': values[-1] if values else 0.0
+            }
+        return stats
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout=30)
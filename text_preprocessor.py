@@ -5,6 +5,83 @@ Text preprocessing functions for AI Text Detector
 import re
 import string
 
+# Indonesian abbreviations that are followed by a name, number or title and
+# never end a sentence ("Dr. Siti", "No. 12", "Jl. Merdeka")
+TITLE_ABBREVIATIONS = frozenset([
+    'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q',
+    'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z',
+    'bpk', 'bp', 'capt', 'dr', 'dra', 'drg', 'drh', 'drs', 'hj', 'ir', 'kol', 'letjen',
+    'mayjen', 'ny', 'nn', 'prof', 'sdr', 'sdri', 'tn', 'yth', 'kh', 'st',
+    'gg', 'jl', 'jln', 'kab', 'kec', 'kel', 'kota', 'prov', 'rt', 'rw',
+    'hal', 'hlm', 'no', 'nomor', 'vol', 'ed', 'bab', 'psl', 'ps', 'ayat', 'lamp', 'lampiran',
+    'tgl', 'thn', 'th', 'rp', 'pt', 'cv', 'ud', 'tbk', 'persero', 'a.n', 'u.p', 'u.b',
+    'ket', 'cf', 'vs', 'bdk', 'lih', 'spt', 'sbg', 'utk', 'dgn', 'yg', 'dsj'
+])
+# Abbreviations that may end a sentence ("... buku, pena, dll. Lalu ...");
+# they only close one when the next word is capitalized
+FINAL_ABBREVIATIONS = frozenset(['dll', 'dsb', 'dst', 'dkk', 'tsb', 'dlsb', 'etc', 'sda'])
+
+# Sentence boundary candidates: terminal punctuation (plus closing quotes or
+# brackets) followed by whitespace or the end, or a blank line
+_SENTENCE_BOUNDARY = re.compile(r'[.!?…]+["\'”’)\]]*(?=\s|$)|\n[ \t]*\n')
+_ABBREVIATION_LOOKBACK = 12  # longest abbreviation we check, in characters
+
+def _is_abbreviation(text, dot, next_char):
+    """Whether the period at text[dot] belongs to an abbreviation"""
+    token_start = dot
+    lower_bound = max(dot - _ABBREVIATION_LOOKBACK, 0)
+    while token_start > lower_bound and not text[token_start - 1].isspace():
+        token_start -= 1
+    token = text[token_start:dot].lstrip('("\'“‘').lower()
+    if not token or (token_start == lower_bound and lower_bound > 0 and not text[lower_bound - 1].isspace()):
+        return False
+    if token in TITLE_ABBREVIATIONS:
+        return True
+    if token in FINAL_ABBREVIATIONS:
+        return not next_char.isupper()
+    # Dotted abbreviations like "S.H", "M.Pd", "Ph.D"
+    parts = token.split('.')
+    return len(parts) > 1 and all(part.isalpha() and len(part) <= 3 for part in parts)
+
+def segment_sentences(text):
+    """
+    Split text into sentence spans in a single left-to-right scan
+    
+    Periods inside numbers ("3.5", "Rp 2.000") are never boundaries because
+    a boundary must be followed by whitespace; a single period followed by a
+    lowercase word or preceded by an Indonesian abbreviation is skipped.
+    Blank lines also end a sentence.
+    Returns: list of (start, end) spans into `text`, whitespace-trimmed
+    """
+    spans = []
+    if not text:
+        return spans
+    
+    def add_span(start, end):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
+    
+    start = 0
+    length = len(text)
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        boundary = match.group()
+        if boundary[0] == '.' and len(boundary.rstrip('"\'”’)]')) == 1:
+            # Single period: look at the next non-space character
+            next_index = match.end()
+            while next_index < length and text[next_index].isspace():
+                next_index += 1
+            next_char = text[next_index] if next_index < length else ''
+            if next_char and (next_char.islower() or _is_abbreviation(text, match.start(), next_char)):
+                continue
+        add_span(start, match.end() if boundary[0] != '\n' else match.start())
+        start = match.end()
+    add_span(start, length)
+    return spans
+
 class TextPreprocessor:
     def __init__(self):
         self.unnecessary_symbols = ['@', '#', '$', '^', '&', '*', '(', ')', 
@@ -53,51 +130,142 @@ class TextPreprocessor:
         """
         Split text into sentences for sentence-level analysis
         """
-        # Simple sentence splitting - bisa diperbaiki dengan library NLP
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        return sentences
+        return [sentence for sentence, _, _ in self.split_into_sentences_with_offsets(text)]
+    
+    def split_into_sentences_with_offsets(self, text):
+        """
+        Split text into sentences, keeping their position in the original text
+        Returns: list of (sentence, start, end)
+        """
+        if not text or not isinstance(text, str):
+            return []
+        return [(text[start:end], start, end) for start, end in segment_sentences(text)]
+    
+    def clean_words_with_offsets(self, text):
+        """
+        Clean text word by word, keeping each cleaned word's span in the original text
+        Returns: list of (cleaned_word, start, end)
+        
+        Cleaning never moves text across whitespace, so cleaning each
+        original word gives the same words as clean_text(text).split().
+        """
+        return list(self.iter_clean_words(text))
+    
+    def iter_clean_words(self, text):
+        """Lazy clean_words_with_offsets: yields (cleaned_word, start, end)"""
+        if not text or not isinstance(text, str):
+            return
+        
+        for match in re.finditer(r'\S+', text):
+            start, end = match.span()
+            for word in self.clean_text(match.group()).split():
+                yield word, start, end
     
     def split_into_chunks(self, text, max_length=512):
         """
         Split text into chunks that fit model's max_length
         """
-        words = text.split()
-        chunks = []
+        words = [(word, 0, 0) for word in text.split()]
+        return [chunk for chunk, _, _ in self.split_words_into_chunks(words, max_length)]
+    
+    def split_words_into_chunks(self, words, max_length=512):
+        """
+        Group (word, start, end) tuples into chunks that fit model's max_length
+        Returns: list of (chunk_text, start, end)
+        """
+        return list(self.iter_words_into_chunks(words, max_length))
+    
+    def iter_words_into_chunks(self, words, max_length=512):
+        """Lazy split_words_into_chunks: yields (chunk_text, start, end) as soon as each chunk is full"""
         current_chunk = []
+        current_start = None
+        current_end = None
         current_length = 0
         
-        for word in words:
+        for word, start, end in words:
             # Estimasi token length (rough approximation)
             word_tokens = len(word.split()) + 1
             
             if current_length + word_tokens > max_length - 2:  # -2 for [CLS] and [SEP]
                 if current_chunk:
-                    chunks.append(' '.join(current_chunk))
+                    yield ' '.join(current_chunk), current_start, current_end
                     current_chunk = [word]
+                    current_start, current_end = start, end
                     current_length = word_tokens
                 else:
                     # Single word too long, truncate
-                    chunks.append(word[:max_length-2])
+                    yield word[:max_length-2], start, end
                     current_chunk = []
                     current_length = 0
             else:
+                if not current_chunk:
+                    current_start = start
                 current_chunk.append(word)
+                current_end = end
                 current_length += word_tokens
         
         if current_chunk:
-            chunks.append(' '.join(current_chunk))
+            yield ' '.join(current_chunk), current_start, current_end
+    
+    def iter_chunks(self, text, max_length=512):
+        """
+        Clean and chunk text lazily, yielding (chunk_text, start, end) in order
+        The first chunks are available before the rest of the text is read.
+        """
+        return self.iter_words_into_chunks(self.iter_clean_words(text), max_length)
+    
+    def split_words_into_windows(self, words, max_length=512, stride=128):
+        """
+        Group (word, start, end) tuples into overlapping windows that fit
+        model's max_length, starting a new window every `stride` words
+        Returns: list of (window_text, start, end, first_word, last_word)
+        where last_word is exclusive
+        """
+        if not words:
+            return []
+        
+        # Same estimate as split_words_into_chunks: every word costs 2 tokens
+        window_words = max((max_length - 2) // 2, 1)
+        stride = max(min(stride, window_words), 1)
         
-        return chunks
+        first_words = list(range(0, max(len(words) - window_words, 0) + 1, stride))
+        # Make sure the last window reaches the end of the text
+        if first_words[-1] + window_words < len(words):
+            first_words.append(len(words) - window_words)
+        
+        windows = []
+        for first in first_words:
+            last = min(first + window_words, len(words))
+            window = words[first:last]
+            windows.append((
+                ' '.join(word for word, _, _ in window),
+                window[0][1],
+                window[-1][2],
+                first,
+                last
+            ))
+        return windows
     
     def preprocess_for_model(self, text):
         """
         Full preprocessing pipeline for model input
         """
+        chunks, _, cleaned_text = self.preprocess_with_offsets(text)
+        return chunks, cleaned_text
+    
+    def preprocess_with_offsets(self, text):
+        """
+        Preprocessing pipeline that also returns each chunk's (start, end)
+        span in the original text
+        Returns: (chunks, spans, cleaned_text)
+        """
         # Clean text
-        cleaned_text = self.clean_text(text)
+        words = self.clean_words_with_offsets(text)
+        cleaned_text = ' '.join(word for word, _, _ in words)
         
         # Split into chunks if too long
-        chunks = self.split_into_chunks(cleaned_text)
+        chunk_spans = self.split_words_into_chunks(words)
+        chunks = [chunk for chunk, _, _ in chunk_spans]
+        spans = [(start, end) for _, start, end in chunk_spans]
         
-        return chunks, cleaned_text
\ No newline at end of file
+        return chunks, spans, cleaned_text
\ No newline at end of file
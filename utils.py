@@ -3,12 +3,18 @@ Utility functions for AI Text Detector
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
+import html
 import json
+import re
 from io import StringIO
+from config import Config
+
+# pandas and plotly are imported inside the chart/export helpers so the
+# login page doesn't pay for them on startup
+
+# Line breaks a highlight <span> must not cross (see highlight_ai_text)
+_LINE_BREAKS = re.compile(r'(\s*\n\s*)')
 
 class Utils:
     @staticmethod
@@ -117,7 +123,15 @@ class Utils:
     
     @staticmethod
     def create_confidence_gauge(ai_probability):
-        """Create a gauge chart for AI confidence"""
+        """Create a gauge chart for AI confidence (cached per value, to 4 decimals)"""
+        # Built from the rounded value too, so a cached figure matches its key
+        ai_probability = round(float(ai_probability), 4)
+        return _cached_figure('gauge', ai_probability, ai_probability)
+    
+    @staticmethod
+    def _build_confidence_gauge(ai_probability):
+        import plotly.graph_objects as go
+        
         fig = go.Figure(go.Indicator(
             mode = "gauge+number+delta",
             value = ai_probability * 100,
@@ -150,25 +164,57 @@ class Utils:
         return fig
     
     @staticmethod
-    def create_prediction_history_chart(predictions):
-        """Create a chart showing prediction history"""
+    def create_prediction_history_chart(predictions, fingerprint=None):
+        """
+        Create a chart showing prediction history
+        
+        The figure is cached on `fingerprint` (e.g. Database.get_predictions_fingerprint);
+        without one it is derived from the number of predictions and the max ID.
+        `predictions` may also be a function returning them, called only when
+        the figure is not cached yet (a fingerprint is then required).
+        """
+        if callable(predictions):
+            if fingerprint is None:
+                raise ValueError("A fingerprint is required when predictions are loaded lazily")
+            return _cached_figure('history', fingerprint, predictions)
         if not predictions:
             return None
         
+        if fingerprint is None:
+            fingerprint = (len(predictions), max(p.get('id', 0) for p in predictions))
+        return _cached_figure('history', fingerprint, predictions)
+    
+    @staticmethod
+    def _build_prediction_history_chart(predictions):
+        import pandas as pd
+        import plotly.express as px
+        
+        if callable(predictions):
+            predictions = predictions()
+            if not predictions:
+                return None
         df = pd.DataFrame(predictions)
         df['created_at'] = pd.to_datetime(df['created_at'])
         df['ai_percentage'] = df['ai_probability'] * 100
         
+        hover_data = None
+        if len(df) > Config.MAX_CHART_POINTS:
+            # Too many markers for the browser: aggregate per time bucket
+            df = Utils._downsample_history(df, Config.MAX_CHART_POINTS)
+            hover_data = ['jumlah']
+        
         fig = px.scatter(
             df, 
             x='created_at', 
             y='ai_percentage',
             color='is_ai_generated',
+            hover_data=hover_data,
             title='Riwayat Prediksi AI',
             labels={
                 'created_at': 'Waktu',
                 'ai_percentage': 'Persentase AI (%)',
-                'is_ai_generated': 'Teks AI'
+                'is_ai_generated': 'Teks AI',
+                'jumlah': 'Jumlah Prediksi'
             },
             color_discrete_map={True: '#FF6B6B', False: '#4CAF50'}
         )
@@ -186,22 +232,72 @@ class Utils:
         
         return fig
     
+    @staticmethod
+    def _downsample_history(df, max_points):
+        """Average predictions into time buckets, at most max_points markers in total"""
+        import pandas as pd
+        
+        buckets_per_class = max(max_points // 2, 1)
+        df = df.assign(
+            bucket=pd.cut(df['created_at'].astype('int64'), buckets_per_class, labels=False)
+        )
+        grouped = df.groupby(['is_ai_generated', 'bucket'], observed=True).agg(
+            created_at=('created_at', 'mean'),
+            ai_percentage=('ai_percentage', 'mean'),
+            jumlah=('ai_percentage', 'size')
+        )
+        return grouped.reset_index()
+    
     @staticmethod  
     def highlight_ai_text(text, highlighted_parts):
-        """Highlight AI-generated parts in text"""
+        """
+        Highlight AI-generated parts in text
+        
+        Parts carry 'start'/'end' offsets into the original text; the HTML
+        is built in a single pass over the spans sorted by position. A span
+        crossing line breaks is split into one <span> per line, so the
+        markdown renderer never sees a paragraph break inside an open tag.
+        """
         if not highlighted_parts:
-            return text
-        
-        highlighted_text = text
-        # Sort by position to avoid overlapping highlights
-        for part in sorted(highlighted_parts, key=lambda x: len(x['text']), reverse=True):
-            part_text = part['text']
-            probability = part['probability']
-            
-            highlight_html = f'<span class="ai-highlight" title="AI Confidence: {probability:.1%}">{part_text}</span>'
-            highlighted_text = highlighted_text.replace(part_text, highlight_html)
-        
-        return highlighted_text
+            # Rendered as HTML like the highlighted case
+            return html.escape(text)
+        
+        spans = []
+        search_from = 0
+        for part in sorted(highlighted_parts, key=lambda x: x.get('start', 0)):
+            start, end = part.get('start'), part.get('end')
+            if start is None or end is None:
+                # Older results without offsets: locate the text instead
+                start = text.find(part['text'], search_from)
+                if start == -1:
+                    continue
+                end = start + len(part['text'])
+                search_from = end
+            spans.append((start, end, part['probability']))
+        spans.sort()
+        
+        pieces = []
+        position = 0
+        for start, end, probability in spans:
+            # Clip spans overlapping an already highlighted one
+            if start < position:
+                start = position
+            if start >= end:
+                continue
+            pieces.append(html.escape(text[position:start]))
+            # Odd items are the line breaks (with surrounding whitespace) between lines
+            for index, line in enumerate(_LINE_BREAKS.split(text[start:end])):
+                if index % 2 or not line:
+                    pieces.append(html.escape(line))
+                else:
+                    pieces.append(
+                        f'<span class="ai-highlight" title="AI Confidence: {probability:.1%}">'
+                        f'{html.escape(line)}</span>'
+                    )
+            position = end
+        pieces.append(html.escape(text[position:]))
+        
+        return ''.join(pieces)
     
     @staticmethod
     def format_confidence_level(confidence_level, ai_probability):
@@ -233,10 +329,16 @@ class Utils:
     
     @staticmethod
     def create_stats_visualization(user_stats):
-        """Create visualization for user statistics"""
+        """Create visualization for user statistics (cached per stats values)"""
         if user_stats['total_predictions'] == 0:
             return None
         
+        return _cached_figure('stats', tuple(sorted(user_stats.items())), user_stats)
+    
+    @staticmethod
+    def _build_stats_visualization(user_stats):
+        import plotly.graph_objects as go
+        
         # Pie chart for AI vs Human predictions
         labels = ['Teks AI', 'Teks Manusia']
         values = [user_stats['ai_predictions'], user_stats['human_predictions']]
@@ -312,6 +414,8 @@ class Utils:
         if not predictions:
             return None
         
+        import pandas as pd
+        
         # Flatten predictions for CSV
         csv_data = []
         for pred in predictions:
@@ -324,4 +428,18 @@ class Utils:
             })
         
         df = pd.DataFrame(csv_data)
-        return df.to_csv(index=False)
\ No newline at end of file
+        return df.to_csv(index=False)
+
+
+@st.cache_data(max_entries=Config.FIGURE_CACHE_SIZE, show_spinner=False)
+def _cached_figure(kind, fingerprint, _data):
+    """
+    Build a Plotly figure once per (kind, fingerprint)
+    `_data` is not hashed by Streamlit; the fingerprint identifies it.
+    """
+    builders = {
+        'gauge': Utils._build_confidence_gauge,
+        'history': Utils._build_prediction_history_chart,
+        'stats': Utils._build_stats_visualization
+    }
+    return builders[kind](_data)